@@ -10,9 +10,12 @@ db = SQLAlchemy()
 # Initialise LoginManager
 login_manager = LoginManager()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
 
+    # Overrides, e.g. CATALOG_READ_ONLY=False for scripts that write the catalog
+    app.config.update(config or {})
+
     # Load environment variables from .env
     load_dotenv()
 
@@ -22,18 +25,52 @@ def create_app():
     # Base directory (root folder)
     base_dir = os.path.dirname(os.path.dirname(__file__))
 
-    # Configure SQLite database
-    db_path = os.path.join(base_dir, "data", "steam.sqlite")
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    # Configure SQLite database: read-only catalog pool and writable users pool
+    from .engine import configure_engines, init_engines
+
+    # CATALOG_DATABASE points the app at another file, e.g. a generated benchmark catalog
+    db_path = app.config.get("CATALOG_DATABASE") or os.path.join(base_dir, "data", "steam.sqlite")
+    configure_engines(app, db_path)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Memory-mapped catalog snapshot shared by the workers, built by build_snapshot.py
+    app.config.setdefault("CATALOG_SNAPSHOT", os.path.splitext(db_path)[0] + ".snapshot")
+
     # Initialize extensions
     db.init_app(app)
+    init_engines(app, db)
 
     # Set up login manager
     login_manager.login_view = "auth.login"
     login_manager.init_app(app)
 
+    from .token_cache import TokenCache
+    from .response_cache import ResponseCache
+
+    # Cache of verified API tokens used by token_required, trusted for at most TOKEN_CACHE_TTL seconds
+    app.extensions["token_cache"] = TokenCache(
+        app.config.get("TOKEN_CACHE_SIZE", 10000),
+        app.config.get("TOKEN_CACHE_TTL", 60)
+    )
+
+    # Cache of encoded catalog responses, invalidated by the catalog version
+    app.extensions["response_cache"] = ResponseCache(
+        app.config.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+        app.config.get("RESPONSE_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024)
+    )
+
+    # Per-user rate limits and the global concurrency limit applied by token_required
+    from .admission import init_admission
+    init_admission(app)
+
+    # Server-Timing header and slow request log
+    from .instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+    # Prometheus metrics at /metrics
+    from .metrics import init_metrics
+    init_metrics(app)
+
     from .models import User
 
     @login_manager.user_loader
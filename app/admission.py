@@ -0,0 +1,294 @@
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g, jsonify, request
+from .filters import RANGE_FILTERS, GAME_FACETS, TAG_FACETS
+from .search import SELECTIVE_NAME_LENGTH
+from .metrics import admission_rejections
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Base cost in rate limit tokens by endpoint, 1 for the others
+ENDPOINT_COSTS = {
+    "api.export_catalog": 20,
+    "api.get_games_batch": 5,
+}
+
+# Search endpoints, whose cost grows with the share of the catalog they scan
+SEARCH_ENDPOINTS = ("api.get_games", "api.get_games_by_tag")
+
+# Cost multipliers of a broad search (no selective filter) and of an unpaginated one
+BROAD_SCAN_FACTOR = 5
+UNPAGINATED_FACTOR = 2
+
+# Worker processes that can share one admission file
+MAX_PROCESSES = 256
+
+# Slots probed for a user's bucket before evicting the longest idle one
+PROBE_LENGTH = 8
+
+
+def request_cost(endpoint, args):
+    """
+    Estimates the cost of a request from its endpoint and parameters.
+
+    Searches without a selective filter (only a short name, no facet,
+    release year or range) scan most of the catalog and cost
+    BROAD_SCAN_FACTOR times more; unpaginated ones return every match and
+    cost UNPAGINATED_FACTOR times more again.
+    """
+    cost = ENDPOINT_COSTS.get(endpoint, 1)
+    if endpoint not in SEARCH_ENDPOINTS:
+        return cost
+
+    name = args.get("name", "").strip()
+    facets = [param for param in (*GAME_FACETS, *TAG_FACETS) if param != "tag"]
+    selective = (
+        len(name) >= SELECTIVE_NAME_LENGTH
+        or "release_year" in args
+        or any(args.get(param) for param in facets)
+        or any(f"{metric}_{bound}" in args for metric in RANGE_FILTERS for bound in ("min", "max"))
+    )
+    # /games/by-tag always filters on its tag
+    if not selective and endpoint != "api.get_games_by_tag":
+        cost *= BROAD_SCAN_FACTOR
+    if "limit" not in args and "cursor" not in args:
+        cost *= UNPAGINATED_FACTOR
+
+    return cost
+
+
+class AdmissionTable:
+    """
+    Rate limit buckets and in-flight request counts shared by the workers.
+
+    Each user has a token bucket refilled at `rate` tokens a second up to
+    `burst`, kept as (user id, tokens, updated) in a fixed-size hash table
+    of `slots` rows. A bucket idle long enough to be full again is the same
+    as no bucket, so its row is reused and memory is O(1) per active user.
+    Each process also counts its in-flight requests in its own row, and
+    the global in-flight count is their sum.
+
+    Without a directory the table is private memory. With one, every
+    process maps the same `admission.db` file and updates it under an
+    exclusive flock, so the limits apply to the server as a whole.
+    """
+
+    HEADER = struct.Struct("<8sQ")
+    PROCESS = struct.Struct("<qq")
+    BUCKET = struct.Struct("<qdd")
+    MAGIC = b"ADMIT001"
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.size = self.HEADER.size + MAX_PROCESSES * self.PROCESS.size + slots * self.BUCKET.size
+        self.buckets_offset = self.HEADER.size + MAX_PROCESSES * self.PROCESS.size
+        self.memory = None
+        self.file = None
+        self.directory = None
+        self.pid = None
+        self.row = None
+        self.lock = threading.Lock()
+
+    def open(self, directory=None):
+        """Maps the table, in memory or in the shared file under `directory`."""
+        if self.memory is not None and self.pid == os.getpid() and self.directory == directory:
+            return
+
+        self.directory = directory
+        self.pid = os.getpid()
+
+        if directory is None:
+            self.file = None
+            self.memory = mmap.mmap(-1, self.size)
+        else:
+            if fcntl is None:
+                raise RuntimeError("Sharing the admission table between processes needs fcntl (POSIX)")
+            os.makedirs(directory, exist_ok=True)
+            self.file = open(os.path.join(directory, "admission.db"), "a+b")
+            with self.locked():
+                if os.fstat(self.file.fileno()).st_size != self.size:
+                    self.file.truncate(self.size)
+                self.memory = mmap.mmap(self.file.fileno(), self.size)
+
+        with self.locked():
+            magic, slots = self.HEADER.unpack_from(self.memory, 0)
+            if magic != self.MAGIC or slots != self.slots:
+                self.memory[:] = bytes(self.size)
+                self.HEADER.pack_into(self.memory, 0, self.MAGIC, self.slots)
+            self.row = self.claim_row()
+
+    @contextmanager
+    def locked(self):
+        with self.lock:
+            if self.file is None:
+                yield
+                return
+
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def claim_row(self):
+        """Takes a free process row, or one of a process that exited."""
+        self.clear_exited()
+        for row in range(MAX_PROCESSES):
+            pid, _ = self.PROCESS.unpack_from(self.memory, self.HEADER.size + row * self.PROCESS.size)
+            if pid in (0, self.pid):
+                self.PROCESS.pack_into(self.memory, self.HEADER.size + row * self.PROCESS.size, self.pid, 0)
+                return row
+        raise RuntimeError(f"More than {MAX_PROCESSES} processes share the admission table")
+
+    def clear_exited(self):
+        """Frees the rows of processes that exited, with the requests they had in flight."""
+        for row in range(MAX_PROCESSES):
+            offset = self.HEADER.size + row * self.PROCESS.size
+            pid, _ = self.PROCESS.unpack_from(self.memory, offset)
+            if pid and pid != self.pid and not process_alive(pid):
+                self.PROCESS.pack_into(self.memory, offset, 0, 0)
+
+    def in_flight(self):
+        rows = memoryview(self.memory)[self.HEADER.size:self.buckets_offset].cast("q")
+        try:
+            return sum(rows[1::2])
+        finally:
+            rows.release()
+
+    def add_in_flight(self, amount):
+        offset = self.HEADER.size + self.row * self.PROCESS.size
+        pid, count = self.PROCESS.unpack_from(self.memory, offset)
+        self.PROCESS.pack_into(self.memory, offset, pid, max(count + amount, 0))
+
+    def enter(self, limit):
+        """Counts a request in flight, False if `limit` are already."""
+        with self.locked():
+            if self.in_flight() >= limit:
+                # Requests of crashed workers would otherwise stay counted
+                self.clear_exited()
+                if self.in_flight() >= limit:
+                    return False
+            self.add_in_flight(1)
+            return True
+
+    def leave(self):
+        with self.locked():
+            self.add_in_flight(-1)
+
+    def take(self, user_id, cost, rate, burst):
+        """
+        Takes `cost` tokens from the user's bucket. Returns 0 when they were
+        taken, else the seconds until the bucket holds enough.
+        """
+        cost = min(cost, burst)
+
+        with self.locked():
+            now = time.time()
+            offset = self.find_bucket(user_id, now, rate, burst)
+            stored_id, tokens, updated = self.BUCKET.unpack_from(self.memory, offset)
+
+            if stored_id != user_id:
+                tokens = burst
+            else:
+                tokens = min(burst, tokens + max(now - updated, 0) * rate)
+
+            if tokens < cost:
+                self.BUCKET.pack_into(self.memory, offset, user_id, tokens, now)
+                return (cost - tokens) / rate
+
+            self.BUCKET.pack_into(self.memory, offset, user_id, tokens - cost, now)
+            return 0
+
+    def find_bucket(self, user_id, now, rate, burst):
+        """
+        Offset of the user's bucket row, else of a row free to take: an
+        empty one, one refilled to `burst` since, or the longest idle.
+        """
+        refill_time = burst / rate
+        start = (user_id * 2654435761) % self.slots
+        reusable = None
+        oldest = None
+
+        for probe in range(PROBE_LENGTH):
+            offset = self.buckets_offset + (start + probe) % self.slots * self.BUCKET.size
+            stored_id, _, updated = self.BUCKET.unpack_from(self.memory, offset)
+            if stored_id == user_id:
+                return offset
+            if reusable is None and (stored_id == 0 or now - updated >= refill_time):
+                reusable = offset
+            if oldest is None or updated < oldest[0]:
+                oldest = (updated, offset)
+
+        return reusable if reusable is not None else oldest[1]
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def rejection(error, status, retry_after, reason):
+    admission_rejections.inc(reason)
+    response = jsonify({"error": error})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(math.ceil(retry_after), 1))
+    return response
+
+
+def admit(user):
+    """
+    Applies the user's rate limit and the global concurrency limit to the
+    current request. Returns the 429 or 503 response of a rejected
+    request, None when it can go ahead.
+    """
+    config = current_app.config
+    if not config.get("ADMISSION_ENABLED", True):
+        return None
+
+    table = current_app.extensions["admission"]
+    table.open(config.get("ADMISSION_DIR"))
+
+    # Checked first, so requests shed under load do not use up the user's tokens
+    limit = config.get("MAX_CONCURRENT_REQUESTS", 64)
+    if limit:
+        if not table.enter(limit):
+            return rejection("Server is busy, retry later", 503, config.get("OVERLOAD_RETRY_AFTER", 1), "overloaded")
+        g.admitted = True
+
+    cost = request_cost(request.endpoint, request.args)
+    wait = table.take(user.id, cost, config.get("RATE_LIMIT_RATE", 10.0), config.get("RATE_LIMIT_BURST", 100.0))
+    if wait:
+        return rejection("Rate limit exceeded", 429, wait, "rate_limited")
+
+    return None
+
+
+def init_admission(app):
+    """
+    Sets up the admission table used by token_required and releases each
+    request's in-flight slot once its response, streamed or not, is done.
+
+    RATE_LIMIT_RATE and RATE_LIMIT_BURST size every user's token bucket,
+    MAX_CONCURRENT_REQUESTS (0 for none) bounds the requests in flight and
+    ADMISSION_ENABLED turns both off. Set ADMISSION_DIR to a directory
+    shared by the worker processes to apply the limits across them.
+    """
+    app.extensions["admission"] = AdmissionTable(app.config.get("RATE_LIMIT_SLOTS", 65536))
+
+    @app.teardown_request
+    def release_admission(error=None):
+        if g.pop("admitted", False):
+            app.extensions["admission"].leave()
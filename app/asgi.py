@@ -0,0 +1,167 @@
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsgiApp:
+    """
+    Serves the Flask app from an ASGI server (e.g. uvicorn).
+
+    Connections are held by the server's event loop, so idle clients and
+    slow uploads cost no thread. Each request runs the unchanged Flask app,
+    with its queries and serialisation, on a bounded pool of ASGI_WORKERS
+    threads (default: the catalog connection pool size plus its overflow,
+    so a worker never waits for a connection). Requests beyond that queue
+    without holding a thread, up to ASGI_MAX_PENDING (default four times
+    the pool size) in all; beyond that they get a 503 with Retry-After
+    straight from the loop. Response chunks are handed back to the loop
+    as they are produced, so streamed results stay streamed, but the pool
+    thread waits for each chunk to be sent: a slow reader holds its thread
+    for as long as its response takes to send.
+    """
+
+    def __init__(self, app, workers=None):
+        self.app = app
+        if workers is None:
+            workers = app.config.get(
+                "ASGI_WORKERS",
+                app.config.get("CATALOG_POOL_SIZE", 16) + app.config.get("CATALOG_POOL_OVERFLOW", 16)
+            )
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asgi")
+        self.max_pending = app.config.get("ASGI_MAX_PENDING", workers * 4)
+        self.retry_after = app.config.get("OVERLOAD_RETRY_AFTER", 1)
+        self.pending = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        # Shed load before the queue grows into seconds of latency
+        if self.max_pending and self.pending >= self.max_pending:
+            await self.send_busy(send)
+            return
+
+        self.pending += 1
+        try:
+            body = await read_body(receive)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self.run_wsgi, wsgi_environ(scope, body), send, loop)
+        finally:
+            self.pending -= 1
+
+    async def send_busy(self, send):
+        body = json.dumps({"error": "Server is busy, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def run_wsgi(self, environ, send, loop):
+        """
+        Runs the WSGI app in a pool thread. The whole response, streamed
+        bodies included, is produced in this one thread, as Flask's request
+        context requires, and each chunk waits until the loop has sent it.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def send_start():
+            send_message({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+
+        chunks = self.app(environ, start_response)
+        try:
+            started = False
+            for chunk in chunks:
+                if not started:
+                    send_start()
+                    started = True
+                if chunk:
+                    send_message({"type": "http.response.body", "body": chunk, "more_body": True})
+
+            if not started:
+                send_start()
+            send_message({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+
+async def read_body(receive):
+    """Reads the whole request body."""
+    parts = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        parts.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(parts)
+
+
+def wsgi_environ(scope, body):
+    """Builds the WSGI environ (PEP 3333) of an ASGI HTTP request."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    # The body was read whole, so its length is known even for chunked requests
+    environ["CONTENT_LENGTH"] = str(len(body))
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+
+    return environ
@@ -0,0 +1,76 @@
+import threading
+import time
+import uuid
+from flask import current_app
+from sqlalchemy import select, delete, insert
+from sqlalchemy.exc import OperationalError
+from . import db
+from .models import CatalogMeta
+
+# Serialises rebuilds of the in-memory catalog indexes. Reentrant, as an
+# index may use another one while it is built.
+_index_lock = threading.RLock()
+
+
+def read_catalog_version():
+    """Reads the current catalog data version, "0" if it was never set."""
+    try:
+        version = db.session.execute(
+            select(CatalogMeta.value).where(CatalogMeta.key == "version")
+        ).scalar_one_or_none()
+    except OperationalError:
+        # catalog_meta does not exist yet
+        db.session.rollback()
+        version = None
+
+    return version or "0"
+
+
+def catalog_version():
+    """
+    Returns the catalog data version, re-read from the database at most
+    every CATALOG_VERSION_TTL seconds (default 5) per worker.
+    """
+    now = time.monotonic()
+    checked_at, version = current_app.extensions.get("catalog_version", (None, None))
+
+    if checked_at is None or now - checked_at >= current_app.config.get("CATALOG_VERSION_TTL", 5):
+        version = read_catalog_version()
+        current_app.extensions["catalog_version"] = (now, version)
+
+    return version
+
+
+def bump_catalog_version(connection):
+    """Stores a new catalog data version. Call it whenever catalog data is reloaded."""
+    version = uuid.uuid4().hex
+    CatalogMeta.__table__.create(connection, checkfirst=True)
+    connection.execute(delete(CatalogMeta).where(CatalogMeta.key == "version"))
+    connection.execute(insert(CatalogMeta).values(key="version", value=version))
+    return version
+
+
+def catalog_index(name, build):
+    """
+    Returns the in-memory catalog index `name`, built with `build()`.
+
+    Indexes are built once per worker and rebuilt on first use after the
+    catalog version changes, so a data reload needs no restart.
+    """
+    version = catalog_version()
+    indexes = current_app.extensions.setdefault("catalog_indexes", {})
+
+    entry = indexes.get(name)
+    if entry is None or entry[0] != version:
+        with _index_lock:
+            entry = indexes.get(name)
+            if entry is None or entry[0] != version:
+                entry = (version, build())
+                indexes[name] = entry
+
+    return entry[1]
+
+
+def reset_catalog_indexes():
+    """Drops every in-memory catalog index so they are rebuilt on next use."""
+    current_app.extensions["catalog_indexes"] = {}
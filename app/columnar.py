@@ -0,0 +1,225 @@
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from . import db
+from .catalog import catalog_index
+from .facets import get_facet_index
+from .models import Game, Rating, GameMedia
+from .search import name_filter, broad_name
+from .fuzzy import fuzzy_appids
+from .snapshot import get_catalog_snapshot
+
+# Sort keys the snapshot can order by: sort key -> (column, value used for NULL).
+# The NULL values match the coalesce() defaults of pagination.SORT_KEYS.
+NUMERIC_SORT_KEYS = {
+    "appid": ("appid", 0),
+    "price": ("price", 0.0),
+    "release_date": ("release_date_key", 0),
+    "rating": ("rating_pct", -1.0),
+    "total_ratings": ("total_ratings", 0),
+    "playtime": ("average_playtime", 0),
+    "owners": ("owners_lower", 0),
+}
+
+# Snapshot column -> (source column, dtype). Nullable numbers are stored as
+# float64 with NaN for NULL, so range filters drop them like SQL does.
+COLUMNS = {
+    "price": (Game.price, np.float64),
+    "release_year": (Game.release_year, np.float64),
+    "release_date_key": (Game.release_date_key, np.float64),
+    "rating_pct": (Rating.rating_pct, np.float64),
+    "total_ratings": (Rating.total_ratings, np.float64),
+    "average_playtime": (Rating.average_playtime, np.float64),
+    "owners_lower": (Rating.owners_lower, np.float64),
+}
+
+# Range filter name (see filters.RANGE_FILTERS) -> snapshot column
+RANGE_COLUMNS = {
+    "price": "price",
+    "rating": "rating_pct",
+    "playtime": "average_playtime",
+    "owners": "owners_lower",
+}
+
+
+class CatalogColumns:
+    """
+    Read-only columnar snapshot of `games` joined with `ratings`.
+
+    Each numeric column is a NumPy array indexed by the game's position in
+    appid order, the same positions the facet bitsets use. `listed` marks
+    the games that have a rating and media row, i.e. the ones the search
+    endpoints can return.
+    """
+
+    def __init__(self, appid, listed, columns):
+        self.appid = appid
+        self.listed = listed
+        self.columns = columns
+        self._sort_values = {}
+
+    @classmethod
+    def build(cls):
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None and snapshot.has("appid", "listed", *COLUMNS):
+            return cls.from_snapshot(snapshot)
+        return cls.query()
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Views the columns of a mapped snapshot file in place, without copying."""
+        columns = {name: snapshot.array(name) for name in COLUMNS}
+        return cls(snapshot.array("appid"), snapshot.array("listed").view(bool), columns)
+
+    @classmethod
+    def query(cls):
+        """Loads the columns from the database."""
+        stmt = (
+            select(Game.appid, Rating.appid.is_not(None), GameMedia.appid.is_not(None),
+                   *(column for column, _ in COLUMNS.values()))
+            .outerjoin(Rating, Game.appid == Rating.appid)
+            .outerjoin(GameMedia, Game.appid == GameMedia.appid)
+            .order_by(Game.appid)
+        )
+        rows = db.session.execute(stmt).all()
+
+        appid = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        listed = np.fromiter((bool(row[1] and row[2]) for row in rows), dtype=bool, count=len(rows))
+
+        columns = {}
+        for offset, (name, (_, dtype)) in enumerate(COLUMNS.items(), start=3):
+            columns[name] = np.fromiter(
+                (np.nan if row[offset] is None else row[offset] for row in rows),
+                dtype=dtype, count=len(rows)
+            )
+
+        return cls(appid, listed, columns)
+
+    def positions_of(self, appids):
+        """Boolean mask of the positions of the given appids."""
+        mask = np.zeros(len(self.appid), dtype=bool)
+        if not len(self.appid):
+            return mask
+
+        appids = np.asarray(appids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.appid, appids), len(self.appid) - 1)
+        mask[positions[self.appid[positions] == appids]] = True
+        return mask
+
+    def mask(self, criteria):
+        """Compiles the search criteria into a boolean mask over the snapshot."""
+        mask = self.listed.copy()
+
+        # Facets: unpack the bitset of the facet index into a boolean mask
+        facet_index = get_facet_index()
+        bits = facet_index.select(criteria["facets"])
+        if bits is not None:
+            if len(facet_index.appids) != len(self.appid):
+                mask &= self.positions_of(facet_index.to_appids(bits))
+            else:
+                raw = np.frombuffer(bits.to_bytes((len(self.appid) + 7) // 8, "little"), dtype=np.uint8)
+                mask &= np.unpackbits(raw, bitorder="little")[:len(self.appid)].astype(bool)
+
+        if criteria["release_year"] is not None:
+            mask &= self.columns["release_year"] == criteria["release_year"]
+
+        # NaN compares False, so games without a value are filtered out like NULLs in SQL
+        for name, (low, high) in criteria["ranges"].items():
+            column = self.columns[RANGE_COLUMNS[name]]
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+
+        # Text search stays in SQLite (FTS5) or the trigram index, only for games still in the running
+        if criteria["name"] and mask.any():
+            if criteria["match"] == "fuzzy":
+                matches = fuzzy_appids(criteria["name"])
+            else:
+                matches = db.session.execute(
+                    select(Game.appid).where(name_filter(criteria["name"], criteria["search_fields"]))
+                ).scalars().all()
+            mask &= self.positions_of(matches)
+
+        return mask
+
+    def sort_values(self, key):
+        """The values of a numeric sort key, with NULLs replaced as in SQL."""
+        values = self._sort_values.get(key)
+
+        if values is None:
+            column, null_value = NUMERIC_SORT_KEYS[key]
+            if column == "appid":
+                values = self.appid
+            else:
+                values = np.nan_to_num(self.columns[column], nan=null_value)
+                if isinstance(null_value, int):
+                    values = values.astype(np.int64)
+            self._sort_values[key] = values
+
+        return values
+
+    def search(self, criteria, key, descending, cursor=None, limit=None):
+        """
+        Finds the matching positions ordered by (sort key, appid).
+
+        With a limit only the first `limit + 1` positions are returned; a
+        partial partition finds them without sorting every candidate.
+        """
+        positions = np.flatnonzero(self.mask(criteria))
+        values = self.sort_values(key)[positions]
+        appids = self.appid[positions]
+
+        # Sort descending by negating both parts of the key
+        if descending:
+            values = -values
+            appids = -appids
+
+        if cursor is not None:
+            value, appid = cursor
+            value, appid = (-value, -appid) if descending else (value, appid)
+            after = (values > value) | ((values == value) & (appids > appid))
+            positions, values, appids = positions[after], values[after], appids[after]
+
+        # Keep only candidates that can be on the page, ties included
+        if limit is not None and len(positions) > limit + 1:
+            threshold = np.partition(values, limit)[limit]
+            head = values <= threshold
+            positions, values, appids = positions[head], values[head], appids[head]
+
+        order = np.lexsort((appids, values))
+        if limit is not None:
+            order = order[:limit + 1]
+
+        return positions[order]
+
+    def bitset(self, mask):
+        """Converts a mask into a facet index bitset (same positions)."""
+        return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+    def sort_value(self, key, position):
+        """Plain Python value of a sort key at a position, as used in cursors."""
+        return self.sort_values(key)[position].item()
+
+
+def columnar_enabled(key="appid", criteria=None):
+    """
+    Whether searches sorted by `key` should run on the columnar snapshot.
+
+    Exact name searches with only short words (see search.broad_name) stay
+    in SQL. The snapshot would first fetch every FTS match, a third of the
+    catalog for "s", while SQL stops at the first page in appid order and
+    only sorts the rows the other filters leave. Their range filters then
+    run in SQL too, which is slower than the snapshot but small next to
+    fetching the matches.
+    """
+    if not current_app.config.get("CATALOG_COLUMNAR", True) or key not in NUMERIC_SORT_KEYS:
+        return False
+    if criteria and criteria["name"] and criteria["match"] == "exact":
+        return not broad_name(criteria["name"])
+    return True
+
+
+def get_catalog_columns():
+    """Returns the columnar snapshot, rebuilt when the catalog is reloaded."""
+    return catalog_index("catalog_columns", CatalogColumns.build)
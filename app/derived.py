@@ -0,0 +1,125 @@
+from datetime import datetime
+from sqlalchemy import text, select, update, bindparam
+from .models import Game, Rating
+from .relations import chunked, RELATIONS
+
+# Columns computed from the raw catalog data: (table, column, SQL type)
+DERIVED_COLUMNS = [
+    ("games", "release_year", "INTEGER"),
+    ("games", "release_date_key", "INTEGER"),
+    ("ratings", "total_ratings", "INTEGER"),
+    ("ratings", "rating_pct", "FLOAT"),
+    ("ratings", "owners_lower", "INTEGER"),
+]
+
+# Release date formats found in the Steam data, most common first
+RELEASE_DATE_FORMATS = ("%Y-%m-%d", "%d %b, %Y", "%b %d, %Y", "%d %B, %Y", "%B %d, %Y", "%b %Y", "%B %Y", "%Y")
+
+
+def parse_release_date(value):
+    """Returns (year, YYYYMMDD key) for a release date string, (None, None) if unparseable."""
+    if not value:
+        return None, None
+
+    value = value.strip()
+    for date_format in RELEASE_DATE_FORMATS:
+        try:
+            date = datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        return date.year, date.year * 10000 + date.month * 100 + date.day
+
+    return None, None
+
+
+def parse_owners(value):
+    """Returns the lower bound of an owners range such as "20000-50000", None if unparseable."""
+    if not value:
+        return None
+
+    try:
+        return int(value.split("-")[0].strip().replace(",", ""))
+    except ValueError:
+        return None
+
+
+def ensure_derived_columns(connection):
+    """Adds the derived columns to databases created before they existed."""
+    for table, column, sql_type in DERIVED_COLUMNS:
+        existing = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+        if column not in existing:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+
+
+def indexed_tables():
+    """The catalog tables that have secondary indexes declared on their model."""
+    return [Game.__table__, Rating.__table__] + [link.__table__ for link, *_ in RELATIONS.values()]
+
+
+def create_catalog_indexes(connection):
+    """Creates every index declared on the catalog models that does not exist yet."""
+    for table in indexed_tables():
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def drop_catalog_indexes(connection):
+    """Drops the indexes created by create_catalog_indexes, e.g. before a bulk load."""
+    for table in indexed_tables():
+        for index in table.indexes:
+            index.drop(connection, checkfirst=True)
+
+
+def refresh_derived(connection, appids=None):
+    """
+    Recomputes the derived columns, for every game or only the given appids.
+
+    rating_pct is a float percentage of positive ratings (NULL without any
+    ratings), owners_lower is parsed from owners, and release_year and
+    release_date_key are parsed from release_date.
+    """
+    ratings = update(Rating).values(
+        total_ratings=Rating.positive_ratings + Rating.negative_ratings,
+        rating_pct=text(
+            "CASE WHEN positive_ratings + negative_ratings > 0 "
+            "THEN 100.0 * positive_ratings / (positive_ratings + negative_ratings) END"
+        )
+    )
+    dates = select(Game.appid, Game.release_date)
+    owners = select(Rating.appid, Rating.owners)
+
+    if appids is None:
+        connection.execute(ratings)
+        date_rows = connection.execute(dates).all()
+        owner_rows = connection.execute(owners).all()
+    else:
+        appids = list(appids)
+        date_rows = []
+        owner_rows = []
+        for chunk in chunked(appids):
+            connection.execute(ratings.where(Rating.appid.in_(chunk)))
+            date_rows.extend(connection.execute(dates.where(Game.appid.in_(chunk))).all())
+            owner_rows.extend(connection.execute(owners.where(Rating.appid.in_(chunk))).all())
+
+    params = []
+    for appid, release_date in date_rows:
+        year, key = parse_release_date(release_date)
+        params.append({"key_appid": appid, "year": year, "key": key})
+
+    if params:
+        connection.execute(
+            update(Game.__table__)
+            .where(Game.__table__.c.appid == bindparam("key_appid"))
+            .values(release_year=bindparam("year"), release_date_key=bindparam("key")),
+            params
+        )
+
+    params = [{"key_appid": appid, "lower": parse_owners(value)} for appid, value in owner_rows]
+
+    if params:
+        connection.execute(
+            update(Rating.__table__)
+            .where(Rating.__table__.c.appid == bindparam("key_appid"))
+            .values(owners_lower=bindparam("lower")),
+            params
+        )
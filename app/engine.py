@@ -0,0 +1,79 @@
+from sqlalchemy import event
+
+# PRAGMAs run on every new SQLite connection. Override single entries with
+# the SQLITE_PRAGMAS config, a value of None leaves SQLite's default.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "memory",
+}
+
+# PRAGMAs that write to the database file, skipped on read-only connections
+WRITE_PRAGMAS = {"journal_mode"}
+
+
+def configure_engines(app, db_path):
+    """
+    Points the default engine at the catalog and the "users" bind at the
+    same file.
+
+    With CATALOG_READ_ONLY (the default) catalog reads go through their own
+    pool of read-only connections (mode=ro, query_only), sized with
+    CATALOG_POOL_SIZE, and only the users pool can write. Scripts that load
+    or rebuild the catalog create the app with CATALOG_READ_ONLY=False.
+    """
+    read_only = app.config.get("CATALOG_READ_ONLY", True)
+
+    # sqlite3's per-connection prepared statement cache (default 128)
+    connect_args = {"cached_statements": app.config.get("SQLITE_STATEMENT_CACHE", 256)}
+
+    if read_only:
+        catalog_url = f"sqlite:///file:{db_path}?mode=ro&uri=true"
+    else:
+        catalog_url = f"sqlite:///{db_path}"
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = catalog_url
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {
+        "pool_size": app.config.get("CATALOG_POOL_SIZE", 16),
+        "max_overflow": app.config.get("CATALOG_POOL_OVERFLOW", 16),
+        "pool_timeout": 10,
+        "connect_args": connect_args,
+    })
+    app.config.setdefault("SQLALCHEMY_BINDS", {
+        "users": {
+            "url": f"sqlite:///{db_path}",
+            "pool_size": app.config.get("USERS_POOL_SIZE", 4),
+            "max_overflow": app.config.get("USERS_POOL_OVERFLOW", 4),
+            "pool_timeout": 10,
+            "connect_args": connect_args,
+        },
+    })
+
+
+def set_pragmas(engine, pragmas, read_only):
+    """Runs the PRAGMAs on every connection the engine opens."""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value is None or (read_only and name in WRITE_PRAGMAS):
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def init_engines(app, db):
+    """Applies the SQLite PRAGMA profile to the catalog and users engines."""
+    pragmas = {**DEFAULT_PRAGMAS, **app.config.get("SQLITE_PRAGMAS", {})}
+    read_only = app.config.get("CATALOG_READ_ONLY", True)
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == "sqlite":
+                set_pragmas(engine, pragmas, read_only and bind_key is None)
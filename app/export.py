@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from . import db
+from .models import Game, Rating, GameMedia
+from .relations import RELATIONS, load_relations, get_name_tables
+from .pagination import STREAM_BATCH_SIZE
+from .metrics import record_result_size
+
+# Columns of an exported game, in output order
+EXPORT_COLUMNS = {
+    "appid": Game.appid,
+    "name": Game.name,
+    "release_date": Game.release_date,
+    "developer": Game.developer,
+    "publisher": Game.publisher,
+    "english": Game.english,
+    "short_description": Game.short_description,
+    "price": Game.price,
+    "required_age": Rating.required_age,
+    "achievements": Rating.achievements,
+    "positive_ratings": Rating.positive_ratings,
+    "negative_ratings": Rating.negative_ratings,
+    "rating_pct": Rating.rating_pct,
+    "average_playtime": Rating.average_playtime,
+    "median_playtime": Rating.median_playtime,
+    "owners": Rating.owners,
+    "header_image": GameMedia.header_image,
+}
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_rows(after=None):
+    """
+    Yields batches of every game in appid order, after the `after` appid if
+    given. Rows are fetched STREAM_BATCH_SIZE at a time with yield_per.
+    """
+    stmt = (
+        select(*(column.label(name) for name, column in EXPORT_COLUMNS.items()))
+        .select_from(Game)
+        .outerjoin(Rating, Game.appid == Rating.appid)
+        .outerjoin(GameMedia, Game.appid == GameMedia.appid)
+        .order_by(Game.appid)
+    )
+    if after is not None:
+        stmt = stmt.where(Game.appid > after)
+
+    result = db.session.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    name_tables = get_name_tables()
+
+    for rows in result.partitions():
+        relations = load_relations([row.appid for row in rows], RELATIONS, name_tables=name_tables)
+        yield [
+            {**row._asdict(), **{relation: relations[relation].get(row.appid, []) for relation in RELATIONS}}
+            for row in rows
+        ]
+
+
+def encode_ndjson(batch, first):
+    return "".join(json.dumps(game, ensure_ascii=False) + "\n" for game in batch)
+
+
+def encode_csv(batch, first):
+    """CSV lines of a batch, relations joined with ";" as in the Steam dataset."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if first:
+        writer.writerow([*EXPORT_COLUMNS, *RELATIONS])
+
+    for game in batch:
+        writer.writerow([
+            *(game[name] for name in EXPORT_COLUMNS),
+            *(";".join(game[relation]) for relation in RELATIONS)
+        ])
+
+    return buffer.getvalue()
+
+
+def export_stream(export_format, after=None, compress=False):
+    """
+    Generates the export body chunk by chunk, optionally gzipped, so memory
+    use does not grow with the catalog. Resume an interrupted export with
+    the last appid received as `after`.
+    """
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    count = 0
+    for batch in export_rows(after):
+        data = encode(batch, first=count == 0).encode()
+        count += len(batch)
+
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+
+    # An empty CSV export still gets its header
+    if count == 0 and export_format == "csv":
+        data = encode([], first=True).encode()
+        yield compressor.compress(data) if compressor is not None else data
+
+    if compressor is not None:
+        yield compressor.flush()
+
+    record_result_size(count)
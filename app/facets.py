@@ -0,0 +1,196 @@
+import numpy as np
+from sqlalchemy import select
+from . import db
+from .catalog import catalog_index
+from .models import Game
+from .relations import RELATIONS, appid_in
+from .snapshot import get_catalog_snapshot
+
+# Facets whose values are matched case-insensitively (tags always were)
+CASE_INSENSITIVE_FACETS = {"tags"}
+
+# Latency budget of one columnar /games/facets request on the full catalog
+# (~27,000 games, ~460 facet values), checked by benchmarks/facets.py
+LATENCY_BUDGET_MS = 10
+
+
+class FacetIndex:
+    """
+    In-memory bitmap index of the catalog facets.
+
+    Every game gets a bit position (its rank by appid) and every genre,
+    category, platform and tag maps to a bitset of the games that have it.
+    Python ints serve as the bitsets, so AND/OR/NOT are single operations.
+    """
+
+    def __init__(self, appids, bitsets, labels):
+        self.appids = appids
+        self.positions = {appid: position for position, appid in enumerate(appids)}
+        self.bitsets = bitsets
+        self.labels = labels
+        self.all = (1 << len(appids)) - 1
+
+    @classmethod
+    def build(cls):
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            return cls.from_snapshot(snapshot)
+
+        appids = db.session.execute(select(Game.appid).order_by(Game.appid)).scalars().all()
+        positions = {appid: position for position, appid in enumerate(appids)}
+        size = (len(appids) + 7) // 8
+        bitsets = {}
+        labels = {}
+
+        for facet, (link, link_id, _, lookup_id, lookup_name) in RELATIONS.items():
+            names = dict(db.session.execute(select(lookup_id, lookup_name)).all())
+            masks = {}
+
+            # Set one bit per (game, value) link, a byte array per value
+            for appid, value_id in db.session.execute(select(link.appid, link_id)):
+                position = positions.get(appid)
+                name = names.get(value_id)
+                if position is None or name is None:
+                    continue
+                mask = masks.get(name)
+                if mask is None:
+                    mask = masks[name] = bytearray(size)
+                mask[position >> 3] |= 1 << (position & 7)
+
+            bitsets[facet] = {
+                cls.key(facet, name): int.from_bytes(mask, "little")
+                for name, mask in masks.items()
+            }
+            labels[facet] = {cls.key(facet, name): name for name in masks}
+
+        return cls(appids, bitsets, labels)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Builds the bitsets from the adjacency arrays of a mapped snapshot file."""
+        appids = snapshot.array("appid").tolist()
+        bitsets = {}
+        labels = {}
+
+        for facet in RELATIONS:
+            names = snapshot.lookup(facet)
+            masks = {}
+
+            for value_id, games in snapshot.postings(facet):
+                name = names.get(value_id)
+                if name is None:
+                    continue
+                mask = np.zeros(len(appids), dtype=bool)
+                mask[games] = True
+                bits = int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+                masks[name] = masks.get(name, 0) | bits
+
+            bitsets[facet] = {cls.key(facet, name): bits for name, bits in masks.items()}
+            labels[facet] = {cls.key(facet, name): name for name in masks}
+
+        return cls(appids, bitsets, labels)
+
+    @staticmethod
+    def key(facet, name):
+        return name.lower() if facet in CASE_INSENSITIVE_FACETS else name
+
+    def bitset(self, facet, name):
+        """Bitset of the games having one facet value (empty if unknown)."""
+        return self.bitsets[facet].get(self.key(facet, name), 0)
+
+    def resolve(self, facet, expression):
+        """
+        Resolves a facet filter expression to a bitset.
+
+        Comma separated terms must all match, "|" separates alternatives
+        within a term and a leading "!" excludes a value, e.g.
+        "RPG,Indie", "Action|Adventure" or "linux,!mac".
+        """
+        result = self.all
+
+        for term in expression.split(","):
+            term = term.strip()
+            if not term:
+                continue
+
+            negate = term.startswith("!")
+            if negate:
+                term = term[1:]
+
+            bits = 0
+            for alternative in term.split("|"):
+                bits |= self.bitset(facet, alternative.strip())
+
+            result &= ~bits if negate else bits
+
+        return result & self.all
+
+    def select(self, filters):
+        """Intersects the facet filters {facet: expression}; None if there are none."""
+        result = None
+
+        for facet, expression in filters.items():
+            if expression:
+                bits = self.resolve(facet, expression)
+                result = bits if result is None else result & bits
+
+        return result
+
+    def counts(self, bits):
+        """
+        Counts the games of `bits` having each facet value, as
+        {facet: {name: count}} sorted by count. Values with no games are left out.
+        """
+        counts = {}
+
+        for facet, values in self.bitsets.items():
+            labels = self.labels[facet]
+            facet_counts = []
+            for key, value_bits in values.items():
+                count = (bits & value_bits).bit_count()
+                if count:
+                    facet_counts.append((labels[key], count))
+            facet_counts.sort(key=lambda item: (-item[1], item[0]))
+            counts[facet] = dict(facet_counts)
+
+        return counts
+
+    def to_appids(self, bits):
+        """Lists the appids of the set bits, in appid order."""
+        appids = []
+        digits = bin(bits)[:1:-1]
+        position = digits.find("1")
+
+        while position != -1:
+            appids.append(self.appids[position])
+            position = digits.find("1", position + 1)
+
+        return appids
+
+    def from_appids(self, appids):
+        """Builds the bitset of a collection of appids."""
+        mask = bytearray((len(self.appids) + 7) // 8)
+        for appid in appids:
+            position = self.positions.get(appid)
+            if position is not None:
+                mask[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(mask, "little")
+
+
+def get_facet_index():
+    """Returns the facet index, rebuilt when the catalog is reloaded."""
+    return catalog_index("facet_index", FacetIndex.build)
+
+
+def facet_clause(filters):
+    """
+    Resolves facet filters {facet: expression} through the bitmap index and
+    returns the matching `Game.appid IN (...)` clause, or None without filters.
+    """
+    index = get_facet_index()
+    bits = index.select(filters)
+
+    if bits is None:
+        return None
+
+    return appid_in(Game.appid, index.to_appids(bits))
@@ -0,0 +1,91 @@
+from sqlalchemy import select
+from .models import Game, Rating, GameMedia
+from .relations import load_relations, get_name_tables
+
+# Result fields read from a column
+FIELD_COLUMNS = {
+    "appid": Game.appid,
+    "name": Game.name,
+    "release_date": Game.release_date,
+    "developer": Game.developer,
+    "publisher": Game.publisher,
+    "price": Game.price,
+    "overall_rating": Rating.rating_pct,
+    "header_image": GameMedia.header_image,
+}
+
+# Result fields loaded from a relation (see relations.RELATIONS)
+RELATION_FIELDS = ("genres", "categories", "platforms")
+
+# Fields of the /games and /games/by-tag results, in output order
+GAME_FIELDS = (
+    "appid", "name", "release_date", "developer", "publisher", "price",
+    "overall_rating", "header_image", "genres", "categories", "platforms",
+)
+TAG_FIELDS = ("appid", "name", "release_date", "price", "overall_rating", "header_image", "platforms")
+
+
+def parse_fields(value, allowed=GAME_FIELDS):
+    """
+    Parses a comma separated `fields` parameter into the requested fields,
+    in output order. Every allowed field when it is missing. Raises ValueError.
+    """
+    if not value:
+        return allowed
+
+    requested = set()
+    for field in value.split(","):
+        field = field.strip()
+        if field not in allowed:
+            raise ValueError(f"Invalid 'fields' value: {field}")
+        requested.add(field)
+
+    return tuple(field for field in allowed if field in requested)
+
+
+def select_fields(fields, join_all=True):
+    """
+    Selects the columns behind `fields`, plus the appid, one row per game.
+
+    With `join_all` both ratings and game_media are joined, as the search
+    filters and sorts expect. Without it only the tables holding a requested
+    column are, which is enough to load games already known to be listed.
+    """
+    selected = [field for field in fields if field in FIELD_COLUMNS and field != "appid"]
+    tables = {FIELD_COLUMNS[field].table for field in selected}
+
+    stmt = select(Game.appid, *(FIELD_COLUMNS[field].label(field) for field in selected)).select_from(Game)
+    if join_all or Rating.__table__ in tables:
+        stmt = stmt.join(Rating, Game.appid == Rating.appid)
+    if join_all or GameMedia.__table__ in tables:
+        stmt = stmt.join(GameMedia, Game.appid == GameMedia.appid)
+
+    return stmt
+
+
+def build_results(rows, fields):
+    """Builds the result dicts of a batch of rows made by select_fields."""
+    relations = [field for field in fields if field in RELATION_FIELDS]
+
+    # Batch-load only the requested relations of every result row
+    loaded = {}
+    if relations:
+        loaded = load_relations([row.appid for row in rows], relations, name_tables=get_name_tables())
+
+    results = []
+
+    for row in rows:
+        result = {}
+
+        for field in fields:
+            if field in loaded:
+                result[field] = loaded[field].get(row.appid, [])
+            elif field == "overall_rating":
+                # Overall rating as a percentage, None for games without ratings
+                result[field] = round(row.overall_rating, 2) if row.overall_rating is not None else None
+            else:
+                result[field] = getattr(row, field)
+
+        results.append(result)
+
+    return results
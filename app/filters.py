@@ -0,0 +1,116 @@
+from .models import Game, Rating
+from .search import name_filter
+from .facets import facet_clause
+from .fuzzy import fuzzy_appids
+from .relations import appid_in
+
+# Numeric range filters: `<name>_min` / `<name>_max` parameter -> column
+RANGE_FILTERS = {
+    "price": Game.price,
+    "rating": Rating.rating_pct,
+    "playtime": Rating.average_playtime,
+    "owners": Rating.owners_lower,
+}
+
+# Facet filter parameters of /games, /games/by-tag and /games/<appid>/similar -> facet index name
+GAME_FACETS = {"genre": "genres", "platform": "platforms", "category": "categories"}
+TAG_FACETS = {"tag": "tags", "platform": "platforms"}
+SIMILAR_FACETS = {"platform": "platforms"}
+
+# Extra text fields that can be searched along with the name
+SEARCH_FIELDS = ("developer", "publisher")
+
+# Name matching modes: word prefixes (FTS) or typo-tolerant trigram matching
+MATCH_MODES = ("exact", "fuzzy")
+
+# Accepted values of the release year filter
+RELEASE_YEARS = range(1970, 2101)
+
+
+def parse_filters(args, facet_params=GAME_FACETS, text_search=True):
+    """
+    Reads the search filters of a request into a plain dict (the "criteria"),
+    which can be compiled to SQL clauses or to NumPy masks. Without
+    `text_search` the name and release year filters are not read.
+    Raises ValueError.
+    """
+    criteria = {
+        "name": args.get("name") if text_search else None,
+        "match": args.get("match", "exact") if text_search else "exact",
+        "search_fields": ["name"],
+        "release_year": parse_release_year(args.get("release_year")) if text_search else None,
+        "facets": {facet: args.get(param) for param, facet in facet_params.items()},
+        "ranges": {},
+    }
+
+    # Developer and publisher can optionally be searched along with the name
+    for field in filter(None, args.get("search_in", "").split(",") if text_search else []):
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"Invalid 'search_in' field: {field}")
+        if field not in criteria["search_fields"]:
+            criteria["search_fields"].append(field)
+
+    if criteria["match"] not in MATCH_MODES:
+        raise ValueError(f"Invalid 'match' mode: {criteria['match']}")
+    if criteria["match"] == "fuzzy" and len(criteria["search_fields"]) > 1:
+        raise ValueError("Fuzzy matching only searches names, 'search_in' cannot be used with it")
+
+    for name in RANGE_FILTERS:
+        low = args.get(f"{name}_min", type=float)
+        high = args.get(f"{name}_max", type=float)
+        if low is not None or high is not None:
+            criteria["ranges"][name] = (low, high)
+
+    return criteria
+
+
+def parse_release_year(value):
+    """Parses the release year filter, None when absent. Raises ValueError."""
+    if value is None:
+        return None
+    try:
+        year = int(value)
+    except ValueError:
+        year = None
+    if year not in RELEASE_YEARS:
+        raise ValueError(
+            f"Invalid 'release_year' parameter, must be a year from {RELEASE_YEARS[0]} to {RELEASE_YEARS[-1]}"
+        )
+    return year
+
+
+def has_filters(criteria):
+    """Whether the criteria restrict the catalog at all."""
+    return bool(
+        criteria["name"]
+        or criteria["release_year"] is not None
+        or any(criteria["facets"].values())
+        or criteria["ranges"]
+    )
+
+
+def sql_filters(criteria):
+    """Compiles the criteria into WHERE clauses over Game and Rating."""
+    filters = []
+
+    if criteria["name"] and criteria["match"] == "fuzzy":
+        filters.append(appid_in(Game.appid, fuzzy_appids(criteria["name"])))
+    elif criteria["name"]:
+        filters.append(name_filter(criteria["name"], criteria["search_fields"]))
+
+    if criteria["release_year"] is not None:
+        filters.append(Game.release_year == criteria["release_year"])
+
+    # Facet filters are resolved through the in-memory bitmap index
+    facets = facet_clause(criteria["facets"])
+    if facets is not None:
+        filters.append(facets)
+
+    for name, (low, high) in criteria["ranges"].items():
+        column = RANGE_FILTERS[name]
+        if low is not None:
+            filters.append(column >= low)
+        if high is not None:
+            filters.append(column <= high)
+
+    return filters
@@ -0,0 +1,120 @@
+import json
+import threading
+from collections import OrderedDict
+from flask import current_app
+from . import db
+from .catalog import catalog_index
+from .fields import GAME_FIELDS, TAG_FIELDS, select_fields, build_results
+from .models import Game
+
+# Result shapes kept pre-encoded: the default fields of /games and /games/by-tag
+FRAGMENT_SHAPES = (GAME_FIELDS, TAG_FIELDS)
+
+# Rows encoded per query when precomputing every fragment
+PRECOMPUTE_BATCH_SIZE = 2000
+
+
+class FragmentStore:
+    """
+    Size-bounded LRU of the JSON encoding of single results.
+
+    Keys are (fields, appid) and values the UTF-8 bytes of
+    json.dumps(result, ensure_ascii=False), so a page of results is the
+    join of its games' fragments. A game's payload only changes with the
+    catalog, and a new store is made for every catalog version, so entries
+    never go stale. With `precompute` every listed game of every shape is
+    encoded up front and the size bound does not apply.
+    """
+
+    def __init__(self, max_bytes, precompute=False):
+        self.max_bytes = max_bytes
+        self.precompute = precompute
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls):
+        store = cls(
+            current_app.config.get("FRAGMENT_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+            current_app.config.get("FRAGMENTS_PRECOMPUTE", False)
+        )
+
+        if store.precompute:
+            for fields in FRAGMENT_SHAPES:
+                result = db.session.execute(
+                    select_fields(fields).order_by(Game.appid).execution_options(yield_per=PRECOMPUTE_BATCH_SIZE)
+                )
+                for rows in result.partitions():
+                    store.put(fields, encode_results(rows, fields))
+
+        return store
+
+    def get(self, fields, appids):
+        """Returns {appid: fragment} of the appids found, refreshing their LRU position."""
+        found = {}
+
+        with self._lock:
+            for appid in appids:
+                fragment = self._entries.get((fields, appid))
+                if fragment is not None:
+                    found[appid] = fragment
+                    if not self.precompute:
+                        self._entries.move_to_end((fields, appid))
+
+        return found
+
+    def put(self, fields, fragments):
+        """Stores {appid: fragment}, evicting the least recently used beyond max_bytes."""
+        with self._lock:
+            for appid, fragment in fragments.items():
+                key = (fields, appid)
+                if key in self._entries:
+                    self.size -= len(self._entries.pop(key))
+                self._entries[key] = fragment
+                self.size += len(fragment)
+
+            while not self.precompute and self.size > self.max_bytes:
+                self.size -= len(self._entries.popitem(last=False)[1])
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "precomputed": self.precompute}
+
+
+def get_fragment_store():
+    """Returns the fragment store of the current catalog version."""
+    return catalog_index("fragment_store", FragmentStore.build)
+
+
+def fragments_enabled(fields):
+    """Whether results of these fields are served from pre-encoded fragments."""
+    return current_app.config.get("RESULT_FRAGMENTS", True) and fields in FRAGMENT_SHAPES
+
+
+def encode_results(rows, fields):
+    """Encodes a batch of select_fields rows as {appid: fragment}."""
+    return {
+        row.appid: json.dumps(result, ensure_ascii=False).encode()
+        for row, result in zip(rows, build_results(rows, fields))
+    }
+
+
+def result_fragments(appids, fields, load):
+    """
+    Returns the fragments of the given appids, in that order.
+
+    Games not in the store are loaded with `load(appids)`, which returns
+    their select_fields rows, then encoded and stored. Appids without a
+    row are left out, like hydrate() does.
+    """
+    store = get_fragment_store()
+    found = store.get(fields, appids)
+
+    missing = [appid for appid in appids if appid not in found]
+    if missing:
+        encoded = encode_results(load(missing), fields)
+        store.put(fields, encoded)
+        found.update(encoded)
+
+    return [found[appid] for appid in appids if appid in found]
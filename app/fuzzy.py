@@ -0,0 +1,147 @@
+import math
+import numpy as np
+from sqlalchemy import select
+from . import db
+from .catalog import catalog_index
+from .models import Game
+from .snapshot import get_catalog_snapshot
+from .suggest import normalise
+
+# Share of the query's trigrams a name needs to become a candidate
+MIN_OVERLAP = 0.3
+
+# A candidate matches with this share of the query's trigrams, or when its
+# closest words are within MAX_TYPO_RATIO edits per character of the query
+MATCH_OVERLAP = 0.6
+MAX_TYPO_RATIO = 0.25
+
+# Most candidates below MATCH_OVERLAP checked with the edit distance, best overlap first
+MAX_CANDIDATES = 200
+
+
+def trigrams(text):
+    """The trigrams of a normalised text, each word padded like pg_trgm ("  w", " wi", ..., "er ")."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[start:start + 3] for start in range(len(padded) - 2))
+    return grams
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between two strings, or limit + 1 once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+
+    return previous[-1]
+
+
+def window_distance(query, name, limit):
+    """Smallest edit distance between the query and a run of as many words of the name."""
+    words = name.split()
+    size = len(query.split())
+    best = limit + 1
+
+    for start in range(max(len(words) - size + 1, 1)):
+        best = min(best, edit_distance(query, " ".join(words[start:start + size]), limit))
+        if best == 0:
+            break
+
+    return best
+
+
+class TrigramIndex:
+    """
+    In-memory trigram inverted index over the normalised game names.
+
+    Each trigram maps to a NumPy array of the games containing it. A search
+    counts how many trigrams each game shares with the query (a bincount
+    over the query's posting lists only). Games sharing most of them match
+    outright, and the edit distance is only computed for a bounded set of
+    weaker candidates, never for the whole table.
+
+    Matches are scored by trigram similarity (shared trigrams over the
+    trigrams of either text, as pg_trgm does), so an exact name scores 1.
+    """
+
+    def __init__(self, appids, names, postings, sizes):
+        self.appids = appids
+        self.names = names
+        self.postings = postings
+        self.sizes = sizes
+
+    @classmethod
+    def build(cls):
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            appids = snapshot.array("appid")
+            names = [normalise(name) for name in snapshot.strings("name")]
+        else:
+            rows = db.session.execute(select(Game.appid, Game.name).order_by(Game.appid)).all()
+            appids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            names = [normalise(row[1] or "") for row in rows]
+
+        lists = {}
+        for game, name in enumerate(names):
+            for gram in trigrams(name):
+                lists.setdefault(gram, []).append(game)
+
+        postings = {gram: np.array(games, dtype=np.int32) for gram, games in lists.items()}
+        sizes = np.fromiter((len(trigrams(name)) for name in names), dtype=np.int32, count=len(names))
+        return cls(appids, names, postings, sizes)
+
+    def search(self, text):
+        """Returns the appids of the games whose name fuzzily matches `text`."""
+        return self.scores(text)[0].tolist()
+
+    def scores(self, text):
+        """
+        Returns (appids, similarities) of the games whose name fuzzily
+        matches `text`, as NumPy arrays in appid order.
+        """
+        query = normalise(text)
+        grams = trigrams(query)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        # Share of the query's trigrams found in each game's name
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        overlap = shared / len(grams)
+        matches = np.flatnonzero(overlap >= MATCH_OVERLAP)
+
+        # Weaker candidates match if close enough by edit distance, best overlap first
+        candidates = np.flatnonzero((overlap >= MIN_OVERLAP) & (overlap < MATCH_OVERLAP))
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = candidates[np.argpartition(-overlap[candidates], MAX_CANDIDATES)[:MAX_CANDIDATES]]
+
+        limit = max(1, math.floor(len(query) * MAX_TYPO_RATIO))
+        close = [game for game in candidates.tolist() if window_distance(query, self.names[game], limit) <= limit]
+
+        games = np.union1d(matches, close).astype(np.int64)
+        similarity = shared[games] / (len(grams) + self.sizes[games] - shared[games])
+        return self.appids[games], similarity
+
+
+def get_trigram_index():
+    """Returns the trigram index, rebuilt when the catalog is reloaded."""
+    return catalog_index("trigram_index", TrigramIndex.build)
+
+
+def fuzzy_appids(text):
+    """Appids of the games whose name fuzzily matches `text`."""
+    return get_trigram_index().search(text)
+
+
+def fuzzy_scores(text):
+    """(appids, similarities) of the games whose name fuzzily matches `text`."""
+    return get_trigram_index().scores(text)
@@ -0,0 +1,344 @@
+import csv
+import os
+import sys
+import time
+from sqlalchemy import select, delete, update, insert, func, bindparam, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import db
+from .models import Game, Rating, GameMedia, StatsRollup
+from .relations import RELATIONS, appid_in
+from .derived import ensure_derived_columns, drop_catalog_indexes, create_catalog_indexes, refresh_derived
+from .search import drop_fts_triggers, create_fts_index
+from .catalog import bump_catalog_version
+from .stats import Rollups, rebuild_rollups
+
+# Source rows read and written per executemany
+CHUNK_SIZE = 5000
+
+# Files of the Steam Store Games dataset
+STEAM_FILE = "steam.csv"
+DESCRIPTION_FILE = "steam_description_data.csv"
+MEDIA_FILE = "steam_media_data.csv"
+
+# steam.csv columns of each table -> type the value is converted to
+GAME_COLUMNS = {
+    "appid": int,
+    "name": str,
+    "release_date": str,
+    "english": int,
+    "developer": str,
+    "publisher": str,
+    "price": float,
+}
+RATING_COLUMNS = {
+    "appid": int,
+    "required_age": int,
+    "achievements": int,
+    "positive_ratings": int,
+    "negative_ratings": int,
+    "average_playtime": int,
+    "median_playtime": int,
+    "owners": str,
+}
+
+# steam.csv column of each relation, values separated by ";"
+RELATION_COLUMNS = {
+    "genres": "genres",
+    "categories": "categories",
+    "platforms": "platforms",
+    "tags": "steamspy_tags",
+}
+
+
+def convert(value, to_type):
+    """Converts a CSV value, empty numbers becoming NULL."""
+    if value is None:
+        return None
+    if value == "":
+        return "" if to_type is str else None
+    return to_type(value)
+
+
+def split_names(value):
+    """Splits a ";" separated list of names, dropping blanks and duplicates."""
+    return list(dict.fromkeys(name.strip() for name in (value or "").split(";") if name.strip()))
+
+
+def read_chunks(path, size=CHUNK_SIZE):
+    """Streams a CSV file as lists of at most `size` row dicts."""
+    # Descriptions hold whole HTML pages, well over the csv module's default field limit
+    csv.field_size_limit(sys.maxsize)
+
+    with open(path, newline="", encoding="utf-8") as file:
+        chunk = []
+        for row in csv.DictReader(file):
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class CatalogImporter:
+    """
+    Loads the Steam Store Games CSVs into the catalog tables.
+
+    A full import replaces the catalog in one transaction: secondary
+    indexes and FTS triggers are dropped, every table is emptied and
+    reloaded with executemany, then the indexes, derived columns and FTS
+    index are rebuilt. An incremental import compares each chunk with the
+    stored rows and only upserts the appids that changed. Both bump the
+    catalog version so running workers reload their in-memory indexes.
+
+    The stats rollups are recomputed by a full import. An incremental one
+    takes the rewritten games out of them before the write and adds them
+    back after, so only their groups change.
+    """
+
+    def __init__(self, connection, incremental=False, chunk_size=CHUNK_SIZE):
+        self.connection = connection
+        self.incremental = incremental
+        self.chunk_size = chunk_size
+        self.changed = set()
+        self.stats = {}
+        self.names = {}
+        self.next_ids = {}
+        self.rollups = None
+        self.rewritten = set()
+
+    def run(self, directory):
+        """Imports the dataset files found in `directory`, returning {stage: (rows, seconds)}."""
+        tables = [model.__table__ for model in (Game, Rating, GameMedia)]
+        tables += [model.__table__ for link, _, lookup, _, _ in RELATIONS.values() for model in (lookup, link)]
+        tables.append(StatsRollup.__table__)
+        db.metadata.create_all(self.connection, tables=tables)
+        ensure_derived_columns(self.connection)
+
+        if not self.incremental:
+            drop_fts_triggers(self.connection)
+            drop_catalog_indexes(self.connection)
+            self.clear()
+        else:
+            self.rollups = Rollups.load(self.connection)
+
+        self.load_lookups()
+
+        self.timed("games", self.import_games, os.path.join(directory, STEAM_FILE))
+
+        for name, stage in ((DESCRIPTION_FILE, self.import_descriptions), (MEDIA_FILE, self.import_media)):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                self.timed(name.removesuffix(".csv"), stage, path)
+
+        start = time.perf_counter()
+        if not self.incremental:
+            create_catalog_indexes(self.connection)
+            refresh_derived(self.connection)
+            create_fts_index(self.connection)
+            rebuild_rollups(self.connection)
+            self.connection.execute(text("ANALYZE"))
+            bump_catalog_version(self.connection)
+        elif self.changed:
+            refresh_derived(self.connection, self.changed)
+            self.update_rollups()
+            bump_catalog_version(self.connection)
+        rebuilt = len(self.changed) if self.incremental else self.stats["games"][0]
+        self.stats["rebuild"] = (rebuilt, time.perf_counter() - start)
+
+        return self.stats
+
+    def timed(self, stage, function, path):
+        start = time.perf_counter()
+        rows = function(path)
+        self.stats[stage] = (rows, time.perf_counter() - start)
+
+    def update_rollups(self):
+        """Adds the rewritten games back to the rollups, or builds them if there were none."""
+        if self.rollups is None:
+            rebuild_rollups(self.connection)
+            return
+
+        self.rollups.add(self.connection, self.rewritten)
+        self.rollups.save(self.connection)
+
+    def clear(self):
+        """Empties every catalog table, link tables first."""
+        for link, _, lookup, _, _ in RELATIONS.values():
+            self.connection.execute(delete(link))
+            self.connection.execute(delete(lookup))
+        for model in (GameMedia, Rating, Game):
+            self.connection.execute(delete(model))
+
+    def load_lookups(self):
+        """Loads the name -> id map of every lookup table, new names get the next free id."""
+        for relation, (_, _, lookup, lookup_id, lookup_name) in RELATIONS.items():
+            rows = self.connection.execute(select(lookup_name, lookup_id)).all()
+            self.names[relation] = {name: row_id for name, row_id in rows}
+            self.next_ids[relation] = (self.connection.execute(select(func.max(lookup_id))).scalar() or 0) + 1
+
+    def lookup_ids(self, relation, names):
+        """Maps names to lookup ids, inserting the names not seen yet."""
+        _, _, lookup, lookup_id, lookup_name = RELATIONS[relation]
+        known = self.names[relation]
+
+        new = []
+        for name in names:
+            if name not in known:
+                known[name] = self.next_ids[relation]
+                self.next_ids[relation] += 1
+                new.append({lookup_id.key: known[name], lookup_name.key: name})
+
+        if new:
+            self.connection.execute(insert(lookup), new)
+
+        return [known[name] for name in names]
+
+    def stored_games(self, appids):
+        """The stored games, ratings and relations of some appids, as compared with source rows."""
+        stored = {}
+
+        game_columns = [getattr(Game, column) for column in GAME_COLUMNS]
+        for row in self.connection.execute(select(*game_columns).where(appid_in(Game.appid, appids))):
+            stored[row.appid] = {"game": tuple(row), "rating": None}
+
+        rating_columns = [getattr(Rating, column) for column in RATING_COLUMNS]
+        for row in self.connection.execute(select(*rating_columns).where(appid_in(Rating.appid, appids))):
+            if row.appid in stored:
+                stored[row.appid]["rating"] = tuple(row)
+
+        for relation, (link, link_id, lookup, lookup_id, lookup_name) in RELATIONS.items():
+            rows = self.connection.execute(
+                select(link.appid, lookup_name)
+                .join(lookup, link_id == lookup_id)
+                .where(appid_in(link.appid, appids))
+            )
+            for appid, name in rows:
+                if appid in stored:
+                    stored[appid].setdefault(relation, set()).add(name)
+
+        return stored
+
+    def import_games(self, path):
+        """Streams steam.csv into games, ratings, the lookup tables and the link tables."""
+        count = 0
+
+        for chunk in read_chunks(path, self.chunk_size):
+            games, ratings, relations = [], [], {relation: {} for relation in RELATIONS}
+
+            for row in chunk:
+                games.append({column: convert(row.get(column), to_type) for column, to_type in GAME_COLUMNS.items()})
+                ratings.append({column: convert(row.get(column), to_type) for column, to_type in RATING_COLUMNS.items()})
+                for relation, column in RELATION_COLUMNS.items():
+                    relations[relation][games[-1]["appid"]] = split_names(row.get(column))
+
+            # Incremental imports only write the appids whose data differs from the database
+            if self.incremental:
+                stored = self.stored_games([game["appid"] for game in games])
+                keep = set()
+                for game, rating in zip(games, ratings):
+                    appid = game["appid"]
+                    current = stored.get(appid)
+                    if (
+                        current is None
+                        or current["game"] != tuple(game.values())
+                        or current["rating"] != tuple(rating.values())
+                        or any(current.get(relation, set()) != set(relations[relation][appid]) for relation in RELATIONS)
+                    ):
+                        keep.add(appid)
+
+                games = [game for game in games if game["appid"] in keep]
+                ratings = [rating for rating in ratings if rating["appid"] in keep]
+                self.changed.update(keep)
+
+            if games:
+                self.write_games(games, ratings, relations)
+            count += len(chunk)
+
+        return count
+
+    def write_games(self, games, ratings, relations):
+        appids = [game["appid"] for game in games]
+
+        if self.incremental:
+            # Take the games out of the rollups while their old data is still there
+            if self.rollups is not None:
+                self.rollups.remove(self.connection, appids)
+            self.rewritten.update(appids)
+
+            self.upsert(Game, games, short_description="")
+            self.upsert(Rating, ratings)
+            for link, *_ in RELATIONS.values():
+                self.connection.execute(delete(link).where(appid_in(link.appid, appids)))
+        else:
+            self.connection.execute(insert(Game).values(short_description=""), games)
+            self.connection.execute(insert(Rating), ratings)
+
+        for relation, (link, link_id, *_) in RELATIONS.items():
+            links = []
+            for appid in appids:
+                names = relations[relation][appid]
+                for row_id in self.lookup_ids(relation, names):
+                    links.append({"appid": appid, link_id.key: row_id})
+            if links:
+                self.connection.execute(insert(link), links)
+
+    def upsert(self, model, rows, **defaults):
+        """Inserts rows (with `defaults` for new ones), updating the existing ones with the same appid."""
+        stmt = sqlite_insert(model).values(**defaults)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["appid"],
+            set_={column: stmt.excluded[column] for column in rows[0] if column != "appid"}
+        )
+        self.connection.execute(stmt, rows)
+
+    def import_descriptions(self, path):
+        """Streams the short descriptions into games."""
+        stmt = (
+            update(Game.__table__)
+            .where(Game.__table__.c.appid == bindparam("key_appid"))
+            .values(short_description=bindparam("description"))
+        )
+        count = 0
+
+        for chunk in read_chunks(path, self.chunk_size):
+            params = {int(row["steam_appid"]): row.get("short_description") or None for row in chunk}
+
+            if self.incremental:
+                stored = dict(self.connection.execute(
+                    select(Game.appid, Game.short_description).where(appid_in(Game.appid, params))
+                ).all())
+                params = {appid: value for appid, value in params.items() if appid in stored and stored[appid] != value}
+                self.changed.update(params)
+
+            if params:
+                self.connection.execute(stmt, [
+                    {"key_appid": appid, "description": value} for appid, value in params.items()
+                ])
+            count += len(chunk)
+
+        return count
+
+    def import_media(self, path):
+        """Streams the header images into game_media."""
+        count = 0
+
+        for chunk in read_chunks(path, self.chunk_size):
+            rows = {int(row["steam_appid"]): row.get("header_image") or None for row in chunk}
+
+            if self.incremental:
+                stored = dict(self.connection.execute(
+                    select(GameMedia.appid, GameMedia.header_image).where(appid_in(GameMedia.appid, rows))
+                ).all())
+                rows = {appid: value for appid, value in rows.items() if appid not in stored or stored[appid] != value}
+                self.changed.update(rows)
+
+            if rows:
+                params = [{"appid": appid, "header_image": value} for appid, value in rows.items()]
+                if self.incremental:
+                    self.upsert(GameMedia, params)
+                else:
+                    self.connection.execute(insert(GameMedia), params)
+            count += len(chunk)
+
+        return count
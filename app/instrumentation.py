@@ -0,0 +1,119 @@
+import logging
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Most SQL statements kept per request for the slow request log
+MAX_LOGGED_STATEMENTS = 50
+
+
+class RequestTimings:
+    """Per-request phase durations and SQL statement totals, in seconds."""
+
+    __slots__ = ("start", "phases", "sql_count", "sql_time", "statements")
+
+    def __init__(self, keep_statements):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = [] if keep_statements else None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self):
+        """Formats the timings as a Server-Timing header value (durations in ms)."""
+        parts = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in self.phases.items()]
+        parts.append(f'db;desc="{self.sql_count} queries";dur={self.sql_time * 1000:.2f}')
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def current_timings():
+    """The timings of the current request, None outside requests or when disabled."""
+    if has_request_context():
+        return g.get("timings")
+    return None
+
+
+@contextmanager
+def timed(phase):
+    """Adds the duration of the block to a phase of the current request."""
+    timings = current_timings()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timings() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current_timings()
+    starts = conn.info.get("query_start")
+    if timings is None or not starts:
+        return
+
+    elapsed = time.perf_counter() - starts.pop()
+    timings.sql_count += 1
+    timings.sql_time += elapsed
+
+    if timings.statements is not None and len(timings.statements) < MAX_LOGGED_STATEMENTS:
+        timings.statements.append((elapsed, statement))
+
+
+def init_instrumentation(app):
+    """
+    Times every request: SQL statements are counted and timed through
+    SQLAlchemy engine events, and code wrapped in timed() adds named phases
+    (auth, query, serialize). The result is sent as a Server-Timing header.
+
+    INSTRUMENTATION turns it off; requests slower than SLOW_REQUEST_MS are
+    logged with their SQL statements.
+    """
+    if not app.config.get("INSTRUMENTATION", True):
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+    @app.before_request
+    def start_timings():
+        g.timings = RequestTimings(keep_statements=app.config.get("SLOW_REQUEST_MS") is not None)
+
+    @app.after_request
+    def send_timings(response):
+        timings = g.pop("timings", None)
+        if timings is None:
+            return response
+
+        response.headers["Server-Timing"] = timings.server_timing()
+
+        slow_ms = app.config.get("SLOW_REQUEST_MS")
+        elapsed_ms = (time.perf_counter() - timings.start) * 1000
+        if slow_ms is not None and elapsed_ms >= slow_ms:
+            statements = "\n".join(
+                f"  {seconds * 1000:8.2f} ms  {' '.join(statement.split())}"
+                for seconds, statement in timings.statements
+            )
+            logger.warning(
+                "Slow request %s %s: %.1f ms, %d queries (%.1f ms)\n%s",
+                request.method, request.full_path, elapsed_ms,
+                timings.sql_count, timings.sql_time * 1000, statements
+            )
+
+        return response
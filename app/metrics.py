@@ -0,0 +1,286 @@
+import glob
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import threading
+import time
+from flask import Blueprint, Response, current_app, g, request
+
+# Latency buckets in seconds and result-size buckets in rows
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESULT_SIZE_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+# Endpoints with their own series; other endpoints are not measured
+ROUTES = (
+    "api.get_games",
+    "api.get_games_batch",
+    "api.get_game_suggestions",
+    "api.get_similar_games",
+    "api.get_games_by_tag",
+    "api.get_game_facets",
+    "api.get_tags",
+    "api.get_stats",
+    "api.export_catalog",
+    "auth.login",
+    "auth.register",
+    "auth.logout",
+)
+
+# Reasons token_required can reject a request for
+AUTH_FAILURE_REASONS = (
+    "missing_header",
+    "invalid_header",
+    "missing_user",
+    "user_not_found",
+    "expired",
+    "invalid_token",
+)
+
+STATUS_CLASSES = ("2xx", "3xx", "4xx", "5xx")
+
+# Outcomes of a token cache lookup in token_required (see token_cache.py)
+TOKEN_CACHE_RESULTS = ("hit", "miss")
+
+# Reasons admission control can reject a request for (see admission.py)
+ADMISSION_REJECTIONS = ("rate_limited", "overloaded")
+
+
+class Metric:
+    """
+    A counter or fixed-bucket histogram with one series per label value
+    (a tuple of values when there are several labels).
+
+    Values live in slots of the registry's shared float64 array: a counter
+    uses one slot per series, a histogram one per bucket plus +Inf, sum
+    and count.
+    """
+
+    def __init__(self, registry, name, kind, help_text, label, values, buckets=()):
+        self.registry = registry
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.labels = (label,) if isinstance(label, str) else label
+        self.values = [value if isinstance(value, tuple) else (value,) for value in values]
+        self.buckets = buckets
+        self.width = len(buckets) + 3 if kind == "histogram" else 1
+        self.offset = registry.allocate(len(values) * self.width)
+        self.index = {value: position for position, value in enumerate(self.values)}
+        self.lock = threading.Lock()
+
+    def inc(self, value, amount=1):
+        position = self.index.get(value if isinstance(value, tuple) else (value,))
+        if position is None or self.registry.slots is None:
+            return
+        slot = self.offset + position * self.width
+        with self.lock:
+            self.registry.slots[slot] += amount
+
+    def observe(self, value, measurement):
+        position = self.index.get(value if isinstance(value, tuple) else (value,))
+        if position is None or self.registry.slots is None:
+            return
+        base = self.offset + position * self.width
+
+        bucket = len(self.buckets)
+        for number, bound in enumerate(self.buckets):
+            if measurement <= bound:
+                bucket = number
+                break
+
+        slots = self.registry.slots
+        with self.lock:
+            slots[base + bucket] += 1
+            slots[base + self.width - 2] += measurement
+            slots[base + self.width - 1] += 1
+
+    def expose(self, values):
+        """Renders the metric in the Prometheus text format from aggregated slot values."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+        for position, label_values in enumerate(self.values):
+            base = self.offset + position * self.width
+            label = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+
+            if self.kind == "counter":
+                lines.append(f"{self.name}{{{label}}} {format_value(values[base])}")
+                continue
+
+            cumulative = 0.0
+            for number, bound in enumerate(self.buckets):
+                cumulative += values[base + number]
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {format_value(cumulative)}')
+            cumulative += values[base + len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {format_value(cumulative)}')
+            lines.append(f"{self.name}_sum{{{label}}} {format_value(values[base + self.width - 2])}")
+            lines.append(f"{self.name}_count{{{label}}} {format_value(values[base + self.width - 1])}")
+
+        return "\n".join(lines)
+
+
+def format_value(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics store.
+
+    Every metric is declared up front, so each process lays out the same
+    slots. Without a directory the slots are plain memory. With one, each
+    process maps its own `metrics_<pid>.db` file and /metrics sums every
+    file in the directory, aggregating the workers of a pre-fork server.
+    """
+
+    HEADER = struct.Struct("<16sQ")
+
+    def __init__(self):
+        self.metrics = []
+        self.size = 0
+        self.slots = None
+        self.directory = None
+        self.pid = None
+
+    def allocate(self, count):
+        offset = self.size
+        self.size += count
+        return offset
+
+    def counter(self, name, help_text, label, values):
+        metric = Metric(self, name, "counter", help_text, label, values)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label, values, buckets):
+        metric = Metric(self, name, "histogram", help_text, label, values, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def layout_hash(self):
+        layout = ";".join(f"{m.name}:{m.kind}:{m.width}:{m.values}" for m in self.metrics)
+        return hashlib.blake2b(layout.encode(), digest_size=16).digest()
+
+    def open(self, directory=None):
+        """Allocates the slots, in memory or in this process's file under `directory`."""
+        if self.slots is not None and self.pid == os.getpid() and self.directory == directory:
+            return
+
+        self.directory = directory
+        self.pid = os.getpid()
+
+        if directory is None:
+            self.slots = memoryview(bytearray(self.size * 8)).cast("d")
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics_{self.pid}.db")
+        length = self.HEADER.size + self.size * 8
+
+        with open(path, "a+b") as file:
+            file.truncate(length)
+            mapped = mmap.mmap(file.fileno(), length)
+
+        self.HEADER.pack_into(mapped, 0, self.layout_hash(), self.size)
+        self.slots = memoryview(mapped)[self.HEADER.size:].cast("d")
+
+    def collect(self):
+        """Sums the slots of every process sharing the directory (or just this one)."""
+        if self.directory is None:
+            return list(self.slots)
+
+        totals = [0.0] * self.size
+        layout = self.layout_hash()
+
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.db")):
+            try:
+                with open(path, "rb") as file:
+                    data = file.read()
+            except OSError:
+                continue
+
+            if len(data) < self.HEADER.size:
+                continue
+            file_layout, size = self.HEADER.unpack_from(data, 0)
+            if file_layout != layout or size != self.size:
+                continue
+
+            values = memoryview(data)[self.HEADER.size:self.HEADER.size + size * 8].cast("d")
+            for slot, value in enumerate(values):
+                totals[slot] += value
+
+        return totals
+
+    def expose(self):
+        values = self.collect()
+        return "\n".join(metric.expose(values) for metric in self.metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "api_request_duration_seconds", "Request latency by route.", "route", ROUTES, LATENCY_BUCKETS
+)
+result_size = registry.histogram(
+    "api_result_size", "Number of results returned by route.", "route", ROUTES, RESULT_SIZE_BUCKETS
+)
+responses = registry.counter(
+    "api_responses_total", "Responses by route and status class.", ("route", "status"),
+    list(itertools.product(ROUTES, STATUS_CLASSES))
+)
+auth_failures = registry.counter(
+    "api_auth_failures_total", "Requests rejected by token_required, by reason.", "reason", AUTH_FAILURE_REASONS
+)
+token_cache_lookups = registry.counter(
+    "api_token_cache_lookups_total", "Token cache lookups by token_required, by result.", "result",
+    TOKEN_CACHE_RESULTS
+)
+admission_rejections = registry.counter(
+    "api_admission_rejections_total", "Requests rejected by the rate and concurrency limits.", "reason",
+    ADMISSION_REJECTIONS
+)
+
+def record_result_size(count):
+    """
+    Records the number of results the current endpoint returned. The count
+    is also kept in `g.result_size`, so the response cache can record it
+    again whenever it serves the response.
+    """
+    result_size.observe(request.endpoint, count)
+    g.result_size = count
+
+
+def init_metrics(app):
+    """
+    Measures request latency and status per route and serves /metrics.
+
+    Disabled with METRICS_ENABLED. Set METRICS_DIR to a directory shared by
+    the worker processes to aggregate them (clear it when the server starts).
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    @app.before_request
+    def open_registry():
+        registry.open(app.config.get("METRICS_DIR"))
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def measure_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None and (request.endpoint,) in request_duration.index:
+            request_duration.observe(request.endpoint, time.perf_counter() - start)
+            responses.inc((request.endpoint, f"{response.status_code // 100}xx"))
+        return response
+
+    app.register_blueprint(metrics_bp)
+
+
+# Blueprint for the metrics endpoint
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    registry.open(current_app.config.get("METRICS_DIR"))
+    return Response(registry.expose(), mimetype="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Text, Float
+from sqlalchemy import Integer, String, Text, Float, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
@@ -17,6 +17,16 @@ class Game(db.Model):
     short_description: Mapped[str] = mapped_column(Text)
     price: Mapped[float] = mapped_column(Float)
 
+    # Derived from release_date by build_derived.py
+    release_year: Mapped[int] = mapped_column(Integer, nullable=True)
+    release_date_key: Mapped[int] = mapped_column(Integer, nullable=True)  # YYYYMMDD
+
+    __table_args__ = (
+        Index("ix_games_price", "price", "appid"),
+        Index("ix_games_release_year_price", "release_year", "price", "appid"),
+        Index("ix_games_release_date_key", "release_date_key", "appid"),
+    )
+
 
 class Rating(db.Model):
     __tablename__ = "ratings"
@@ -30,6 +40,16 @@ class Rating(db.Model):
     achievements: Mapped[int] = mapped_column(Integer)
     required_age: Mapped[int] = mapped_column(Integer)
 
+    # Derived from the rating counts by build_derived.py
+    total_ratings: Mapped[int] = mapped_column(Integer, nullable=True)
+    rating_pct: Mapped[float] = mapped_column(Float, nullable=True)
+    owners_lower: Mapped[int] = mapped_column(Integer, nullable=True)  # lower bound of `owners`
+
+    __table_args__ = (
+        Index("ix_ratings_rating_pct", "rating_pct", "appid"),
+        Index("ix_ratings_total_ratings", "total_ratings", "appid"),
+    )
+
 
 class GameMedia(db.Model):
     __tablename__ = "game_media"
@@ -51,6 +71,11 @@ class GameCategory(db.Model):
     appid: Mapped[int] = mapped_column(primary_key=True)
     category_id: Mapped[int] = mapped_column(primary_key=True)
 
+    # Look up the games of one category without scanning the table
+    __table_args__ = (
+        Index("ix_game_categories_category_id", "category_id", "appid"),
+    )
+
 
 class Genre(db.Model):
     __tablename__ = "genres"
@@ -65,6 +90,11 @@ class GameGenre(db.Model):
     appid: Mapped[int] = mapped_column(primary_key=True)
     genre_id: Mapped[int] = mapped_column(primary_key=True)
 
+    # Look up the games of one genre without scanning the table
+    __table_args__ = (
+        Index("ix_game_genres_genre_id", "genre_id", "appid"),
+    )
+
 
 class Platform(db.Model):
     __tablename__ = "platforms"
@@ -79,6 +109,11 @@ class GamePlatform(db.Model):
     appid: Mapped[int] = mapped_column(primary_key=True)
     platform_id: Mapped[int] = mapped_column(primary_key=True)
 
+    # Look up the games of one platform without scanning the table
+    __table_args__ = (
+        Index("ix_game_platforms_platform_id", "platform_id", "appid"),
+    )
+
 
 class SteamSpyTag(db.Model):
     __tablename__ = "steamspy_tags"
@@ -93,9 +128,41 @@ class GameSteamSpyTag(db.Model):
     appid: Mapped[int] = mapped_column(primary_key=True)
     steamspy_tag_id: Mapped[int] = mapped_column(primary_key=True)
 
+    # Look up the games of one tag without scanning the table
+    __table_args__ = (
+        Index("ix_game_steamspy_tags_steamspy_tag_id", "steamspy_tag_id", "appid"),
+    )
+
+# Most similar games of every game, precomputed by build_similar.py
+class GameSimilar(db.Model):
+    __tablename__ = "game_similar"
+
+    appid: Mapped[int] = mapped_column(primary_key=True)
+    rank: Mapped[int] = mapped_column(primary_key=True)
+    similar_appid: Mapped[int] = mapped_column(Integer)
+    score: Mapped[float] = mapped_column(Float)
+
+# Aggregates of the catalog metrics per group (genre, tag, release year...),
+# kept up to date by the importer (see stats.py). `stats` is a JSON object.
+class StatsRollup(db.Model):
+    __tablename__ = "stats_rollups"
+
+    dimension: Mapped[str] = mapped_column(String, primary_key=True)
+    group_key: Mapped[str] = mapped_column(String, primary_key=True)
+    games: Mapped[int] = mapped_column(Integer)
+    stats: Mapped[str] = mapped_column(Text)
+
+# Key/value metadata about the loaded catalog (e.g. its data version)
+class CatalogMeta(db.Model):
+    __tablename__ = "catalog_meta"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[str] = mapped_column(String)
+
 # User authentication model
 class User(db.Model, UserMixin):
     __tablename__ = "users"
+    __bind_key__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(80), nullable=False)
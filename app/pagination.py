@@ -0,0 +1,366 @@
+import base64
+import json
+import math
+import numpy as np
+from functools import partial
+from flask import Response, stream_with_context
+from sqlalchemy import select, func, or_, and_
+from . import db
+from .models import Game, Rating, GameMedia
+from .filters import sql_filters
+from .relations import appid_in
+from .fields import GAME_FIELDS, select_fields, build_results
+from .fragments import fragments_enabled, result_fragments
+from .columnar import columnar_enabled, get_catalog_columns
+from .fuzzy import fuzzy_scores
+from .instrumentation import timed
+from .metrics import record_result_size
+
+# Largest page a client can ask for with `limit`
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip when streaming an unpaginated result
+STREAM_BATCH_SIZE = 500
+
+# Sort keys accepted by `sort` (prefix with "-" for descending order).
+# NULLs are coalesced so the keyset comparison never meets a NULL.
+SORT_KEYS = {
+    "appid": Game.appid,
+    "name": Game.name,
+    "price": func.coalesce(Game.price, 0.0),
+    "release_date": func.coalesce(Game.release_date_key, 0),
+    "rating": func.coalesce(Rating.rating_pct, -1.0),
+    "total_ratings": func.coalesce(Rating.total_ratings, 0),
+    "playtime": func.coalesce(Rating.average_playtime, 0),
+    "owners": func.coalesce(Rating.owners_lower, 0),
+}
+
+# Sort keys ordering by text, the others are numbers
+TEXT_SORT_KEYS = {"name"}
+
+# Order of fuzzy name searches without a `sort`: best similarity first
+RELEVANCE = "relevance"
+
+
+def parse_sort(value):
+    """Parses a `sort` parameter into (spec, key, descending). Raises ValueError."""
+    spec = value or "appid"
+    descending = spec.startswith("-")
+    key = spec[1:] if descending else spec
+
+    if key not in SORT_KEYS:
+        raise ValueError(f"Invalid 'sort' key: {key}")
+
+    return spec, key, descending
+
+
+def parse_limit(value):
+    """Parses a `limit` parameter, None meaning unpaginated. Raises ValueError."""
+    if value is None:
+        return None
+
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("The 'limit' parameter must be an integer")
+
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"The 'limit' parameter must be between 1 and {MAX_PAGE_SIZE}")
+
+    return limit
+
+
+def encode_cursor(spec, value, appid):
+    """Encodes the position after a row as an opaque URL-safe cursor."""
+    raw = json.dumps([spec, value, appid], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor, spec):
+    """
+    Decodes a cursor made by encode_cursor for the same sort. The sort value
+    must have the type of its key (text or a finite number), so a tampered
+    cursor cannot reach the comparisons. Raises ValueError.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, appid = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid 'cursor' parameter")
+
+    if cursor_sort != spec:
+        raise ValueError("The 'cursor' does not match the requested 'sort'")
+
+    key = spec.lstrip("-")
+    valid_value = isinstance(value, str) if key in TEXT_SORT_KEYS else is_number(value)
+    if not valid_value or not isinstance(appid, int) or not is_number(appid):
+        raise ValueError("Invalid 'cursor' parameter")
+
+    return value, appid
+
+
+def is_number(value):
+    """
+    Whether a decoded JSON value is a finite float or an int that fits a
+    SQLite INTEGER (booleans are not numbers here).
+    """
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return isinstance(value, float) and math.isfinite(value)
+
+
+def order_and_seek(stmt, sort, descending, cursor=None):
+    """
+    Orders the statement by (sort key, appid) and, given a decoded cursor,
+    keeps only the rows after it. The appid and sort value are added as the
+    last two columns, which the cursor of the next page is built from.
+    """
+    expression = SORT_KEYS[sort]
+
+    stmt = stmt.add_columns(Game.appid.label("cursor_appid"), expression.label("sort_value"))
+
+    if cursor is not None:
+        value, appid = cursor
+        if sort == "appid":
+            stmt = stmt.where(Game.appid < appid if descending else Game.appid > appid)
+        elif descending:
+            stmt = stmt.where(or_(expression < value, and_(expression == value, Game.appid < appid)))
+        else:
+            stmt = stmt.where(or_(expression > value, and_(expression == value, Game.appid > appid)))
+
+    if sort == "appid":
+        return stmt.order_by(Game.appid.desc() if descending else Game.appid)
+
+    if descending:
+        return stmt.order_by(expression.desc(), Game.appid.desc())
+    return stmt.order_by(expression, Game.appid)
+
+
+def fetch_page(stmt, spec, limit):
+    """Runs a seeked statement and returns (rows, next_cursor) for one page."""
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(spec, last.sort_value, last.cursor_appid)
+
+    return rows, next_cursor
+
+
+def json_page(envelope, results, next_cursor):
+    """Builds the JSON response for one page of results."""
+    record_result_size(len(results))
+
+    with timed("serialize"):
+        body = json.dumps({
+            **envelope,
+            "count": len(results),
+            "next_cursor": next_cursor,
+            "results": results
+        }, ensure_ascii=False)
+
+    return Response(body, mimetype='application/json')
+
+
+def fragment_page(envelope, fragments, next_cursor):
+    """
+    Builds the JSON response for one page of encoded results, spliced into
+    the envelope as they are. The body is the same as json_page's.
+    """
+    record_result_size(len(fragments))
+
+    with timed("serialize"):
+        head = json.dumps({
+            **envelope,
+            "count": len(fragments),
+            "next_cursor": next_cursor,
+            "results": []
+        }, ensure_ascii=False)
+        body = head[:-2].encode() + b", ".join(fragments) + b"]}"
+
+    return Response(body, mimetype='application/json')
+
+
+def stream_json(envelope, batches, encode_batch):
+    """
+    Streams batches of rows as one JSON document.
+
+    `encode_batch` turns each batch into encoded results as it is sent, so
+    memory stays flat however many rows match. The total count is only
+    known at the end, so it comes after the results.
+    """
+    def generate():
+        head = json.dumps(envelope, ensure_ascii=False)[:-1]
+        yield ((head + ", " if envelope else "{") + '"results": [').encode()
+
+        count = 0
+        for rows in batches:
+            fragments = encode_batch(rows)
+            if fragments:
+                yield (b", " if count else b"") + b", ".join(fragments)
+            count += len(fragments)
+
+        record_result_size(count)
+        yield f'], "count": {count}}}'.encode()
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def encode_rows(rows, fields):
+    """
+    Encodes select_fields rows as JSON results, taking the games already
+    in the fragment store from there.
+    """
+    if fragments_enabled(fields):
+        by_appid = {row.appid: row for row in rows}
+        return result_fragments(list(by_appid), fields, lambda appids: [by_appid[appid] for appid in appids])
+
+    return [json.dumps(result, ensure_ascii=False).encode() for result in build_results(rows, fields)]
+
+
+def encode_games(appids, fields):
+    """
+    Encodes the results of listed games, in the given order. Only the games
+    missing from the fragment store are loaded from SQL.
+    """
+    load = partial(hydrate, fields=fields, join_all=False)
+
+    if fragments_enabled(fields):
+        return result_fragments(appids, fields, load)
+
+    return encode_rows(load(appids), fields)
+
+
+def hydrate(appids, fields=GAME_FIELDS, join_all=True):
+    """Loads the rows of the given appids (see fields.select_fields), in that order."""
+    rows = db.session.execute(select_fields(fields, join_all).where(appid_in(Game.appid, appids))).all()
+    by_appid = {row.appid: row for row in rows}
+    return [by_appid[appid] for appid in appids if appid in by_appid]
+
+
+def paginated_response(criteria, args, envelope, fields):
+    """
+    Answers a catalog search from its filter criteria and query parameters.
+
+    With `limit` one page is returned along with the `next_cursor` to resume
+    from; without it every match is streamed. Both are ordered by `sort`,
+    or by relevance for fuzzy name searches without one. Numeric sorts run
+    on the columnar snapshot, others and broad name searches in SQL. Only
+    the columns and relations of the requested `fields` are loaded. Invalid
+    `sort`, `limit` or `cursor` values raise ValueError before any query runs.
+    """
+    spec, key, descending = parse_sort(args.get("sort"))
+    limit = parse_limit(args.get("limit"))
+
+    ranked = bool(criteria["name"]) and criteria["match"] == "fuzzy" and args.get("sort") is None
+    if ranked:
+        spec = RELEVANCE
+
+    cursor = args.get("cursor")
+    if cursor is not None:
+        cursor = decode_cursor(cursor, spec)
+
+    if ranked:
+        return ranked_response(criteria, cursor, limit, envelope, fields)
+
+    if columnar_enabled(key, criteria):
+        return columnar_response(criteria, spec, key, descending, cursor, limit, envelope, fields)
+
+    stmt = order_and_seek(select_fields(fields).where(*sql_filters(criteria)), key, descending, cursor)
+
+    if limit is None:
+        result = db.session.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        return stream_json(envelope, result.partitions(), partial(encode_rows, fields=fields))
+
+    with timed("query"):
+        rows, next_cursor = fetch_page(stmt, spec, limit)
+
+    with timed("relations"):
+        fragments = encode_rows(rows, fields)
+
+    return fragment_page(envelope, fragments, next_cursor)
+
+
+def columnar_response(criteria, spec, key, descending, cursor, limit, envelope, fields):
+    """
+    Filters and orders the search on the columnar snapshot, then loads the
+    requested fields from SQL only for the games actually returned and not
+    already pre-encoded. The snapshot only holds listed games, so only
+    tables with a requested column are joined.
+    """
+    with timed("query"):
+        columns = get_catalog_columns()
+        positions = columns.search(criteria, key, descending, cursor, limit)
+
+    if limit is None:
+        batches = (
+            columns.appid[positions[start:start + STREAM_BATCH_SIZE]].tolist()
+            for start in range(0, len(positions), STREAM_BATCH_SIZE)
+        )
+        return stream_json(envelope, batches, partial(encode_games, fields=fields))
+
+    next_cursor = None
+    if len(positions) > limit:
+        positions = positions[:limit]
+        last = positions[-1]
+        next_cursor = encode_cursor(spec, columns.sort_value(key, last), columns.appid[last].item())
+
+    with timed("relations"):
+        fragments = encode_games(columns.appid[positions].tolist(), fields)
+
+    return fragment_page(envelope, fragments, next_cursor)
+
+
+def ranked_response(criteria, cursor, limit, envelope, fields):
+    """
+    Answers a fuzzy name search ordered by the similarity of the names to
+    the searched one (best first, then by appid), so the closest names come
+    first. The other filters only narrow down the scored matches, on the
+    columnar snapshot when enabled.
+    """
+    with timed("query"):
+        appids, scores = fuzzy_scores(criteria["name"])
+        others = {**criteria, "name": None}
+
+        if columnar_enabled():
+            columns = get_catalog_columns()
+            kept = columns.appid[columns.mask(others)]
+        else:
+            kept = db.session.execute(
+                select(Game.appid)
+                .join(Rating, Game.appid == Rating.appid)
+                .join(GameMedia, Game.appid == GameMedia.appid)
+                .where(appid_in(Game.appid, appids.tolist()), *sql_filters(others))
+            ).scalars().all()
+
+        keep = np.isin(appids, kept)
+        appids, scores = appids[keep], scores[keep]
+
+        if cursor is not None:
+            value, appid = cursor
+            after = (scores < value) | ((scores == value) & (appids > appid))
+            appids, scores = appids[after], scores[after]
+
+        order = np.lexsort((appids, -scores))
+        appids, scores = appids[order], scores[order]
+
+    if limit is None:
+        batches = (
+            appids[start:start + STREAM_BATCH_SIZE].tolist()
+            for start in range(0, len(appids), STREAM_BATCH_SIZE)
+        )
+        return stream_json(envelope, batches, partial(encode_games, fields=fields))
+
+    next_cursor = None
+    if len(appids) > limit:
+        appids = appids[:limit]
+        next_cursor = encode_cursor(RELEVANCE, scores[limit - 1].item(), appids[-1].item())
+
+    with timed("relations"):
+        fragments = encode_games(appids.tolist(), fields)
+
+    return fragment_page(envelope, fragments, next_cursor)
@@ -0,0 +1,111 @@
+import json
+import sqlite3
+from sqlalchemy import select, func, literal_column
+from . import db
+from .catalog import catalog_index
+from .models import (
+    Genre,
+    GameGenre,
+    Category,
+    GameCategory,
+    Platform,
+    GamePlatform,
+    SteamSpyTag,
+    GameSteamSpyTag
+)
+
+# Largest number of bound parameters SQLite accepts in a single statement
+# (SQLITE_MAX_VARIABLE_NUMBER), minus some headroom for other parameters
+if sqlite3.sqlite_version_info >= (3, 32, 0):
+    MAX_IN_PARAMS = 32000
+else:
+    MAX_IN_PARAMS = 900
+
+# Relation name -> (link table, link id column, lookup table, lookup id column, lookup name column)
+RELATIONS = {
+    "genres": (GameGenre, GameGenre.genre_id, Genre, Genre.genre_id, Genre.genre_name),
+    "categories": (GameCategory, GameCategory.category_id, Category, Category.category_id, Category.category_name),
+    "platforms": (GamePlatform, GamePlatform.platform_id, Platform, Platform.platform_id, Platform.platform_name),
+    "tags": (GameSteamSpyTag, GameSteamSpyTag.steamspy_tag_id, SteamSpyTag, SteamSpyTag.tag_id, SteamSpyTag.tag_name),
+}
+
+
+def chunked(values, size=MAX_IN_PARAMS):
+    """Splits a list into consecutive chunks of at most `size` items."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def appid_in(column, appids):
+    """
+    Builds `column IN (appids)` for any number of appids.
+
+    Large sets are passed as a single JSON array parameter and expanded by
+    SQLite's json_each, instead of one bound parameter per appid.
+    """
+    appids = list(appids)
+
+    if len(appids) <= 500:
+        return column.in_(appids)
+
+    values = select(literal_column("value")).select_from(func.json_each(json.dumps(appids)))
+    return column.in_(values)
+
+
+def build_name_tables(relations=RELATIONS):
+    """Loads the id -> name lookup table of every relation, one query each."""
+    tables = {}
+
+    for relation in relations:
+        _, _, _, id_column, name_column = RELATIONS[relation]
+        rows = db.session.execute(select(id_column, name_column)).all()
+        tables[relation] = {row_id: name for row_id, name in rows}
+
+    return tables
+
+
+def get_name_tables():
+    """Returns the id -> name lookup tables, rebuilt when the catalog is reloaded."""
+    return catalog_index("relation_name_tables", build_name_tables)
+
+
+def load_relations(appids, relations=("genres", "categories", "platforms"), name_tables=None):
+    """
+    Batch-loads the named relations for a whole result set.
+
+    Runs one grouped query per relation (per MAX_IN_PARAMS appids) and returns
+    {relation: {appid: [name, ...]}}. When `name_tables` is given the lookup
+    tables are not joined and ids are resolved in memory instead.
+    """
+    appids = list(dict.fromkeys(appids))
+    loaded = {relation: {} for relation in relations}
+
+    if not appids:
+        return loaded
+
+    for relation in relations:
+        link, link_id, lookup, lookup_id, lookup_name = RELATIONS[relation]
+        names = name_tables.get(relation) if name_tables is not None else None
+        by_appid = loaded[relation]
+
+        for chunk in chunked(appids):
+            # Ordered like the link table's primary key, so the names of a game come
+            # out in the same order whatever plan SQLite picks for the batch
+            if names is not None:
+                stmt = select(link.appid, link_id).where(link.appid.in_(chunk)).order_by(link.appid, link_id)
+            else:
+                stmt = (
+                    select(link.appid, lookup_name)
+                    .join(lookup, link_id == lookup_id)
+                    .where(link.appid.in_(chunk))
+                    .order_by(link.appid, link_id)
+                )
+
+            for appid, value in db.session.execute(stmt):
+                if names is not None:
+                    value = names.get(value)
+                    if value is None:
+                        continue
+                by_appid.setdefault(appid, []).append(value)
+
+    return loaded
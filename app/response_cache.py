@@ -0,0 +1,149 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request, Response, stream_with_context
+from .catalog import catalog_version
+from .metrics import record_result_size
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of encoded response bodies.
+
+    Entries are stored with the catalog version they were built from and
+    are treated as missing once the catalog is reloaded, and with the
+    number of results of the response, if the endpoint recorded one.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Returns (etag, body, mimetype, result size) for a key built from `version`, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1:]
+
+    def put(self, key, version, body, mimetype, result_size=None):
+        """Stores a body and returns its strong ETag (None if it is too large to cache)."""
+        if len(body) > self.max_entry_bytes:
+            return None
+
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (version, etag, body, mimetype, result_size)
+            self.size += len(body)
+
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+        return etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self.size}
+
+    def _remove(self, key):
+        self.size -= len(self._entries.pop(key)[2])
+
+
+def request_cache_key():
+    """The endpoint, its URL arguments (e.g. the appid) and its query parameters, in a canonical order."""
+    path = tuple(sorted((request.view_args or {}).items()))
+    params = tuple(sorted((name, tuple(values)) for name, values in request.args.lists()))
+    return request.endpoint, path, params
+
+
+def conditional(response, etag):
+    """Sets the ETag and turns the response into a 304 if the client already has it."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+
+    response.set_etag(etag)
+    return response
+
+
+def cached_response(f):
+    """
+    Serves a GET endpoint from the response cache.
+
+    Successful responses are stored with a strong ETag, and requests whose
+    If-None-Match carries that ETag get an empty 304. Streamed responses
+    are passed through and stored once fully sent, if small enough. Hits
+    record the stored result size, so api_result_size counts every
+    response, cached or not.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions["response_cache"]
+        version = catalog_version()
+        key = request_cache_key()
+
+        entry = cache.get(key, version)
+        if entry is not None:
+            etag, body, mimetype, result_size = entry
+            if result_size is not None:
+                record_result_size(result_size)
+            return conditional(Response(body, mimetype=mimetype), etag)
+
+        response = current_app.make_response(f(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+
+        if not response.is_streamed:
+            etag = cache.put(key, version, response.get_data(), response.mimetype, g.get("result_size"))
+            return conditional(response, etag) if etag else response
+
+        # The headers of a streamed response are already final, so only
+        # the next identical request gets the cached copy and its ETag. The
+        # tee runs in the request context, where the stream records its size
+        response.response = stream_with_context(
+            tee_into_cache(response.response, cache, key, version, response.mimetype)
+        )
+        return response
+
+    return wrapper
+
+
+def tee_into_cache(chunks, cache, key, version, mimetype):
+    """Yields a streamed body unchanged and caches it once complete."""
+    collected = []
+    size = 0
+
+    for chunk in chunks:
+        if collected is not None:
+            data = chunk.encode() if isinstance(chunk, str) else chunk
+            size += len(data)
+            if size > cache.max_entry_bytes:
+                collected = None
+            else:
+                collected.append(data)
+        yield chunk
+
+    if collected is not None:
+        cache.put(key, version, b"".join(collected), mimetype, g.get("result_size"))
@@ -1,65 +1,123 @@
-from flask import Blueprint, request, jsonify, request, current_app
-from sqlalchemy import select
+from flask import Blueprint, request, jsonify, request, current_app, has_app_context
+from sqlalchemy import select, event
 from . import db
 from .models import (
     Game,
     Rating,
-    Genre,
-    GameGenre,
     SteamSpyTag,
-    GameSteamSpyTag,
-    Category,
-    GameCategory,
-    Platform,
-    GamePlatform,
     GameMedia,
     User
 )
+from .filters import parse_filters, has_filters, sql_filters, GAME_FACETS, TAG_FACETS, SIMILAR_FACETS
+from .facets import get_facet_index
+from .columnar import columnar_enabled, get_catalog_columns
+from .pagination import paginated_response, hydrate, json_page
+from .fields import parse_fields, build_results, GAME_FIELDS, TAG_FIELDS
+from .export import export_stream, EXPORT_FORMATS
+from .suggest import get_suggest_index, MAX_SUGGESTIONS
+from .similar import get_similarity_index, persisted_similar, MAX_SIMILAR
+from .stats import get_stats_table, parse_metrics, parse_percentiles, stats_results, STATS_DIMENSIONS, ALL_GAMES
+import numpy as np
+from .token_cache import UserSnapshot
+from .response_cache import cached_response
+from .instrumentation import timed
+from .metrics import auth_failures, record_result_size
+from .admission import admit
 import json
-from flask import Response
+from flask import Response, stream_with_context
 from functools import wraps
 import jwt
 
+# Most appids a single /games/batch request can look up
+MAX_BATCH_APPIDS = 5000
+
+# Largest appid SQLite can store (signed 64-bit integers)
+MAX_APPID = 2 ** 63 - 1
+
+# Error messages of the reasons a request can fail authentication
+AUTH_ERRORS = {
+    "missing_header": "Authorization header is missing",
+    "invalid_header": "Invalid authorization header format",
+    "missing_user": "Token missing user information",
+    "user_not_found": "User not found",
+    "expired": "Token has expired",
+    "invalid_token": "Invalid token",
+}
+
+# Authenticate the request's bearer token, returning (user, None) or (None, failure reason)
+def authenticate():
+    # Get the token from the Authorization header
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return None, "missing_header"
+    
+    # Expected header format: "Bearer <token>"
+    parts = auth_header.split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return None, "invalid_header"
+        
+    token = parts[1]
+
+    # Tokens verified by an earlier request skip decoding and the user lookup
+    token_cache = current_app.extensions["token_cache"]
+    user = token_cache.get(token)
+    if user is not None:
+        return user, None
+
+    try:
+        # Decode the token using the app secret key
+        payload = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
+        
+        # Extract the user ID from the token payload
+        user_id = payload.get("user_id")
+        if not user_id:
+            return None, "missing_user"
+
+        # Fetch the user from the database
+        user = User.query.get(user_id)
+        if not user:
+            return None, "user_not_found"
+
+    except jwt.ExpiredSignatureError:
+        return None, "expired"
+    
+    except jwt.InvalidTokenError:
+        return None, "invalid_token"
+
+    # Cache the verified token with a detached copy of the user
+    user = UserSnapshot(user.id, user.name, user.email)
+    token_cache.put(token, payload, user)
+
+    return user, None
+
 # Token authorisation decorator function
 def token_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        # Get the token from the Authorization header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return jsonify({"error": "Authorization header is missing"}), 401
-        
-        # Expected header format: "Bearer <token>"
-        parts = auth_header.split()
-        if len(parts) != 2 or parts[0].lower() != "bearer":
-            return jsonify({"error": "Invalid authorization header format"}), 401
-            
-        token = parts[1]
+        with timed("auth"):
+            user, failure = authenticate()
 
-        try:
-            # Decode the token using the app secret key
-            payload = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
-            
-            # Extract the user ID from the token payload
-            user_id = payload.get("user_id")
-            if not user_id:
-                return jsonify({"error": "Token missing user information"}), 401
-
-            # Fetch the user from the database
-            user = User.query.get(user_id)
-            if not user:
-                return jsonify({"error": "User not found"}), 401
-
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token has expired"}), 401
-        
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+        if failure is not None:
+            auth_failures.inc(failure)
+            return jsonify({"error": AUTH_ERRORS[failure]}), 401
+
+        # Per-user rate limit, weighted by the request's cost, and global concurrency limit
+        rejected = admit(user)
+        if rejected is not None:
+            return rejected
 
         # Call the original route function and pass the user as a keyword argument
         return f(user=user, *args, **kwargs)
     
     return wrapper
+
+
+# Forget the cached tokens of a user when the user is deleted. This only
+# reaches this worker's cache; the others drop them within TOKEN_CACHE_TTL.
+@event.listens_for(User, "after_delete")
+def forget_deleted_user(mapper, connection, target):
+    if has_app_context():
+        current_app.extensions["token_cache"].invalidate_user(target.id)
     
 
 # Blueprint for the API routes
@@ -68,235 +126,230 @@ api_bp = Blueprint("api", __name__)
 # Game Details endpoint: search games with filters
 @api_bp.route("/games", methods=["GET"])
 @token_required
+@cached_response
 def get_games(user):
 
-    # Fetch query parameters
-    name = request.args.get("name")
-    release_year = request.args.get("release_year")
-    platform = request.args.get("platform")
-    genre = request.args.get("genre")
-    category = request.args.get("category")
-    rating_min = request.args.get("rating_min", type=float)
-    rating_max = request.args.get("rating_max", type=float)
-    price_min = request.args.get("price_min", type=float)
-    price_max = request.args.get("price_max", type=float)
-
     # Require the 'name' parameter
-    if not name:
+    if not request.args.get("name"):
         return jsonify({"error": "The 'name' parameter is required"}), 400
 
-    # Base query selecting the tables
-    stmt = (
-        select(Game, Rating, GameMedia)
-        .join(Rating, Game.appid == Rating.appid)
-        .join(GameMedia, Game.appid == GameMedia.appid)
+    try:
+        criteria = parse_filters(request.args, GAME_FACETS)
+        fields = parse_fields(request.args.get("fields"), GAME_FIELDS)
+        return paginated_response(criteria, request.args, {}, fields)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+# Similar games endpoint: games sharing the most (and rarest) tags, genres and categories
+@api_bp.route("/games/<int:appid>/similar", methods=["GET"])
+@token_required
+@cached_response
+def get_similar_games(user, appid):
+
+    limit = request.args.get("limit", 10, type=int)
+    if not 1 <= limit <= MAX_SIMILAR:
+        return jsonify({"error": f"The 'limit' parameter must be between 1 and {MAX_SIMILAR}"}), 400
+
+    # Same price, rating and platform filters as /games/by-tag
+    try:
+        criteria = parse_filters(request.args, SIMILAR_FACETS, text_search=False)
+        fields = parse_fields(request.args.get("fields"), GAME_FIELDS)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    index = get_similarity_index()
+    if index.position(appid) is None:
+        return jsonify({"error": "Game not found"}), 404
+
+    with timed("query"):
+        # Unfiltered requests can use the neighbours stored by build_similar.py
+        similar = persisted_similar(appid, limit) if not has_filters(criteria) else None
+
+        if similar is None:
+            columns = get_catalog_columns()
+            mask = columns.mask(criteria)
+            if len(columns.appid) != len(index.appids):
+                mask = np.isin(index.appids, columns.appid[mask])
+            similar = index.similar(appid, limit, mask)
+
+        rows = hydrate([similar_appid for similar_appid, _ in similar], fields, join_all=False)
+
+    with timed("relations"):
+        results = build_results(rows, fields)
+
+    scores = dict(similar)
+    for result, row in zip(results, rows):
+        result["similarity"] = scores[row.appid]
+
+    return json_page({"appid": appid}, results, None)
+
+# Batch lookup endpoint: full details of many games by appid
+@api_bp.route("/games/batch", methods=["POST"])
+@token_required
+def get_games_batch(user):
+
+    # Expected body: {"appids": [10, 20, ...]}
+    data = request.get_json(silent=True) or {}
+    appids = data.get("appids") if isinstance(data, dict) else None
+
+    if not isinstance(appids, list) or not appids:
+        return jsonify({"error": "The 'appids' list is required"}), 400
+
+    if len(appids) > MAX_BATCH_APPIDS:
+        return jsonify({"error": f"At most {MAX_BATCH_APPIDS} appids can be requested at once"}), 400
+
+    if not all(isinstance(appid, int) and not isinstance(appid, bool) for appid in appids):
+        return jsonify({"error": "Every appid must be an integer"}), 400
+
+    if not all(1 <= appid <= MAX_APPID for appid in appids):
+        return jsonify({"error": f"Every appid must be between 1 and {MAX_APPID}"}), 400
+
+    try:
+        fields = parse_fields(request.args.get("fields"), GAME_FIELDS)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    # Duplicates are returned once, in the order of their first occurrence
+    appids = list(dict.fromkeys(appids))
+
+    with timed("query"):
+        rows = hydrate(appids, fields)
+
+    with timed("relations"):
+        results = build_results(rows, fields)
+
+    found = {row.appid for row in rows}
+    missing = [appid for appid in appids if appid not in found]
+
+    record_result_size(len(results))
+
+    # Every result is on this one page, so there is no next_cursor
+    with timed("serialize"):
+        body = json.dumps({
+            "missing": missing,
+            "count": len(results),
+            "results": results
+        }, ensure_ascii=False)
+
+    return Response(body, mimetype='application/json')
+
+# Autocomplete endpoint: best rated games with a word starting with `q`
+@api_bp.route("/games/suggest", methods=["GET"])
+@token_required
+def get_game_suggestions(user):
+
+    query = request.args.get("q", "")
+    if not query.strip():
+        return jsonify({"error": "The 'q' parameter is required"}), 400
+
+    limit = request.args.get("limit", 10, type=int)
+    if not 1 <= limit <= MAX_SUGGESTIONS:
+        return jsonify({"error": f"The 'limit' parameter must be between 1 and {MAX_SUGGESTIONS}"}), 400
+
+    with timed("query"):
+        suggestions = get_suggest_index().suggest(query, limit)
+
+    record_result_size(len(suggestions))
+
+    return Response(
+        json.dumps({
+            "count": len(suggestions),
+            "results": [{"appid": appid, "name": name} for appid, name in suggestions]
+        }, ensure_ascii=False),
+        mimetype='application/json'
     )
 
-    # Optional filters
-    if name:
-        stmt = stmt.where(Game.name.ilike(f"%{name}%"))
-
-    if release_year:
-        stmt = stmt.where(Game.release_date.like(f"{release_year}%"))
-
-    if genre:
-        stmt = (
-            stmt.join(GameGenre, Game.appid == GameGenre.appid)
-                .join(Genre, GameGenre.genre_id == Genre.genre_id)
-                .where(Genre.genre_name == genre)
-        )
-
-    if platform:
-        stmt = (
-            stmt.join(GamePlatform, Game.appid == GamePlatform.appid)
-                .join(Platform, GamePlatform.platform_id == Platform.platform_id)
-                .where(Platform.platform_name == platform)
-        )
-
-    if category:
-        stmt = (
-            stmt.join(GameCategory, Game.appid == GameCategory.appid)
-                .join(Category, GameCategory.category_id == Category.category_id)
-                .where(Category.category_name == category)
-        )
-
-    if rating_min is not None:
-        stmt = stmt.where(
-            ((Rating.positive_ratings / (Rating.positive_ratings + Rating.negative_ratings)) * 100) >= rating_min
-        )
-    if rating_max is not None:
-        stmt = stmt.where(
-            ((Rating.positive_ratings / (Rating.positive_ratings + Rating.negative_ratings)) * 100) <= rating_max
-        )
-
-    if price_min is not None:
-        stmt = stmt.where(Game.price >= price_min)
-    if price_max is not None:
-        stmt = stmt.where(Game.price <= price_max)
-
-    results = db.session.execute(stmt).all()
-
-    # Prepare the JSON output
-    games_list = []
-
-    for game, rating, media in results:
-
-        # Calculate overall rating as a percentage
-        if rating.positive_ratings + rating.negative_ratings > 0:
-            overall_rating = (rating.positive_ratings / (rating.positive_ratings + rating.negative_ratings))  * 100
-        else:
-            overall_rating = None
-
-        # Platforms
-        platforms = (
-            db.session.execute(
-                select(Platform.platform_name)
-                .join(GamePlatform, Platform.platform_id == GamePlatform.platform_id)
-                .where(GamePlatform.appid == game.appid)
-            ).scalars().all()
-        )
-
-        # Genres
-        genres = (
-            db.session.execute(
-                select(Genre.genre_name)
-                .join(GameGenre, Genre.genre_id == GameGenre.genre_id)
-                .where(GameGenre.appid == game.appid)
-            ).scalars().all()
-        )
-
-        # Categories
-        categories = (
-            db.session.execute(
-                select(Category.category_name)
-                .join(GameCategory, Category.category_id == GameCategory.category_id)
-                .where(GameCategory.appid == game.appid)
-            ).scalars().all()
-        )
-
-        # Build the basic game dictionary
-        game_dict = {
-            "appid": game.appid,
-            "name": game.name,
-            "release_date": game.release_date,
-            "developer": game.developer,
-            "publisher": game.publisher,
-            "price": game.price,
-            "overall_rating": round(overall_rating, 2),
-            "header_image": media.header_image,
-            "genres": genres,
-            "categories": categories,
-            "platforms": platforms
-        }
-
-        games_list.append(game_dict)
-    
+# Facet counts endpoint: number of matching games per genre, platform, category and tag
+@api_bp.route("/games/facets", methods=["GET"])
+@token_required
+@cached_response
+def get_game_facets(user):
+
+    # Same filters as /games, but the name is optional here
+    try:
+        criteria = parse_filters(request.args, GAME_FACETS)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    index = get_facet_index()
+
+    # Find the matching games, then count every facet value with bitset popcounts.
+    # Unfiltered requests count the listed games too, as every search does.
+    # Column masks are only bitsets when both share the same game positions.
+    columns = get_catalog_columns() if columnar_enabled() else None
+    if columns is not None and len(columns.appid) == len(index.appids):
+        bits = columns.bitset(columns.mask(criteria))
+    else:
+        appids = db.session.execute(
+            select(Game.appid)
+            .join(Rating, Game.appid == Rating.appid)
+            .join(GameMedia, Game.appid == GameMedia.appid)
+            .where(*sql_filters(criteria))
+        ).scalars().all()
+        bits = index.from_appids(appids)
+
     return Response(
         json.dumps({
-            "count": len(games_list),
-            "results": games_list
-        }, ensure_ascii=False), 
+            "count": bits.bit_count(),
+            "facets": index.counts(bits)
+        }, ensure_ascii=False),
         mimetype='application/json'
     )
 
 # Games by Tag endpoint: search games with filters based on SteamSpy Tag
 @api_bp.route("/games/by-tag", methods=["GET"])
 @token_required
+@cached_response
 def get_games_by_tag(user):
 
-    # Fetch query parameters
-    tag = request.args.get("tag")
-    platform = request.args.get("platform")
-    rating_min = request.args.get("rating_min", type=float)
-    rating_max = request.args.get("rating_max", type=float)
-    price_min = request.args.get("price_min", type=float)
-    price_max = request.args.get("price_max", type=float)
-
     # Require the "tag" parameter
-    if not tag:
+    if not request.args.get("tag"):
         return jsonify({"error": "The 'tag' parameter is required."}), 400
-    
-    # Base query selecting the tables
-    stmt = (
-        select(Game, Rating, GameMedia)
-        .join(Rating, Game.appid == Rating.appid)
-        .join(GameMedia, Game.appid == GameMedia.appid)
-        .join(GameSteamSpyTag, Game.appid == GameSteamSpyTag.appid)
-        .join(SteamSpyTag, GameSteamSpyTag.steamspy_tag_id == SteamSpyTag.tag_id)
-        .where(SteamSpyTag.tag_name.ilike(tag))
-    )
 
-    # Optional filters
-    if platform:
-        stmt = (
-            stmt.join(GamePlatform, Game.appid == GamePlatform.appid)
-                .join(Platform, GamePlatform.platform_id == Platform.platform_id)
-                .where(Platform.platform_name == platform)
-        )
-
-    if rating_min is not None:
-        stmt = stmt.where(
-            ((Rating.positive_ratings / (Rating.positive_ratings + Rating.negative_ratings)) * 100) >= rating_min
-        )
-    if rating_max is not None:
-        stmt = stmt.where(
-            ((Rating.positive_ratings / (Rating.positive_ratings + Rating.negative_ratings)) * 100) <= rating_max
-        )
-
-    if price_min is not None:
-        stmt = stmt.where(Game.price >= price_min)
-    if price_max is not None:
-        stmt = stmt.where(Game.price <= price_max)
-
-    results = db.session.execute(stmt).all()
-
-    # Prepare the JSON output
-    games_list = []
+    try:
+        criteria = parse_filters(request.args, TAG_FACETS, text_search=False)
+        fields = parse_fields(request.args.get("fields"), TAG_FIELDS)
+        return paginated_response(criteria, request.args, {"tag": request.args["tag"]}, fields)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
 
-    
-    for game, rating, media in results:
-
-        # Calculate overall rating as a percentage
-        if rating.positive_ratings + rating.negative_ratings > 0:
-            overall_rating = (rating.positive_ratings /
-                            (rating.positive_ratings + rating.negative_ratings)) * 100
-        else:
-            overall_rating = None
-
-        # Platforms
-        platforms = (
-            db.session.execute(
-                select(Platform.platform_name)
-                .join(GamePlatform, Platform.platform_id == GamePlatform.platform_id)
-                .where(GamePlatform.appid == game.appid)
-            ).scalars().all()
-        )
-
-        # Build game dictionary
-        game_dict = {
-            "appid": game.appid,
-            "name": game.name,
-            "release_date": game.release_date,
-            "price": game.price,
-            "overall_rating": round(overall_rating, 2),
-            "header_image": media.header_image,
-            "platforms": platforms
-        }
-
-        games_list.append(game_dict)
+# Export endpoint: stream the whole catalog as NDJSON or CSV
+@api_bp.route("/export", methods=["GET"])
+@token_required
+def export_catalog(user):
 
-    return Response(
-        json.dumps({
-            "tag": tag,
-            "count": len(games_list),
-            "results": games_list
-        }, ensure_ascii=False), 
-        mimetype='application/json'
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "The 'format' parameter must be 'ndjson' or 'csv'"}), 400
+
+    # Resume after the last appid received
+    after = request.args.get("after")
+    if after is not None:
+        try:
+            after = int(after)
+        except ValueError:
+            after = None
+        # Checked here, an overflow inside the stream would come after the 200
+        if after is None or not 0 <= after <= MAX_APPID:
+            return jsonify({"error": "The 'after' parameter must be an appid"}), 400
+
+    compress = "gzip" in request.accept_encodings
+
+    response = Response(
+        stream_with_context(export_stream(export_format, after, compress)),
+        mimetype=EXPORT_FORMATS[export_format]
     )
+    response.headers["Content-Disposition"] = f"attachment; filename=catalog.{export_format}"
+    response.headers["Vary"] = "Accept-Encoding"
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+
+    return response
 
 # Tags endpoint: list all available SteamSpy tags
 @api_bp.route("/tags", methods=["GET"])
 @token_required
+@cached_response
 def get_tags(user):
     
     # Query all tags from the database
@@ -304,10 +357,47 @@ def get_tags(user):
         select(SteamSpyTag.tag_name).order_by(SteamSpyTag.tag_name)
     ).scalars().all()
 
+    record_result_size(len(tags))
+
     return Response(
         json.dumps({
             "count": len(tags),
             "results": tags
         }, ensure_ascii=False),
         mimetype='application/json'
-    )
\ No newline at end of file
+    )
+
+# Stats endpoint: aggregates of the catalog metrics, optionally per group
+@api_bp.route("/stats", methods=["GET"])
+@token_required
+@cached_response
+def get_stats(user):
+
+    group_by = request.args.get("group_by", ALL_GAMES)
+    if group_by != ALL_GAMES and group_by not in STATS_DIMENSIONS:
+        valid = ", ".join((ALL_GAMES, *STATS_DIMENSIONS))
+        return jsonify({"error": f"The 'group_by' parameter must be one of: {valid}"}), 400
+
+    try:
+        metrics = parse_metrics(request.args.get("metrics"))
+        percentiles = parse_percentiles(request.args.get("percentiles"))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    # Read from the rollups maintained by the importer, not from the catalog tables
+    with timed("query"):
+        groups = get_stats_table()[group_by]
+
+    with timed("relations"):
+        results = stats_results(groups, metrics, percentiles)
+
+    record_result_size(len(results))
+
+    return Response(
+        json.dumps({
+            "group_by": group_by,
+            "count": len(results),
+            "results": results
+        }, ensure_ascii=False),
+        mimetype='application/json'
+    )
@@ -0,0 +1,111 @@
+import re
+from flask import current_app
+from sqlalchemy import select, text, or_, column, table
+from . import db
+from .models import Game
+
+# FTS5 table mirroring the searchable text columns of `games`
+FTS_TABLE = "games_fts"
+FTS_COLUMNS = ("name", "developer", "publisher")
+
+# Word characters, as split by the FTS5 unicode61 tokenizer
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# A name shorter than this matches a large part of the catalog
+SELECTIVE_NAME_LENGTH = 3
+
+
+def create_fts_index(connection):
+    """Creates (if needed) and fully rebuilds the FTS5 index and its sync triggers."""
+    columns = ", ".join(FTS_COLUMNS)
+    new_columns = ", ".join(f"new.{name}" for name in FTS_COLUMNS)
+    old_columns = ", ".join(f"old.{name}" for name in FTS_COLUMNS)
+
+    statements = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {columns},
+            content='games',
+            content_rowid='appid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )""",
+
+        # Keep the index in sync with inserts, updates and deletes on `games`
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON games BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.appid, {new_columns});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON games BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.appid, {old_columns});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON games BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.appid, {old_columns});
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.appid, {new_columns});
+        END""",
+
+        # Re-read every row of `games` and merge the index b-trees
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')",
+    ]
+
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_fts_triggers(connection):
+    """Drops the sync triggers, e.g. before a bulk load followed by create_fts_index()."""
+    for suffix in ("ai", "ad", "au"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+
+
+def fts_available():
+    """Checks once per app whether the FTS5 index has been built."""
+    available = current_app.extensions.get("fts_available")
+
+    if available is None:
+        try:
+            available = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first() is not None
+        except Exception:
+            available = False
+        current_app.extensions["fts_available"] = available
+
+    return available
+
+
+def fts_query(search, fields=("name",)):
+    """
+    Turns free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix token and all of them must match, so
+    "half li" finds "Half-Life". Returns None if the text has no words.
+    """
+    tokens = TOKEN_PATTERN.findall(search.lower())
+    if not tokens:
+        return None
+
+    terms = " ".join(f'"{token}"*' for token in tokens)
+    return f"{{{' '.join(fields)}}} : ({terms})"
+
+
+def broad_name(search):
+    """Whether no word of a name search is long enough to be selective."""
+    return all(len(token) < SELECTIVE_NAME_LENGTH for token in TOKEN_PATTERN.findall(search))
+
+
+def name_filter(search, fields=("name",)):
+    """
+    Builds the WHERE clause for a name search on `games`.
+
+    Uses the FTS5 index when it exists and falls back to a substring
+    scan of the same columns otherwise.
+    """
+    query = fts_query(search, fields) if fts_available() else None
+
+    if query is not None:
+        fts = table(FTS_TABLE, column("rowid"))
+        matches = select(fts.c.rowid).where(text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=query))
+        return Game.appid.in_(matches)
+
+    return or_(*(getattr(Game, field).ilike(f"%{search}%") for field in fields))
@@ -0,0 +1,190 @@
+import math
+import numpy as np
+from sqlalchemy import select, delete, insert
+from sqlalchemy.exc import OperationalError
+from . import db
+from .catalog import catalog_index, catalog_version
+from .models import Game, GameSimilar, CatalogMeta
+from .relations import RELATIONS
+from .snapshot import get_catalog_snapshot
+
+# Relations whose values describe a game for similarity
+SIMILARITY_RELATIONS = ("tags", "genres", "categories")
+
+# Most similar games a request can ask for
+MAX_SIMILAR = 100
+
+# Neighbours stored per game by build_similar.py
+PERSISTED_NEIGHBOURS = 50
+
+# Latency budget of one live similarity query on the full catalog (~27,000
+# games), checked by benchmarks/similar.py
+LATENCY_BUDGET_MS = 5
+
+
+class SimilarityIndex:
+    """
+    Sparse game x feature matrix for "games like X".
+
+    Features are the tags, genres and categories of the games, weighted by
+    TF-IDF (binary term frequency times log(games / games with the value)),
+    and every game's vector is normalised to unit length. The matrix is
+    stored by column as NumPy posting arrays, so the cosine similarity of
+    one game with every other is a single weighted bincount over the
+    postings of that game's few features. Games are numbered in appid
+    order, the same positions as the columnar snapshot.
+    """
+
+    def __init__(self, appids, feature_games, feature_weights, game_features):
+        self.appids = appids
+        self.feature_games = feature_games
+        self.feature_weights = feature_weights
+        self.game_features = game_features
+
+    @classmethod
+    def build(cls):
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            # Feature -> games having it, straight from the snapshot's adjacency arrays
+            appids = snapshot.array("appid")
+            postings = [
+                np.unique(games)
+                for relation in SIMILARITY_RELATIONS
+                for _, games in snapshot.postings(relation)
+            ]
+        else:
+            appids = np.array(db.session.execute(select(Game.appid).order_by(Game.appid)).scalars().all(), dtype=np.int64)
+            positions = {appid: position for position, appid in enumerate(appids.tolist())}
+
+            # Feature -> games having it
+            postings = []
+            for relation in SIMILARITY_RELATIONS:
+                link, link_id, *_ = RELATIONS[relation]
+                games_by_value = {}
+                for appid, value_id in db.session.execute(select(link.appid, link_id)):
+                    position = positions.get(appid)
+                    if position is not None:
+                        games_by_value.setdefault(value_id, []).append(position)
+                postings += [np.unique(np.array(games, dtype=np.int32)) for games in games_by_value.values()]
+
+        idf = np.array([math.log(len(appids) / len(games)) for games in postings], dtype=np.float64)
+
+        # L2 norm of every game's vector
+        squares = np.zeros(len(appids))
+        for feature, games in enumerate(postings):
+            squares[games] += idf[feature] ** 2
+        norms = np.sqrt(squares)
+        norms[norms == 0] = 1.0
+
+        feature_weights = [(idf[feature] / norms[games]).astype(np.float32) for feature, games in enumerate(postings)]
+
+        # Features of every game, to look up the vector of the game asked about
+        game_features = [[] for _ in appids]
+        for feature, games in enumerate(postings):
+            for game in games.tolist():
+                game_features[game].append(feature)
+
+        return cls(appids, postings, feature_weights, game_features)
+
+    def position(self, appid):
+        position = int(np.searchsorted(self.appids, appid))
+        if position < len(self.appids) and self.appids[position] == appid:
+            return position
+        return None
+
+    def scores(self, position):
+        """Cosine similarity of the game at `position` with every game."""
+        features = self.game_features[position]
+        if not features:
+            return np.zeros(len(self.appids))
+
+        # The game's own weight for a feature is in that feature's posting list
+        games = np.concatenate([self.feature_games[feature] for feature in features])
+        weights = np.concatenate([
+            self.feature_weights[feature] * self.feature_weights[feature][
+                np.searchsorted(self.feature_games[feature], position)
+            ]
+            for feature in features
+        ])
+        return np.bincount(games, weights=weights, minlength=len(self.appids))
+
+    def similar(self, appid, limit, mask=None):
+        """
+        Returns up to `limit` (appid, score) pairs of the games most similar
+        to `appid`, best first, among the positions allowed by `mask`.
+        """
+        position = self.position(appid)
+        if position is None:
+            return []
+
+        scores = self.scores(position)
+        scores[position] = 0.0
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        # Keep the candidates scoring at least the limit-th best score, ties included
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            threshold = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+            candidates = candidates[scores[candidates] >= threshold]
+
+        # Best score first, ties by appid
+        order = np.lexsort((self.appids[candidates], -scores[candidates]))[:limit]
+        return [(self.appids[game].item(), round(scores[game].item(), 4)) for game in candidates[order]]
+
+
+def get_similarity_index():
+    """Returns the similarity matrix, rebuilt when the catalog is reloaded."""
+    return catalog_index("similarity_index", SimilarityIndex.build)
+
+
+def persisted_similar(appid, limit):
+    """
+    Neighbours of a game stored by build_similar.py, or None when they were
+    not built for the current catalog version or are too few.
+    """
+    try:
+        built_for = db.session.execute(
+            select(CatalogMeta.value).where(CatalogMeta.key == "similar_version")
+        ).scalar_one_or_none()
+    except OperationalError:
+        # catalog_meta does not exist yet
+        db.session.rollback()
+        return None
+
+    if built_for is None or built_for != catalog_version() or limit > PERSISTED_NEIGHBOURS:
+        return None
+
+    rows = db.session.execute(
+        select(GameSimilar.similar_appid, GameSimilar.score)
+        .where(GameSimilar.appid == appid)
+        .order_by(GameSimilar.rank)
+        .limit(limit)
+    ).all()
+    return [(similar_appid, score) for similar_appid, score in rows]
+
+
+def persist_similar(connection, index, listed, version):
+    """
+    Stores the PERSISTED_NEIGHBOURS most similar listed games of every game,
+    recorded as built for catalog `version`.
+    """
+    GameSimilar.__table__.create(connection, checkfirst=True)
+    connection.execute(delete(GameSimilar))
+
+    count = 0
+    for position, appid in enumerate(index.appids.tolist()):
+        if not listed[position]:
+            continue
+
+        rows = [
+            {"appid": appid, "rank": rank, "similar_appid": similar_appid, "score": score}
+            for rank, (similar_appid, score) in enumerate(index.similar(appid, PERSISTED_NEIGHBOURS, listed))
+        ]
+        if rows:
+            connection.execute(insert(GameSimilar), rows)
+        count += 1
+
+    connection.execute(delete(CatalogMeta).where(CatalogMeta.key == "similar_version"))
+    connection.execute(insert(CatalogMeta).values(key="similar_version", value=version))
+    return count
@@ -0,0 +1,214 @@
+import mmap
+import os
+import struct
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from . import db
+from .catalog import catalog_version
+from .models import Game
+from .relations import RELATIONS
+
+# File layout: a header, a section table, then the sections, each aligned
+# to SECTION_ALIGNMENT bytes so NumPy can view them in place
+MAGIC = b"STEAMCAT"
+FORMAT_VERSION = 1
+SECTION_ALIGNMENT = 64
+
+# Magic, format version, catalog version the file was built from, number of sections
+HEADER = struct.Struct("<8sI64sI")
+
+# Section name, NumPy dtype string (e.g. "<f8"), byte offset, number of items
+SECTION = struct.Struct("<32s4sQQ")
+
+
+class CatalogSnapshot:
+    """
+    Read-only binary snapshot of the catalog, opened with mmap.
+
+    Sections are flat arrays viewed in place with np.frombuffer, so every
+    worker maps the same file pages instead of holding its own copy, and
+    opening one costs nothing but reading the section table:
+
+    - fixed-width numeric columns, one value per game in appid order
+      (the positions of the columnar snapshot and the facet bitsets)
+    - strings, as int64 offsets ("<name>.offsets", one more than strings)
+      into UTF-8 bytes ("<name>.data")
+    - link tables as adjacency arrays: the values of game i are
+      "<relation>.values"[offsets[i]:offsets[i + 1]], with the lookup ids
+      and names in "<relation>.ids" and "<relation>.names"
+    """
+
+    def __init__(self, buffer, version, sections):
+        self.buffer = buffer
+        self.version = version
+        self.sections = sections
+
+    @classmethod
+    def open(cls, path):
+        """Maps a snapshot file; raises ValueError if it is not one."""
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a catalog snapshot")
+
+        magic, format_version, version, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} catalog snapshot")
+
+        sections = {}
+        for number in range(count):
+            name, dtype, offset, length = SECTION.unpack_from(buffer, HEADER.size + number * SECTION.size)
+            sections[name.rstrip(b"\0").decode()] = (np.dtype(dtype.rstrip(b"\0").decode()), offset, length)
+
+        return cls(buffer, version.rstrip(b"\0").decode(), sections)
+
+    def has(self, *names):
+        return all(name in self.sections for name in names)
+
+    def array(self, name):
+        """Read-only NumPy view of a section."""
+        dtype, offset, length = self.sections[name]
+        if not length:
+            return np.empty(0, dtype=dtype)
+        return np.frombuffer(self.buffer, dtype=dtype, count=length, offset=offset)
+
+    def strings(self, name):
+        """Decodes every string of a string section."""
+        offsets = self.array(f"{name}.offsets").tolist()
+        data = self.array(f"{name}.data").tobytes()
+        return [data[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+
+    def lookup(self, relation):
+        """The id -> name lookup table of a relation."""
+        return dict(zip(self.array(f"{relation}.ids").tolist(), self.strings(f"{relation}.names")))
+
+    def postings(self, relation):
+        """
+        Yields (value id, positions of the games having it) for every value
+        of a relation, positions in increasing order.
+        """
+        offsets = self.array(f"{relation}.offsets")
+        values = self.array(f"{relation}.values")
+        games = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+
+        # A stable sort by value keeps the games of each value in order
+        order = np.argsort(values, kind="stable")
+        values, games = values[order], games[order]
+        starts = np.flatnonzero(np.diff(values, prepend=-1))
+
+        yield from zip(values[starts].tolist(), np.split(games, starts[1:]))
+
+
+def string_sections(name, strings):
+    """Offset and data sections of a list of strings."""
+    encoded = [(string or "").encode() for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return {
+        f"{name}.offsets": offsets,
+        f"{name}.data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+    }
+
+
+def catalog_sections(columns):
+    """
+    Builds the sections of a snapshot from the database, around the numeric
+    columns of a columnar snapshot (columnar.CatalogColumns) built from SQL.
+    """
+    positions = {appid: position for position, appid in enumerate(columns.appid.tolist())}
+    sections = {"appid": columns.appid, "listed": columns.listed.astype(np.uint8)}
+    sections.update(columns.columns)
+
+    names = dict(db.session.execute(select(Game.appid, Game.name)).all())
+    sections.update(string_sections("name", [names[appid] for appid in positions]))
+
+    for relation, (link, link_id, _, lookup_id, lookup_name) in RELATIONS.items():
+        links = [
+            (positions[appid], value_id)
+            for appid, value_id in db.session.execute(select(link.appid, link_id))
+            if appid in positions
+        ]
+        links.sort()
+
+        counts = np.bincount(np.array([game for game, _ in links], dtype=np.int64), minlength=len(positions))
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        lookup = db.session.execute(select(lookup_id, lookup_name).order_by(lookup_id)).all()
+        sections[f"{relation}.offsets"] = offsets
+        sections[f"{relation}.values"] = np.array([value_id for _, value_id in links], dtype=np.int32)
+        sections[f"{relation}.ids"] = np.array([row_id for row_id, _ in lookup], dtype=np.int32)
+        sections.update(string_sections(f"{relation}.names", [name for _, name in lookup]))
+
+    return sections
+
+
+def write_snapshot(path, version, sections):
+    """
+    Writes the sections {name: array} as a snapshot of catalog `version`.
+
+    The file is written next to `path` and renamed over it, so workers see
+    either the old or the new snapshot, never a partial one. Workers that
+    still map the old file keep reading it until they reopen.
+    """
+    arrays = [(name, np.ascontiguousarray(array)) for name, array in sections.items()]
+
+    table = bytearray()
+    offset = HEADER.size + len(arrays) * SECTION.size
+    layout = []
+    for name, array in arrays:
+        offset += -offset % SECTION_ALIGNMENT
+        table += SECTION.pack(name.encode(), array.dtype.str.encode(), offset, len(array))
+        layout.append((offset, array))
+        offset += array.nbytes
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, version.encode(), len(arrays)))
+        file.write(table)
+        for offset, array in layout:
+            file.write(bytes(offset - file.tell()))
+            file.write(array.tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temporary, path)
+    return offset
+
+
+def get_catalog_snapshot():
+    """
+    Returns the mapped snapshot at CATALOG_SNAPSHOT, or None when there is
+    none or it was built from another catalog version than the database's,
+    in which case the in-memory indexes are built from SQL as before.
+
+    The file is reopened when it is replaced, so a rebuilt snapshot is
+    picked up by the next index rebuild without a restart.
+    """
+    path = current_app.config.get("CATALOG_SNAPSHOT")
+    if not path:
+        return None
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    opened = current_app.extensions.get("catalog_snapshot")
+    if opened is None or opened[0] != key:
+        try:
+            snapshot = CatalogSnapshot.open(path)
+        except ValueError:
+            current_app.logger.warning("Ignoring catalog snapshot %s: unknown format", path)
+            snapshot = None
+        opened = (key, snapshot)
+        current_app.extensions["catalog_snapshot"] = opened
+
+    snapshot = opened[1]
+    if snapshot is None or snapshot.version != catalog_version():
+        return None
+
+    return snapshot
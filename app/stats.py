@@ -0,0 +1,359 @@
+import json
+import math
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.exc import OperationalError
+from . import db
+from .catalog import catalog_index
+from .models import Game, Rating, StatsRollup
+from .relations import RELATIONS, chunked
+
+# Metrics aggregated per group: name -> column
+STATS_METRICS = {
+    "price": Game.price,
+    "rating": Rating.rating_pct,
+    "playtime": Rating.average_playtime,
+    "owners": Rating.owners_lower,
+}
+
+# `group_by` values -> relation (see relations.RELATIONS), or a games column
+STATS_DIMENSIONS = {
+    "genre": "genres",
+    "category": "categories",
+    "platform": "platforms",
+    "tag": "tags",
+    "release_year": Game.release_year,
+}
+
+# Dimension of the catalog-wide totals, a single group
+ALL_GAMES = "all"
+
+# Percentiles returned when the request does not ask for others
+DEFAULT_PERCENTILES = (50, 90, 99)
+MAX_PERCENTILES = 10
+
+# Percentiles are read from a sketch of log-sized buckets, within this relative error
+SKETCH_ACCURACY = 0.01
+GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+
+
+def sketch_bucket(value):
+    return math.ceil(math.log(value, GAMMA))
+
+
+def bucket_value(bucket):
+    """The value a bucket stands for, within SKETCH_ACCURACY of all its values."""
+    return 2 * GAMMA ** bucket / (GAMMA + 1)
+
+
+class Aggregate:
+    """
+    Count, sum, min, max and a quantile sketch of one metric of one group.
+
+    Values can be added and removed, so a group is updated by the games
+    that changed alone. Removing the current min or max marks the extremes
+    stale, to be re-read from the catalog (see Rollups.save).
+    """
+
+    def __init__(self, count=0, total=0.0, low=None, high=None, zeros=0, buckets=None):
+        self.count = count
+        self.total = total
+        self.low = low
+        self.high = high
+        self.zeros = zeros
+        self.buckets = buckets or {}
+        self.stale = False
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            data["count"], data["total"], data["min"], data["max"], data["zeros"],
+            {int(bucket): count for bucket, count in data["buckets"].items()}
+        )
+
+    def to_json(self):
+        return {
+            "count": self.count, "total": self.total, "min": self.low, "max": self.high,
+            "zeros": self.zeros, "buckets": self.buckets,
+        }
+
+    def add(self, value, count=1):
+        self.count += count
+        self.total += value * count
+        self.low = value if self.low is None else min(self.low, value)
+        self.high = value if self.high is None else max(self.high, value)
+        self.update_sketch(value, count)
+
+    def remove(self, value, count=1):
+        self.count -= count
+        self.total -= value * count
+        if self.count <= 0:
+            self.count, self.total, self.low, self.high = 0, 0.0, None, None
+        elif value <= self.low or value >= self.high:
+            self.stale = True
+        self.update_sketch(value, -count)
+
+    def update_sketch(self, value, count):
+        if value <= 0:
+            self.zeros += count
+            return
+
+        bucket = sketch_bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        if not self.buckets[bucket]:
+            del self.buckets[bucket]
+
+    def percentile(self, percent):
+        """The value below which `percent` % of the values fall, from the sketch."""
+        if not self.count:
+            return None
+
+        rank = percent / 100 * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return max(self.low, 0)
+
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if rank < seen:
+                return min(max(bucket_value(bucket), self.low), self.high)
+
+        return self.high
+
+    def summary(self, percentiles):
+        if not self.count:
+            return {"count": 0}
+
+        summary = {
+            "count": self.count,
+            "avg": round(self.total / self.count, 2),
+            "min": round(self.low, 2),
+            "max": round(self.high, 2),
+        }
+        for percent in percentiles:
+            summary[f"p{percent:g}"] = round(self.percentile(percent), 2)
+        return summary
+
+
+def grouped(stmt, dimension):
+    """
+    Joins a statement over games (and ratings) to the groups of `dimension`.
+    Returns it with the column naming each game's group, None for ALL_GAMES.
+    """
+    stmt = stmt.select_from(Game).outerjoin(Rating, Game.appid == Rating.appid)
+    if dimension == ALL_GAMES:
+        return stmt, None
+
+    source = STATS_DIMENSIONS[dimension]
+    if not isinstance(source, str):
+        return stmt.where(source.is_not(None)), source
+
+    link, link_id, lookup, lookup_id, lookup_name = RELATIONS[source]
+    stmt = stmt.join(link, link.appid == Game.appid).join(lookup, link_id == lookup_id)
+    return stmt.where(lookup_name.is_not(None)), lookup_name
+
+
+def group_counts(connection, appids=None):
+    """
+    Yields (dimension, group, metric, value, games) over the given appids
+    (every game without them); metric None counts the games of the group.
+    Values are grouped in SQL, so only distinct values reach Python.
+    """
+    chunks = [None] if appids is None else list(chunked(list(appids)))
+
+    for dimension in (ALL_GAMES, *STATS_DIMENSIONS):
+        for chunk in chunks:
+            queries = [(None, select(func.count(Game.appid.distinct())))]
+            queries += [(metric, select(func.count(), column)) for metric, column in STATS_METRICS.items()]
+
+            for metric, stmt in queries:
+                stmt, key = grouped(stmt, dimension)
+                if metric is not None:
+                    column = STATS_METRICS[metric]
+                    stmt = stmt.where(column.is_not(None)).group_by(column)
+                if key is not None:
+                    stmt = stmt.add_columns(key).group_by(key)
+                if chunk is not None:
+                    stmt = stmt.where(Game.appid.in_(chunk))
+
+                for row in connection.execute(stmt):
+                    games = row[0]
+                    value = row[1] if metric is not None else None
+                    group = "" if key is None else str(row[-1])
+                    if games:
+                        yield dimension, group, metric, value, games
+
+
+class Rollups:
+    """
+    The stats_rollups rows in memory: {(dimension, group): [games, {metric: Aggregate}]}.
+
+    add() and remove() apply the counts of a set of games; save() writes
+    back only the groups they touched.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.touched = set()
+
+    @classmethod
+    def load(cls, connection):
+        """Loads the stored rollups, None if there are none yet."""
+        try:
+            rows = connection.execute(
+                select(StatsRollup.dimension, StatsRollup.group_key, StatsRollup.games, StatsRollup.stats)
+            ).all()
+        except OperationalError:
+            # stats_rollups does not exist yet
+            return None
+
+        if not rows:
+            return None
+
+        return cls({
+            (dimension, group): [games, {metric: Aggregate.from_json(data) for metric, data in json.loads(stats).items()}]
+            for dimension, group, games, stats in rows
+        })
+
+    def apply(self, connection, appids, sign):
+        for dimension, group, metric, value, games in group_counts(connection, appids):
+            entry = self.groups.setdefault((dimension, group), [0, {}])
+            self.touched.add((dimension, group))
+
+            if metric is None:
+                entry[0] += sign * games
+                continue
+
+            aggregate = entry[1].setdefault(metric, Aggregate())
+            if sign > 0:
+                aggregate.add(value, games)
+            else:
+                aggregate.remove(value, games)
+
+    def add(self, connection, appids=None):
+        """Adds the current data of the given games (every game without appids)."""
+        self.apply(connection, appids, 1)
+
+    def remove(self, connection, appids):
+        """Removes the current data of the given games, before they are rewritten."""
+        self.apply(connection, appids, -1)
+
+    def save(self, connection):
+        """Writes the touched groups, re-reading the stale extremes from the catalog."""
+        StatsRollup.__table__.create(connection, checkfirst=True)
+        rows = []
+
+        for dimension, group in self.touched:
+            games, aggregates = self.groups[(dimension, group)]
+            connection.execute(
+                delete(StatsRollup).where(StatsRollup.dimension == dimension, StatsRollup.group_key == group)
+            )
+            if games <= 0:
+                del self.groups[(dimension, group)]
+                continue
+
+            for metric, aggregate in aggregates.items():
+                if aggregate.stale:
+                    aggregate.low, aggregate.high = group_extremes(connection, dimension, group, metric)
+                    aggregate.stale = False
+
+            stats = {metric: aggregate.to_json() for metric, aggregate in aggregates.items() if aggregate.count}
+            rows.append({"dimension": dimension, "group_key": group, "games": games, "stats": json.dumps(stats)})
+
+        if rows:
+            connection.execute(insert(StatsRollup), rows)
+        self.touched = set()
+
+
+def group_extremes(connection, dimension, group, metric):
+    """Min and max of a metric over one group, read from the catalog."""
+    column = STATS_METRICS[metric]
+    stmt, key = grouped(select(func.min(column), func.max(column)), dimension)
+    if key is not None:
+        stmt = stmt.where(key == (int(group) if dimension == "release_year" else group))
+    return tuple(connection.execute(stmt).one())
+
+
+def rebuild_rollups(connection):
+    """Recomputes every rollup from the catalog, e.g. after a full import."""
+    StatsRollup.__table__.create(connection, checkfirst=True)
+    connection.execute(delete(StatsRollup))
+
+    rollups = Rollups({})
+    rollups.add(connection)
+    rollups.save(connection)
+    return rollups
+
+
+def parse_metrics(value):
+    """Parses a comma separated `metrics` parameter, every metric when missing. Raises ValueError."""
+    if not value:
+        return tuple(STATS_METRICS)
+
+    requested = set()
+    for metric in value.split(","):
+        metric = metric.strip()
+        if metric not in STATS_METRICS:
+            raise ValueError(f"Invalid 'metrics' value: {metric}")
+        requested.add(metric)
+
+    return tuple(metric for metric in STATS_METRICS if metric in requested)
+
+
+def parse_percentiles(value):
+    """Parses a comma separated `percentiles` parameter (0 to 100). Raises ValueError."""
+    if not value:
+        return DEFAULT_PERCENTILES
+
+    percentiles = []
+    for percent in value.split(","):
+        try:
+            percent = float(percent)
+        except ValueError:
+            raise ValueError(f"Invalid 'percentiles' value: {percent.strip()}")
+        if not 0 <= percent <= 100:
+            raise ValueError("Percentiles must be between 0 and 100")
+        percentiles.append(percent)
+
+    if len(percentiles) > MAX_PERCENTILES:
+        raise ValueError(f"At most {MAX_PERCENTILES} percentiles can be requested")
+    return tuple(sorted(set(percentiles)))
+
+
+def stats_results(groups, metrics, percentiles):
+    """The /stats results of one dimension's rollups."""
+    results = []
+    for group, games, aggregates in groups:
+        result = {"group": group, "games": games}
+        for metric in metrics:
+            aggregate = aggregates.get(metric)
+            result[metric] = aggregate.summary(percentiles) if aggregate else {"count": 0}
+        results.append(result)
+    return results
+
+
+def build_stats_table():
+    """Loads the rollups for the /stats endpoint, {dimension: [(group, games, {metric: Aggregate})]}."""
+    rollups = Rollups.load(db.session.connection())
+    db.session.rollback()
+
+    table = {dimension: [] for dimension in (ALL_GAMES, *STATS_DIMENSIONS)}
+    for (dimension, group), (games, aggregates) in (rollups.groups.items() if rollups else []):
+        if dimension == ALL_GAMES:
+            group = None
+        elif dimension == "release_year":
+            group = int(group)
+        elif dimension not in table:
+            continue
+        table[dimension].append((group, games, aggregates))
+
+    for dimension, groups in table.items():
+        if dimension == "release_year":
+            groups.sort(key=lambda item: item[0])
+        else:
+            groups.sort(key=lambda item: (-item[1], item[0]))
+    return table
+
+
+def get_stats_table():
+    """Returns the rollups, reloaded when the catalog version changes."""
+    return catalog_index("stats_table", build_stats_table)
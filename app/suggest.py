@@ -0,0 +1,123 @@
+import re
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+from sqlalchemy import select, func
+from . import db
+from .catalog import catalog_index
+from .models import Game, Rating, GameMedia
+
+# Most suggestions a request can ask for
+MAX_SUGGESTIONS = 20
+
+# Only this many characters of each name are indexed, which bounds the key sizes
+MAX_KEY_LENGTH = 32
+
+# Prefixes up to this length get their ranked suggestions precomputed, as
+# they match too many names to rank at request time
+TOP_PREFIX_LENGTH = 2
+
+NON_WORD_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalise(text):
+    """Lower-cases text, strips accents and turns punctuation runs into single spaces."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return NON_WORD_PATTERN.sub(" ", text.lower()).strip()
+
+
+class SuggestIndex:
+    """
+    In-memory prefix index for name autocomplete.
+
+    Every word of a normalised name is a key (the rest of the name from
+    that word, cut at MAX_KEY_LENGTH), so "life" finds "Half-Life". Keys
+    are kept in one sorted list and a prefix is a bisect range of it. Games
+    are numbered by rank (most total ratings first, then by name), so the
+    best matches of a range are its smallest numbers, found with a partial
+    partition instead of a sort.
+
+    Memory is about 100 bytes per indexed word (key string, list slot and
+    rank) plus the names, e.g. ~7 MB for 27,000 games, and MAX_SUGGESTIONS
+    ranks per precomputed short prefix.
+    """
+
+    def __init__(self, keys, ranks, appids, names, top):
+        self.keys = keys
+        self.ranks = ranks
+        self.appids = appids
+        self.names = names
+        self.top = top
+
+    @classmethod
+    def build(cls):
+        rows = db.session.execute(
+            select(Game.appid, Game.name)
+            .join(Rating, Game.appid == Rating.appid)
+            .join(GameMedia, Game.appid == GameMedia.appid)
+            .order_by(func.coalesce(Rating.total_ratings, 0).desc(), Game.name, Game.appid)
+        ).all()
+
+        appids = [row[0] for row in rows]
+        names = [row[1] for row in rows]
+
+        entries = []
+        for rank, name in enumerate(names):
+            normalised = normalise(name or "")
+            starts = [0] + [match.end() for match in re.finditer(" ", normalised)]
+            for start in starts:
+                entries.append((normalised[start:start + MAX_KEY_LENGTH], rank))
+        entries.sort()
+
+        keys = [key for key, _ in entries]
+        ranks = np.fromiter((rank for _, rank in entries), dtype=np.int32, count=len(entries))
+        index = cls(keys, ranks, appids, names, {})
+
+        # Short prefixes match large ranges, so their suggestions are ranked once
+        prefixes = {key[:length] for key in keys for length in range(1, min(TOP_PREFIX_LENGTH, len(key)) + 1)}
+        index.top = {prefix: index.best(prefix, MAX_SUGGESTIONS) for prefix in prefixes}
+        return index
+
+    def best(self, prefix, limit):
+        """The `limit` best ranks among the keys starting with `prefix`."""
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + "\uffff", low)
+        return smallest_unique(self.ranks[low:high], limit).tolist()
+
+    def suggest(self, text, limit=10):
+        """Returns up to `limit` (appid, name) pairs of games with a word starting with `text`."""
+        prefix = normalise(text)
+        if not prefix:
+            return []
+
+        # A trailing space or punctuation ends the last word ("half " skips "halfway")
+        if NON_WORD_PATTERN.match(text[-1]):
+            prefix += " "
+        prefix = prefix[:MAX_KEY_LENGTH]
+
+        if len(prefix) <= TOP_PREFIX_LENGTH:
+            ranks = self.top.get(prefix, [])[:limit]
+        else:
+            ranks = self.best(prefix, limit)
+
+        return [(self.appids[rank], self.names[rank]) for rank in ranks]
+
+
+def smallest_unique(values, limit):
+    """The `limit` smallest distinct values of an array, in order."""
+    count = limit
+    while len(values) > count:
+        # The count + 1 smallest values hold the smallest distinct ones, unless
+        # a game matched several times; then look further
+        candidates = np.unique(np.partition(values, count)[:count + 1])
+        if len(candidates) >= limit:
+            return candidates[:limit]
+        count *= 4
+
+    return np.unique(values)[:limit]
+
+
+def get_suggest_index():
+    """Returns the autocomplete index, rebuilt when the catalog is reloaded."""
+    return catalog_index("suggest_index", SuggestIndex.build)
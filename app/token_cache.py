@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from .metrics import token_cache_lookups
+
+# Lightweight copy of the user row, safe to share between requests and threads
+UserSnapshot = namedtuple("UserSnapshot", ["id", "name", "email"])
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified API tokens.
+
+    Maps a raw token to a UserSnapshot, so repeat calls with the same token
+    skip both the signature check and the user lookup. Entries expire at
+    the token's own `exp` claim, or `ttl` seconds after they were cached if
+    that comes first.
+
+    Each worker has its own cache, and invalidate_user() only reaches the
+    worker it runs in. A user deleted elsewhere (another worker, a script)
+    keeps working in the other workers for at most `ttl` seconds.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Returns the user of a cached, unexpired token, else None."""
+        with self._lock:
+            entry = self._entries.get(token)
+
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[token]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                token_cache_lookups.inc("miss")
+                return None
+
+            self._entries.move_to_end(token)
+            self.hits += 1
+            token_cache_lookups.inc("hit")
+            return entry[1]
+
+    def put(self, token, payload, user):
+        """Caches a verified token until its `exp` claim (or the ttl), evicting the least recently used."""
+        expires_at = payload.get("exp")
+        if expires_at is None or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[token] = (min(expires_at, time.time() + self.ttl), user)
+            self._entries.move_to_end(token)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Drops every cached token belonging to a user, in this worker."""
+        with self._lock:
+            stale = [token for token, (_, user) in self._entries.items() if user.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns the hit and miss counters and the current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
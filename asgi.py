@@ -0,0 +1,8 @@
+from app import create_app
+from app.asgi import AsgiApp
+
+# Async serving mode: the same app behind an ASGI server, with catalog work
+# on a bounded thread pool (ASGI_WORKERS). Needs an ASGI server, e.g.
+#   pip install uvicorn
+#   uvicorn asgi:application --workers 4
+application = AsgiApp(create_app())
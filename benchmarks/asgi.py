@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from app import create_app, db
+from app.auth import generate_token
+from app.models import User
+from .driver import build_workload, WORKLOAD_SIZE
+
+# Throughput and tail latency of the sync server (werkzeug, a thread per
+# connection) against the ASGI mode (uvicorn, catalog work on a bounded
+# pool) with 100 to 1000 concurrent keep-alive clients, e.g.
+#   python -m benchmarks.asgi --database data/bench/steam.sqlite
+# Each server runs in its own process; needs uvicorn for the ASGI mode.
+CLIENTS = (100, 250, 500, 1000)
+DURATION = 10.0
+
+# Same settings for both servers: no response cache, so requests reach SQLite,
+# and no admission control, so every request is served
+SERVER_CONFIG = {"RESPONSE_CACHE_MAX_ENTRY_BYTES": 0, "METRICS_ENABLED": False, "ADMISSION_ENABLED": False}
+
+
+def serve(mode, port, database):
+    """Runs one server until killed (in the child process)."""
+    config = dict(SERVER_CONFIG)
+    if database:
+        config["CATALOG_DATABASE"] = database
+    app = create_app(config)
+
+    if mode == "sync":
+        app.run(port=port, threaded=True)
+        return
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The ASGI mode needs uvicorn: pip install uvicorn")
+
+    from app.asgi import AsgiApp
+    uvicorn.run(AsgiApp(app), port=port, log_level="warning", backlog=4096)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Server on port {port} did not start")
+
+
+async def read_response(reader):
+    """Reads one HTTP/1.1 response, returns (status, keep_alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        return status, False
+
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(port, token, urls, offset, deadline, samples):
+    """One keep-alive client sending requests back to back until the deadline."""
+    reader = writer = None
+    position = offset
+
+    while time.perf_counter() < deadline:
+        url = urls[position % len(urls)]
+        position += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2 ** 20)
+            writer.write(
+                f"GET {url} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n\r\n".encode()
+            )
+            status, keep_alive = await asyncio.wait_for(read_response(reader), deadline - start + 30)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            status, keep_alive = 0, False
+
+        samples.append((time.perf_counter() - start, status))
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, token, urls, clients, duration):
+    samples = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        client(port, token, urls, number * len(urls) // clients, deadline, samples)
+        for number in range(clients)
+    ))
+    return samples, time.perf_counter() - start
+
+
+def report(mode, clients, samples, elapsed):
+    latencies = sorted(seconds * 1000 for seconds, status in samples if status == 200)
+    errors = sum(1 for _, status in samples if status != 200)
+    if not latencies:
+        print(f"{mode:<5} clients={clients:<5} no successful requests, {errors} errors")
+        return
+
+    def percentile(share):
+        return latencies[min(int(len(latencies) * share), len(latencies) - 1)]
+
+    print(f"{mode:<5} clients={clients:<5} {len(latencies) / elapsed:8.1f} req/s  "
+          f"p50={percentile(0.5):8.1f} ms  p99={percentile(0.99):8.1f} ms  "
+          f"p99.9={percentile(0.999):8.1f} ms  mean={statistics.mean(latencies):8.1f} ms  errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the sync and ASGI serving modes.")
+    parser.add_argument("--database", help="catalog database (default data/steam.sqlite)")
+    parser.add_argument("--clients", default=",".join(map(str, CLIENTS)), help="comma separated client counts")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per run")
+    parser.add_argument("--serve", choices=("sync", "asgi"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database) if args.database else None
+    if args.serve:
+        serve(args.serve, args.port, database)
+        return
+
+    app = create_app({"CATALOG_DATABASE": database} if database else None)
+    with app.app_context():
+        user = db.session.execute(db.select(User).limit(1)).scalar_one_or_none()
+        if user is None:
+            raise SystemExit("No user found, generate the catalog with benchmarks.generate or register one.")
+    with app.test_request_context():
+        token = generate_token(user.id)
+    urls = [url for _, url in build_workload(app, WORKLOAD_SIZE, seed=1)]
+
+    for mode in ("sync", "asgi"):
+        port = free_port()
+        command = [sys.executable, "-m", "benchmarks.asgi", "--serve", mode, "--port", str(port)]
+        if database:
+            command += ["--database", database]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        try:
+            wait_for(port)
+            # Warm up the server's in-memory indexes
+            asyncio.run(load(port, token, urls, 4, 2.0))
+
+            for clients in (int(count) for count in args.clients.split(",")):
+                samples, elapsed = asyncio.run(load(port, token, urls, clients, args.duration))
+                report(mode, clients, samples, elapsed)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
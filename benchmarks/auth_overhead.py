@@ -0,0 +1,44 @@
+import statistics
+import time
+from run import app
+from app import db
+from app.auth import generate_token
+from app.models import User
+from app.routes import token_required
+
+# Time token_required alone, wrapped around a view that does nothing,
+# with a cold token cache (decode + user query) and a warm one.
+# Run with `python -m benchmarks.auth_overhead`; needs one user in the database.
+ITERATIONS = 5000
+
+
+@token_required
+def noop(user):
+    return user
+
+
+def run(label, clear_cache):
+    token_cache = app.extensions["token_cache"]
+    timings = []
+
+    for _ in range(ITERATIONS):
+        if clear_cache:
+            token_cache.clear()
+        start = time.perf_counter()
+        noop()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    timings.sort()
+    print(f"{label:<6} p50={timings[len(timings) // 2]:8.1f} us  "
+          f"p99={timings[int(len(timings) * 0.99)]:8.1f} us  mean={statistics.mean(timings):8.1f} us")
+
+
+with app.app_context():
+    user = db.session.execute(db.select(User).limit(1)).scalar_one_or_none()
+    if user is None:
+        raise SystemExit("No user found, register one first.")
+
+    with app.test_request_context(headers={"Authorization": f"Bearer {generate_token(user.id)}"}):
+        run("cold", clear_cache=True)
+        run("warm", clear_cache=False)
+        print("cache stats:", app.extensions["token_cache"].stats())
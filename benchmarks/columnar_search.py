@@ -0,0 +1,54 @@
+import statistics
+import time
+from run import app
+from app import db
+from app.auth import generate_token
+from app.models import User
+
+# Compare the columnar (NumPy) search path against the SQL path through the
+# full /api/games and /api/games/by-tag endpoints, with the response cache
+# cleared before every request. Broad name searches ("name=s") take the SQL
+# path either way, see columnar.columnar_enabled(). Run with
+# `python -m benchmarks.columnar_search`.
+ITERATIONS = 50
+
+QUERIES = [
+    "/api/games?name=the&limit=50&sort=-rating",
+    "/api/games?name=a&price_max=10&rating_min=80&limit=50&sort=-total_ratings",
+    "/api/games?name=s&genre=Action&platform=linux&limit=100",
+    "/api/games/by-tag?tag=Indie&price_min=5&limit=50&sort=-release_date",
+    "/api/games/by-tag?tag=RPG&platform=mac&rating_min=70&limit=50&sort=price",
+]
+
+
+def run(client, headers, url):
+    timings = []
+    for _ in range(ITERATIONS):
+        app.extensions["response_cache"].clear()
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], statistics.mean(timings)
+
+
+with app.app_context():
+    user = db.session.execute(db.select(User).limit(1)).scalar_one_or_none()
+    if user is None:
+        raise SystemExit("No user found, register one first.")
+
+with app.test_request_context():
+    headers = {"Authorization": f"Bearer {generate_token(user.id)}"}
+
+# Measure the endpoint, not the rate limiter
+app.config["ADMISSION_ENABLED"] = False
+client = app.test_client()
+for url in QUERIES:
+    print(url)
+    for label, columnar in (("sql", False), ("columnar", True)):
+        app.config["CATALOG_COLUMNAR"] = columnar
+        client.get(url, headers=headers)  # warm up the in-memory indexes
+        p50, p99, mean = run(client, headers, url)
+        print(f"  {label:<9} p50={p50:8.2f} ms  p99={p99:8.2f} ms  mean={mean:8.2f} ms")
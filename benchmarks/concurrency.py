@@ -0,0 +1,92 @@
+import threading
+import time
+from sqlalchemy import update
+from app import create_app, db
+from app.auth import generate_token
+from app.engine import DEFAULT_PRAGMAS
+from app.models import User
+
+# Request throughput of the catalog endpoints as the number of client
+# threads grows, with SQLite's defaults against the engine profile (WAL,
+# mmap, read-only catalog pool). A writer thread keeps updating the users
+# table meanwhile. Run with `python -m benchmarks.concurrency`; needs one
+# user in the database.
+THREADS = (1, 2, 4, 8, 16)
+DURATION = 3.0
+WRITES_PER_SECOND = 20
+
+QUERIES = [
+    "/api/games?name=the&limit=50&sort=-rating",
+    "/api/games?name=s&genre=Action&limit=100",
+    "/api/games/by-tag?tag=Indie&price_min=5&limit=50",
+    "/api/games/facets?name=a&price_max=20",
+    "/api/tags",
+]
+
+PROFILES = {
+    "defaults": {
+        "CATALOG_READ_ONLY": False,
+        "SQLITE_PRAGMAS": {**{name: None for name in DEFAULT_PRAGMAS}, "journal_mode": "delete"},
+    },
+    "profile": {},
+}
+
+
+def client_loop(app, headers, deadline, counts):
+    client = app.test_client()
+    done = 0
+    while time.perf_counter() < deadline:
+        response = client.get(QUERIES[done % len(QUERIES)], headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        done += 1
+    counts.append(done)
+
+
+def writer_loop(app, user_id, stop):
+    with app.app_context():
+        while not stop.is_set():
+            db.session.execute(update(User).where(User.id == user_id).values(name=User.name))
+            db.session.commit()
+            stop.wait(1 / WRITES_PER_SECOND)
+
+
+def run(app, headers, user_id, threads):
+    counts = []
+    stop = threading.Event()
+    writer = threading.Thread(target=writer_loop, args=(app, user_id, stop))
+    deadline = time.perf_counter() + DURATION
+    clients = [
+        threading.Thread(target=client_loop, args=(app, headers, deadline, counts))
+        for _ in range(threads)
+    ]
+
+    writer.start()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    stop.set()
+    writer.join()
+
+    return sum(counts) / DURATION
+
+
+for name, config in PROFILES.items():
+    # Responses are not cached so every request reaches the database
+    app = create_app({**config, "RESPONSE_CACHE_MAX_ENTRY_BYTES": 0, "METRICS_ENABLED": False, "ADMISSION_ENABLED": False})
+
+    with app.app_context():
+        user = db.session.execute(db.select(User).limit(1)).scalar_one_or_none()
+        if user is None:
+            raise SystemExit("No user found, register one first.")
+        user_id = user.id
+
+    with app.test_request_context():
+        headers = {"Authorization": f"Bearer {generate_token(user_id)}"}
+
+    for threads in THREADS:
+        print(f"{name:<9} threads={threads:<3} {run(app, headers, user_id, threads):8.1f} req/s")
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
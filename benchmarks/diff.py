@@ -0,0 +1,72 @@
+import argparse
+import json
+
+# Compares two results files of benchmarks.driver run by run (mode and
+# thread count), e.g. `python -m benchmarks.diff before.json after.json`.
+# Exits with status 1 when a metric got worse by more than --threshold percent.
+
+# Metric -> whether higher is better
+METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "sql_per_request": False,
+    "peak_rss_mb": False,
+}
+
+
+def change(before, after):
+    """Relative change in percent, None when it cannot be computed."""
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold):
+    """Prints every metric of the runs found in both files, returns the regressions."""
+    baseline = {(run["mode"], run["threads"]): run for run in before["runs"]}
+    regressions = []
+
+    for run in after["runs"]:
+        key = (run["mode"], run["threads"])
+        old = baseline.get(key)
+        if old is None:
+            continue
+
+        print(f"{run['mode']} threads={run['threads']}")
+        for metric, higher_is_better in METRICS.items():
+            percent = change(old.get(metric), run.get(metric))
+            worse = percent is not None and (-percent if higher_is_better else percent) > threshold
+            if worse:
+                regressions.append((key, metric, percent))
+            shown = "" if percent is None else f"{percent:+7.1f}%"
+            print(f"  {metric:<16} {old.get(metric)!s:>10} -> {run.get(metric)!s:>10} {shown}"
+                  f"{'  REGRESSION' if worse else ''}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files.")
+    parser.add_argument("before", help="baseline results JSON")
+    parser.add_argument("after", help="results JSON to compare")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as file:
+        before = json.load(file)
+    with open(args.after, encoding="utf-8") as file:
+        after = json.load(file)
+
+    print(f"{before.get('commit')} ({before['games']} games) -> {after.get('commit')} ({after['games']} games)")
+    if before["workload"] != after["workload"]:
+        print("Warning: the workloads differ, results are not comparable.")
+
+    regressions = compare(before, after, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions over {args.threshold}%")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
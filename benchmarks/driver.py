@@ -0,0 +1,263 @@
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from werkzeug.serving import make_server
+from app import create_app, db
+from app.auth import generate_token
+from app.models import Game, Genre, Platform, SteamSpyTag, User
+from .generate import BENCH_USER_EMAIL
+
+# Drives the catalog endpoints with a fixed mix of filter combinations and
+# saves throughput, latency percentiles, SQL statements per request and
+# peak RSS as JSON, e.g.
+#   python -m benchmarks.driver --database data/bench/steam.sqlite --output before.json
+#   python -m benchmarks.diff before.json after.json
+# Requests go through the Flask test client ("client") and through a real
+# threaded WSGI server over HTTP keep-alive connections ("server").
+MODES = ("client", "server")
+
+# Number of distinct request URLs in the workload
+WORKLOAD_SIZE = 200
+
+SQL_COUNT_PATTERN = re.compile(r'db;desc="(\d+) queries"')
+
+
+def build_workload(app, size, seed):
+    """
+    Builds `size` request URLs mixing the query shapes clients send, with
+    names, genres, tags and platforms taken from the catalog. Returns
+    (shape, url) pairs, the same ones for the same catalog and seed.
+    """
+    rng = random.Random(seed)
+
+    with app.app_context():
+        names = db.session.execute(db.select(Game.name).order_by(Game.appid).limit(5000)).scalars().all()
+        genres = db.session.execute(db.select(Genre.genre_name).order_by(Genre.genre_id)).scalars().all()
+        tags = db.session.execute(db.select(SteamSpyTag.tag_name).order_by(SteamSpyTag.tag_id)).scalars().all()
+        platforms = db.session.execute(db.select(Platform.platform_name).order_by(Platform.platform_id)).scalars().all()
+
+    words = sorted({word.lower() for name in names for word in re.findall(r"\w{3,}", name)})
+    sorts = ["appid", "-rating", "-total_ratings", "price", "-release_date"]
+
+    shapes = {
+        "games: name": lambda: {"name": rng.choice(words)},
+        "games: short name": lambda: {"name": rng.choice("aeiost")},
+        "games: name + genre + sort": lambda: {
+            "name": rng.choice(words), "genre": rng.choice(genres), "sort": rng.choice(sorts)
+        },
+        "games: name + price + rating": lambda: {
+            "name": rng.choice(words), "price_max": rng.choice((5, 10, 20)), "rating_min": rng.choice((60, 80, 90)),
+            "sort": "-total_ratings",
+        },
+        "games: fuzzy name": lambda: {"name": typo(rng, rng.choice(words)), "match": "fuzzy"},
+        "by-tag: tag": lambda: {"tag": rng.choice(tags[:20])},
+        "by-tag: tag + platform + price": lambda: {
+            "tag": rng.choice(tags), "platform": rng.choice(platforms), "price_min": rng.choice((1, 5)),
+            "sort": rng.choice(sorts),
+        },
+        "by-tag: tag + rating": lambda: {"tag": rng.choice(tags[:40]), "rating_min": 70, "sort": "-release_date"},
+    }
+    paths = {"games": "/api/games", "by-tag": "/api/games/by-tag"}
+
+    workload = []
+    for number in range(size):
+        shape = list(shapes)[number % len(shapes)]
+        params = {**shapes[shape](), "limit": rng.choice((20, 50, 100))}
+        workload.append((shape, f"{paths[shape.split(':')[0]]}?{urlencode(params)}"))
+
+    rng.shuffle(workload)
+    return workload
+
+
+def typo(rng, word):
+    """Swaps two neighbouring letters, as users mistype."""
+    if len(word) < 4:
+        return word
+    position = rng.randrange(len(word) - 1)
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def sql_count(headers):
+    """SQL statements of a response, from its Server-Timing header."""
+    match = SQL_COUNT_PATTERN.search(headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else None
+
+
+def client_worker(app, headers, workload, offset, deadline, samples):
+    client = app.test_client()
+    position = offset
+    while time.perf_counter() < deadline:
+        shape, url = workload[position % len(workload)]
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        response.get_data()
+        samples.append((shape, time.perf_counter() - start, response.status_code, sql_count(response.headers)))
+        position += 1
+
+
+def server_worker(port, headers, workload, offset, deadline, samples):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    position = offset
+    while time.perf_counter() < deadline:
+        shape, url = workload[position % len(workload)]
+        start = time.perf_counter()
+        connection.request("GET", url, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        samples.append((shape, time.perf_counter() - start, response.status, sql_count(response.headers)))
+        position += 1
+    connection.close()
+
+
+def percentile(values, share):
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def summarise(samples):
+    """Latency percentiles (ms), error count and SQL statements per request of some samples."""
+    latencies = sorted(seconds * 1000 for _, seconds, _, _ in samples)
+    counts = [count for _, _, _, count in samples if count is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status, _ in samples if status >= 400),
+        "p50_ms": round(percentile(latencies, 0.5), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "max_ms": round(latencies[-1], 3),
+        "sql_per_request": round(statistics.mean(counts), 2) if counts else None,
+    }
+
+
+def run(mode, app, headers, workload, threads, duration, port=None):
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    if mode == "client":
+        target, args = client_worker, (app, headers)
+    else:
+        target, args = server_worker, (port, headers)
+
+    # Each thread starts at another place of the workload
+    workers = [
+        threading.Thread(target=target, args=(*args, workload, number * len(workload) // threads, deadline, samples))
+        for number in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    by_shape = {}
+    for sample in samples:
+        by_shape.setdefault(sample[0], []).append(sample)
+
+    return {
+        "mode": mode,
+        "threads": threads,
+        "throughput": round(len(samples) / elapsed, 1),
+        **summarise(samples),
+        # Peak of the whole process (server and clients), in MB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "shapes": {shape: summarise(shape_samples) for shape, shape_samples in sorted(by_shape.items())},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the catalog endpoints.")
+    parser.add_argument("--database", help="catalog database (default data/steam.sqlite)")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated modes: client, server")
+    parser.add_argument("--threads", default="1,8,32", help="comma separated client thread counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--seed", type=int, default=1, help="workload random seed")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--output", help="JSON file for the results")
+    args = parser.parse_args()
+
+    config = {"METRICS_ENABLED": False, "ADMISSION_ENABLED": False}
+    if args.database:
+        config["CATALOG_DATABASE"] = os.path.abspath(args.database)
+    if not args.cache:
+        # Every request reaches the query and serialisation code
+        config["RESPONSE_CACHE_MAX_ENTRY_BYTES"] = 0
+    app = create_app(config)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    with app.app_context():
+        user = db.session.execute(db.select(User).where(User.email == BENCH_USER_EMAIL)).scalar_one_or_none()
+        if user is None:
+            user = db.session.execute(db.select(User).limit(1)).scalar_one_or_none()
+        if user is None:
+            raise SystemExit("No user found, generate the catalog with benchmarks.generate or register one.")
+        games = db.session.execute(db.select(db.func.count()).select_from(Game)).scalar()
+
+    with app.test_request_context():
+        headers = {"Authorization": f"Bearer {generate_token(user.id)}"}
+
+    workload = build_workload(app, WORKLOAD_SIZE, args.seed)
+
+    # Warm up the in-memory indexes with one pass over the workload
+    client = app.test_client()
+    for _, url in workload:
+        response = client.get(url, headers=headers)
+        if response.status_code != 200:
+            raise SystemExit(f"{url}: {response.status_code} {response.get_data(as_text=True)}")
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    runs = []
+    try:
+        for mode in args.modes.split(","):
+            for threads in (int(count) for count in args.threads.split(",")):
+                result = run(mode, app, headers, workload, threads, args.duration, server.server_port)
+                runs.append(result)
+                print(f"{mode:<6} threads={threads:<4} {result['throughput']:8.1f} req/s  "
+                      f"p50={result['p50_ms']:8.2f} ms  p99={result['p99_ms']:8.2f} ms  "
+                      f"sql/req={result['sql_per_request']}  errors={result['errors']}  "
+                      f"rss={result['peak_rss_mb']} MB")
+    finally:
+        server.shutdown()
+
+    results = {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+        "games": games,
+        "settings": vars(args),
+        "workload": [url for _, url in workload],
+        "runs": runs,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import statistics
+import time
+from run import app
+from app import db
+from app.auth import generate_token
+from app.facets import LATENCY_BUDGET_MS
+from app.models import User
+
+# Latency of /api/games/facets (match every filter, then count every facet
+# value) on the columnar path, with the response cache cleared before each
+# request, against LATENCY_BUDGET_MS. Run with `python -m benchmarks.facets`.
+ITERATIONS = 200
+
+QUERIES = [
+    "/api/games/facets",
+    "/api/games/facets?genre=Indie",
+    "/api/games/facets?platform=linux,!mac&price_max=10",
+    "/api/games/facets?name=the&rating_min=80",
+    "/api/games/facets?genre=Action|Adventure&category=Multi-player",
+]
+
+
+def run(client, headers, url):
+    timings = []
+    for _ in range(ITERATIONS):
+        app.extensions["response_cache"].clear()
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], statistics.mean(timings)
+
+
+with app.app_context():
+    user = db.session.execute(db.select(User).limit(1)).scalar_one_or_none()
+    if user is None:
+        raise SystemExit("No user found, register one first.")
+
+with app.test_request_context():
+    headers = {"Authorization": f"Bearer {generate_token(user.id)}"}
+
+# Measure the endpoint, not the rate limiter
+app.config["ADMISSION_ENABLED"] = False
+client = app.test_client()
+app.config["CATALOG_COLUMNAR"] = True
+for url in QUERIES:
+    client.get(url, headers=headers)  # warm up the in-memory indexes
+    p50, p99, mean = run(client, headers, url)
+    print(f"{url:<66} p50={p50:6.2f} ms  p99={p99:6.2f} ms  mean={mean:6.2f} ms  "
+          f"{'OK' if p99 <= LATENCY_BUDGET_MS else 'OVER BUDGET'}")
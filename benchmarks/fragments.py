@@ -0,0 +1,58 @@
+import statistics
+import time
+from app import create_app, db
+from app.auth import generate_token
+from app.fragments import get_fragment_store
+from app.models import User
+
+# Latency of full result pages re-serialised on every request, spliced from
+# lazily filled fragments, and from fragments precomputed at load time, with
+# the response cache off. Run with `python -m benchmarks.fragments`.
+ITERATIONS = 50
+
+QUERIES = [
+    "/api/games?name=the&limit=100&sort=-rating",
+    "/api/games?name=s&genre=Action&limit=1000",
+    "/api/games?name=a&limit=200&sort=name",
+    "/api/games/by-tag?tag=Indie&limit=1000&sort=-release_date",
+]
+
+PROFILES = {
+    "encode": {"RESULT_FRAGMENTS": False},
+    "lazy": {},
+    "precompute": {"FRAGMENTS_PRECOMPUTE": True},
+}
+
+
+def run(client, headers, url):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], statistics.mean(timings)
+
+
+for name, config in PROFILES.items():
+    app = create_app({**config, "RESPONSE_CACHE_MAX_ENTRY_BYTES": 0, "METRICS_ENABLED": False, "ADMISSION_ENABLED": False})
+
+    with app.app_context():
+        user = db.session.execute(db.select(User).limit(1)).scalar_one_or_none()
+        if user is None:
+            raise SystemExit("No user found, register one first.")
+
+        start = time.perf_counter()
+        store = get_fragment_store()
+        print(f"{name}: store ready in {(time.perf_counter() - start) * 1000:.0f} ms, {store.stats()}")
+
+    with app.test_request_context():
+        headers = {"Authorization": f"Bearer {generate_token(user.id)}"}
+
+    client = app.test_client()
+    for url in QUERIES:
+        client.get(url, headers=headers)  # warm up the in-memory indexes and fragments
+        p50, p99, mean = run(client, headers, url)
+        print(f"  {url:<60} p50={p50:8.2f} ms  p99={p99:8.2f} ms  mean={mean:8.2f} ms")
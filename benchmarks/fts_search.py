@@ -0,0 +1,45 @@
+import random
+import statistics
+import time
+from sqlalchemy import select, func
+from run import app
+from app import db
+from app.models import Game
+from app.search import name_filter, fts_available
+
+# Compare FTS5 name search against the old substring scan on data/steam.sqlite.
+# Run `python build_fts.py` first, then `python -m benchmarks.fts_search`.
+SAMPLES = 300
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(label, make_filter, terms):
+    timings = []
+    for term in terms:
+        start = time.perf_counter()
+        db.session.execute(select(Game.appid).where(make_filter(term))).all()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"{label:<10} p50={percentile(timings, 50):8.3f} ms  p99={percentile(timings, 99):8.3f} ms  "
+          f"mean={statistics.mean(timings):8.3f} ms")
+
+
+with app.app_context():
+    if not fts_available():
+        raise SystemExit("FTS index missing, run build_fts.py first.")
+
+    # Search terms: the first word of randomly chosen game names, some cut to a prefix
+    rng = random.Random(42)
+    names = db.session.execute(select(Game.name).order_by(func.random()).limit(SAMPLES)).scalars().all()
+    terms = []
+    for name in names:
+        word = (name.split() or [name])[0]
+        terms.append(word[:rng.randint(2, len(word))] if len(word) > 2 else word)
+
+    print(f"{len(terms)} searches over {db.session.query(Game).count()} games")
+    run("substring", lambda term: Game.name.ilike(f"%{term}%"), terms)
+    run("fts5", lambda term: name_filter(term), terms)
@@ -0,0 +1,216 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+import time
+from datetime import date, timedelta
+from app import create_app, db
+from app.importer import CatalogImporter, STEAM_FILE, DESCRIPTION_FILE, MEDIA_FILE
+from app.models import User
+
+# Deterministic synthetic Steam catalog for the benchmarks. Writes the three
+# dataset CSVs and loads them with the catalog importer, so the database is
+# built exactly like a real import, e.g.
+#   python -m benchmarks.generate data/bench --games 100000 --seed 1
+# The same --games and --seed always give the same catalog.
+BENCH_USER_EMAIL = "bench@example.com"
+BENCH_USER_PASSWORD = "bench"
+
+# Genre, category and platform shares, roughly those of the Steam Store Games dataset
+GENRES = {
+    "Indie": 0.69, "Action": 0.44, "Casual": 0.38, "Adventure": 0.37, "Strategy": 0.19,
+    "Simulation": 0.19, "RPG": 0.16, "Early Access": 0.11, "Free to Play": 0.06, "Sports": 0.05,
+    "Racing": 0.04, "Massively Multiplayer": 0.03, "Violent": 0.02, "Gore": 0.01, "Nudity": 0.01,
+    "Utilities": 0.005, "Sexual Content": 0.005, "Design & Illustration": 0.003,
+    "Animation & Modeling": 0.003, "Education": 0.002,
+}
+CATEGORIES = {
+    "Single-player": 0.95, "Steam Achievements": 0.54, "Steam Trading Cards": 0.29, "Steam Cloud": 0.27,
+    "Full controller support": 0.2, "Multi-player": 0.16, "Partial Controller Support": 0.15,
+    "Steam Leaderboards": 0.14, "Online Multi-Player": 0.12, "Shared/Split Screen": 0.08,
+    "Co-op": 0.06, "Online Co-op": 0.06, "Local Multi-Player": 0.06, "Stats": 0.06, "Local Co-op": 0.05,
+    "Cross-Platform Multiplayer": 0.04, "Steam Workshop": 0.04, "Includes level editor": 0.04,
+    "In-App Purchases": 0.03, "VR Support": 0.02, "Captions available": 0.02, "MMO": 0.02,
+    "Commentary available": 0.01, "Valve Anti-Cheat enabled": 0.003,
+}
+PLATFORMS = {"windows": 0.999, "mac": 0.22, "linux": 0.15}
+
+# SteamSpy tags, most used first; each game gets 1 to 3 drawn with Zipf weights
+TAGS = [
+    "Indie", "Action", "Casual", "Adventure", "Strategy", "Simulation", "RPG", "Early Access",
+    "Free to Play", "Puzzle", "VR", "Sports", "Racing", "Platformer", "Horror", "Anime",
+    "Visual Novel", "Massively Multiplayer", "Shooter", "Survival", "Open World", "Sandbox",
+    "Pixel Graphics", "Point & Click", "FPS", "Arcade", "Story Rich", "2D", "Retro", "Sci-fi",
+    "Violent", "Management", "Tower Defense", "Turn-Based", "Roguelike", "Nudity", "Fantasy",
+    "Hidden Object", "Zombies", "Space", "Multiplayer", "Co-op", "Gore", "Sexual Content",
+    "Classic", "Stealth", "Exploration", "Cute", "Atmospheric", "Dark", "Female Protagonist",
+    "Shoot 'Em Up", "Bullet Hell", "Education", "Card Game", "Board Game", "Music", "Rhythm",
+    "Metroidvania", "Physics", "Mystery", "Funny", "Comedy", "Psychological Horror", "Fighting",
+    "Hack and Slash", "Building", "Crafting", "Medieval", "War", "World War II", "Military",
+    "Historical", "City Builder", "Economy", "Base Building", "Real-Time", "RTS", "Tactical",
+    "Wargame", "Grand Strategy", "4X", "Dungeon Crawler", "Rogue-lite", "JRPG", "Action RPG",
+    "Party-Based RPG", "Choices Matter", "Multiple Endings", "Character Customization",
+    "Post-apocalyptic", "Cyberpunk", "Steampunk", "Mechs", "Robots", "Aliens", "Dragons",
+    "Magic", "Pirates", "Ninja", "Western", "Noir", "Detective", "Walking Simulator",
+    "Driving", "Flight", "Naval", "Trains", "Farming Sim", "Life Sim", "Dating Sim",
+    "Local Multiplayer", "Split Screen", "Moddable", "Level Editor", "Procedural Generation",
+    "Replay Value", "Difficult", "Relaxing", "Family Friendly", "Minimalist", "Abstract",
+    "Cartoony", "Hand-drawn", "Colorful", "Beautiful", "Great Soundtrack", "Soundtrack",
+    "Software", "Utilities", "Design & Illustration", "Animation & Modeling", "Game Development",
+]
+TAG_WEIGHTS = list(itertools.accumulate(1 / rank ** 1.1 for rank in range(1, len(TAGS) + 1)))
+
+OWNERS = {
+    "0-20000": 0.68, "20000-50000": 0.11, "50000-100000": 0.06, "100000-200000": 0.05,
+    "200000-500000": 0.05, "500000-1000000": 0.02, "1000000-2000000": 0.015,
+    "2000000-5000000": 0.01, "5000000-10000000": 0.003, "10000000-20000000": 0.001,
+}
+OWNER_WEIGHTS = list(itertools.accumulate(OWNERS.values()))
+
+PRICES = [0.79, 0.99, 1.99, 2.89, 3.99, 4.99, 5.79, 6.99, 7.19, 9.99, 11.39, 14.99, 19.99, 24.99, 29.99, 39.99, 49.99]
+PRICE_WEIGHTS = list(itertools.accumulate(1 / (rank + 2) for rank in range(len(PRICES))))
+FREE_SHARE = 0.09
+
+# Releases per year grow ~35% a year up to 2019, like Steam's
+YEARS = list(range(1997, 2020))
+YEAR_WEIGHTS = list(itertools.accumulate(1.35 ** (year - YEARS[0]) for year in YEARS))
+
+NAME_WORDS = [
+    "dark", "space", "legend", "city", "farm", "hero", "zombie", "dragon", "shadow", "star",
+    "quest", "war", "knight", "empire", "tower", "dungeon", "island", "ghost", "iron", "blood",
+    "pixel", "neon", "lost", "last", "wild", "crystal", "storm", "void", "rogue", "galaxy",
+    "kingdom", "castle", "forest", "ocean", "sky", "night", "world", "tales", "chronicles", "simulator",
+    "racer", "tycoon", "defense", "escape", "hunter", "soul", "fire", "frost", "machine", "planet",
+]
+SUBTITLES = ["Remastered", "Deluxe Edition", "Origins", "Reborn", "Director's Cut", "Online", "VR", "Gold"]
+
+STEAM_COLUMNS = [
+    "appid", "name", "release_date", "english", "developer", "publisher", "platforms", "required_age",
+    "categories", "genres", "steamspy_tags", "achievements", "positive_ratings", "negative_ratings",
+    "average_playtime", "median_playtime", "owners", "price",
+]
+
+
+def pick_shares(rng, shares):
+    """Independently draws the names of a {name: share} table, at least the most common one."""
+    names = [name for name, share in shares.items() if rng.random() < share]
+    return names or [next(iter(shares))]
+
+
+def game_name(rng):
+    words = [rng.choice(NAME_WORDS) for _ in range(rng.choice((1, 2, 2, 3)))]
+    name = " ".join(words).title()
+    if rng.random() < 0.15:
+        name += f" {rng.randint(2, 5)}"
+    if rng.random() < 0.1:
+        name += f": {rng.choice(SUBTITLES)}"
+    return name
+
+
+def generate_games(games, seed):
+    """Yields the steam.csv rows of `games` synthetic games, the same ones for the same seed."""
+    rng = random.Random(seed)
+    studios = [f"{game_name(rng)} Studios" for _ in range(max(games // 4, 1))]
+
+    for number in range(games):
+        appid = 10 + number * 10
+        owners = rng.choices(list(OWNERS), cum_weights=OWNER_WEIGHTS)[0]
+        owners_lower = int(owners.split("-")[0])
+
+        # Ratings grow with the owners, the share of positive ones is skewed high
+        total = int(rng.lognormvariate(0, 1.2) * (owners_lower + 10000) / 200)
+        positive = int(total * rng.betavariate(5, 2))
+        playing = rng.random() < 0.25
+        average = int(rng.lognormvariate(5, 1.5)) if playing else 0
+
+        year = rng.choices(YEARS, cum_weights=YEAR_WEIGHTS)[0]
+        released = date(year, 1, 1) + timedelta(days=rng.randrange(365))
+
+        # A few studios make many games
+        if rng.random() < 0.3:
+            developer = studios[min(int(rng.paretovariate(1.2)) - 1, len(studios) - 1)]
+        else:
+            developer = rng.choice(studios)
+        tags = dict.fromkeys(rng.choices(TAGS, cum_weights=TAG_WEIGHTS, k=rng.randint(1, 3)))
+
+        yield {
+            "appid": appid,
+            "name": game_name(rng),
+            "release_date": released.isoformat(),
+            "english": int(rng.random() < 0.98),
+            "developer": developer,
+            "publisher": developer if rng.random() < 0.6 else rng.choice(studios),
+            "platforms": ";".join(pick_shares(rng, PLATFORMS)),
+            "required_age": rng.choices((0, 12, 16, 18), weights=(0.97, 0.005, 0.01, 0.015))[0],
+            "categories": ";".join(pick_shares(rng, CATEGORIES)),
+            "genres": ";".join(pick_shares(rng, GENRES)),
+            "steamspy_tags": ";".join(tags),
+            "achievements": rng.randint(1, 100) if rng.random() < 0.5 else 0,
+            "positive_ratings": positive,
+            "negative_ratings": total - positive,
+            "average_playtime": average,
+            "median_playtime": int(average * rng.uniform(0.3, 1.0)),
+            "owners": owners,
+            "price": 0.0 if rng.random() < FREE_SHARE else rng.choices(PRICES, cum_weights=PRICE_WEIGHTS)[0],
+        }
+
+
+def write_dataset(directory, games, seed):
+    """Writes steam.csv, steam_description_data.csv and steam_media_data.csv into `directory`."""
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, STEAM_FILE), "w", newline="", encoding="utf-8") as steam, \
+            open(os.path.join(directory, DESCRIPTION_FILE), "w", newline="", encoding="utf-8") as descriptions, \
+            open(os.path.join(directory, MEDIA_FILE), "w", newline="", encoding="utf-8") as media:
+        steam_writer = csv.DictWriter(steam, STEAM_COLUMNS)
+        description_writer = csv.writer(descriptions)
+        media_writer = csv.writer(media)
+
+        steam_writer.writeheader()
+        description_writer.writerow(["steam_appid", "short_description"])
+        media_writer.writerow(["steam_appid", "header_image"])
+
+        for game in generate_games(games, seed):
+            steam_writer.writerow(game)
+            genre = game["genres"].split(";")[0].lower()
+            tag = game["steamspy_tags"].split(";")[0].lower()
+            description_writer.writerow([game["appid"], f"{game['name']} is a {genre} game about {tag}."])
+            media_writer.writerow([
+                game["appid"], f"https://steamcdn-a.akamaihd.net/steam/apps/{game['appid']}/header.jpg"
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Steam catalog database.")
+    parser.add_argument("output", help="directory for the CSVs and steam.sqlite")
+    parser.add_argument("--games", type=int, default=10000, help="number of games (10k to 1M)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    path = os.path.abspath(os.path.join(args.output, "steam.sqlite"))
+    for stale in (path, f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    start = time.perf_counter()
+    write_dataset(os.path.join(args.output, "csv"), args.games, args.seed)
+    print(f"CSVs of {args.games} games written in {time.perf_counter() - start:.1f} s.")
+
+    app = create_app({"CATALOG_DATABASE": path, "CATALOG_READ_ONLY": False})
+    with app.app_context():
+        start = time.perf_counter()
+        with db.engine.begin() as connection:
+            CatalogImporter(connection).run(os.path.join(args.output, "csv"))
+        print(f"Imported into {path} in {time.perf_counter() - start:.1f} s.")
+
+        # The benchmark driver signs its requests as this user
+        db.create_all(bind_key="users")
+        user = User(name="bench", email=BENCH_USER_EMAIL)
+        user.set_password(BENCH_USER_PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
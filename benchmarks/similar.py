@@ -0,0 +1,40 @@
+import random
+import statistics
+import time
+from run import app
+from app.columnar import get_catalog_columns
+from app.similar import SimilarityIndex, LATENCY_BUDGET_MS
+
+# Latency of one live /games/<appid>/similar computation (cosine top 10 over
+# the whole catalog), unfiltered and with a price/platform mask, against
+# LATENCY_BUDGET_MS. Run with `python -m benchmarks.similar`.
+ITERATIONS = 1000
+
+
+def run(label, index, appids, mask=None):
+    timings = []
+    for appid in appids:
+        start = time.perf_counter()
+        index.similar(appid, 10, mask)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"{label:<9} p50={timings[len(timings) // 2]:6.2f} ms  p99={p99:6.2f} ms  "
+          f"mean={statistics.mean(timings):6.2f} ms  {'OK' if p99 <= LATENCY_BUDGET_MS else 'OVER BUDGET'}")
+
+
+with app.app_context():
+    start = time.perf_counter()
+    index = SimilarityIndex.build()
+    print(f"build: {(time.perf_counter() - start) * 1000:.0f} ms for {len(index.appids)} games")
+
+    appids = random.Random(1).choices(index.appids.tolist(), k=ITERATIONS)
+    columns = get_catalog_columns()
+    criteria = {
+        "name": None, "match": "exact", "search_fields": ["name"], "release_year": None,
+        "facets": {"platforms": "linux"}, "ranges": {"price": (None, 10.0)},
+    }
+
+    run("all", index, appids, columns.listed)
+    run("filtered", index, appids, columns.mask(criteria))
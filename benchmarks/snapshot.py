@@ -0,0 +1,45 @@
+import os
+import time
+import tracemalloc
+from run import app
+from app.columnar import CatalogColumns
+from app.facets import FacetIndex
+from app.fuzzy import TrigramIndex
+from app.similar import SimilarityIndex
+from app.snapshot import get_catalog_snapshot
+
+# Time and Python heap taken by each in-memory catalog index when a worker
+# builds it from SQL and from the memory-mapped snapshot (build it first
+# with build_snapshot.py). Run with `python -m benchmarks.snapshot`.
+INDEXES = {
+    "columns": CatalogColumns.build,
+    "facets": FacetIndex.build,
+    "trigrams": TrigramIndex.build,
+    "similarity": SimilarityIndex.build,
+}
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = build()
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del index
+    return elapsed * 1000, memory / 1024 / 1024
+
+
+with app.app_context():
+    path = app.config["CATALOG_SNAPSHOT"]
+    if get_catalog_snapshot() is None:
+        raise SystemExit(f"No snapshot of the current catalog at {path}, run build_snapshot.py")
+    print(f"snapshot: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+    for name, build in INDEXES.items():
+        app.config["CATALOG_SNAPSHOT"] = None
+        sql_time, sql_memory = measure(build)
+        app.config["CATALOG_SNAPSHOT"] = path
+        mapped_time, mapped_memory = measure(build)
+        print(f"{name:<10} sql: {sql_time:7.1f} ms {sql_memory:6.1f} MB   "
+              f"snapshot: {mapped_time:7.1f} ms {mapped_memory:6.1f} MB")
@@ -0,0 +1,62 @@
+import random
+import statistics
+import time
+import tracemalloc
+from run import app
+from app.auth import generate_token
+from app.suggest import SuggestIndex, get_suggest_index
+
+# Latency of SuggestIndex.suggest() for prefixes of 1 to 8 characters taken
+# from real names (target: p99 under 1 ms), the same through the
+# /api/games/suggest endpoint, and the memory the index takes.
+# Run with `python -m benchmarks.suggest`.
+ITERATIONS = 2000
+
+
+def percentiles(timings):
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], statistics.mean(timings)
+
+
+with app.app_context():
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = SuggestIndex.build()
+    build_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"build: {build_time * 1000:.0f} ms, {len(index.names)} games, {len(index.keys)} keys, "
+          f"{memory / 1024 / 1024:.1f} MB")
+
+    rng = random.Random(1)
+    names = [name for name in index.names if name]
+
+    for length in range(1, 9):
+        prefixes = [rng.choice(names)[:length] for _ in range(ITERATIONS)]
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.suggest(prefix, 10)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+        p50, p99, mean = percentiles(timings)
+        print(f"prefix {length}: p50={p50:7.1f} us  p99={p99:7.1f} us  mean={mean:7.1f} us")
+
+    get_suggest_index()
+
+with app.test_request_context():
+    headers = {"Authorization": f"Bearer {generate_token(1)}"}
+
+# Measure the endpoint, not the rate limiter
+app.config["ADMISSION_ENABLED"] = False
+client = app.test_client()
+timings = []
+for _ in range(ITERATIONS // 4):
+    prefix = rng.choice(names)[:rng.randint(1, 6)]
+    start = time.perf_counter()
+    response = client.get("/api/games/suggest", query_string={"q": prefix}, headers=headers)
+    timings.append((time.perf_counter() - start) * 1_000_000)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+p50, p99, mean = percentiles(timings)
+print(f"endpoint: p50={p50:7.1f} us  p99={p99:7.1f} us  mean={mean:7.1f} us")
@@ -0,0 +1,15 @@
+from app import create_app, db
+from app.catalog import bump_catalog_version
+from app.derived import ensure_derived_columns, refresh_derived, create_catalog_indexes
+
+# The catalog is read-only in the web app, so write through a writable engine
+app = create_app({"CATALOG_READ_ONLY": False})
+
+# Compute the derived rating/release columns and their indexes after loading the catalog
+with app.app_context():
+    with db.engine.begin() as connection:
+        ensure_derived_columns(connection)
+        refresh_derived(connection)
+        create_catalog_indexes(connection)
+        bump_catalog_version(connection)
+    print("Derived columns and indexes built.")
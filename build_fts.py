@@ -0,0 +1,11 @@
+from app import create_app, db
+from app.search import create_fts_index
+
+# The catalog is read-only in the web app, so write through a writable engine
+app = create_app({"CATALOG_READ_ONLY": False})
+
+# Build the FTS5 name index, or rebuild it after the games table was reloaded
+with app.app_context():
+    with db.engine.begin() as connection:
+        create_fts_index(connection)
+    print("Full-text search index built.")
@@ -0,0 +1,18 @@
+from app import create_app, db
+from app.catalog import read_catalog_version
+from app.columnar import CatalogColumns
+from app.similar import SimilarityIndex, persist_similar
+
+# The catalog is read-only in the web app, so write through a writable engine
+app = create_app({"CATALOG_READ_ONLY": False})
+
+# Precompute the neighbours of every game for /api/games/<appid>/similar.
+# Run it again after each catalog import; stale lists are ignored.
+with app.app_context():
+    version = read_catalog_version()
+    index = SimilarityIndex.build()
+    listed = CatalogColumns.build().listed
+
+    with db.engine.begin() as connection:
+        count = persist_similar(connection, index, listed, version)
+    print(f"Similar games of {count} games stored.")
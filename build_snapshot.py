@@ -0,0 +1,17 @@
+from app import create_app
+from app.catalog import read_catalog_version
+from app.columnar import CatalogColumns
+from app.snapshot import catalog_sections, write_snapshot
+
+app = create_app()
+
+# Write the memory-mapped catalog snapshot the workers build their indexes
+# from. Run it again after each catalog import; until then the stale file
+# is ignored and the indexes are built from SQL.
+with app.app_context():
+    version = read_catalog_version()
+    columns = CatalogColumns.query()
+    path = app.config["CATALOG_SNAPSHOT"]
+
+    size = write_snapshot(path, version, catalog_sections(columns))
+    print(f"Snapshot of {len(columns.appid)} games written to {path} ({size / 1024 / 1024:.1f} MB).")
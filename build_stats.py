@@ -0,0 +1,12 @@
+from app import create_app, db
+from app.stats import rebuild_rollups
+
+# The catalog is read-only in the web app, so write through a writable engine
+app = create_app({"CATALOG_READ_ONLY": False})
+
+# Recompute the /api/stats rollups from the catalog. Imports keep them up
+# to date; this is for catalogs loaded before the rollups existed.
+with app.app_context():
+    with db.engine.begin() as connection:
+        rollups = rebuild_rollups(connection)
+    print(f"Stats of {len(rollups.groups)} groups stored.")
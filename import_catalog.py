@@ -0,0 +1,28 @@
+import argparse
+from app import create_app, db
+from app.importer import CatalogImporter, CHUNK_SIZE
+
+# Load the Steam Store Games CSVs (steam.csv, steam_description_data.csv,
+# steam_media_data.csv) into the catalog tables, e.g.
+#   python import_catalog.py data/csv
+#   python import_catalog.py data/csv --incremental
+parser = argparse.ArgumentParser(description="Import the Steam dataset CSVs into the catalog.")
+parser.add_argument("directory", help="directory holding the dataset CSV files")
+parser.add_argument("--incremental", action="store_true", help="only upsert the games that changed")
+parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per executemany batch")
+args = parser.parse_args()
+
+# The catalog is read-only in the web app, so write through a writable engine
+app = create_app({"CATALOG_READ_ONLY": False})
+
+with app.app_context():
+    with db.engine.begin() as connection:
+        importer = CatalogImporter(connection, incremental=args.incremental, chunk_size=args.chunk_size)
+        stats = importer.run(args.directory)
+
+    for stage, (rows, seconds) in stats.items():
+        print(f"{stage:<24} {rows:>8} rows  {seconds:8.2f} s  {rows / seconds if seconds else 0:10.0f} rows/s")
+
+    if args.incremental:
+        print(f"{len(importer.changed)} games changed.")
+    print("Catalog imported.")
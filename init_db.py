@@ -1,5 +1,7 @@
-from run import app
-from app import db
+from app import create_app, db
+
+# The catalog is read-only in the web app, so write through a writable engine
+app = create_app({"CATALOG_READ_ONLY": False})
 
 with app.app_context():
     db.create_all()
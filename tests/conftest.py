@@ -0,0 +1,158 @@
+import csv
+import os
+import shutil
+import pytest
+from sqlalchemy import event
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app import create_app, db
+from app.auth import generate_token
+from app.importer import CatalogImporter
+from app.models import Game, User
+from app.relations import RELATIONS
+from benchmarks.generate import write_dataset
+
+# Games in the synthetic test catalog, generated once per test session
+CATALOG_GAMES = 600
+
+TEST_USER_EMAIL = "test@example.com"
+
+
+@pytest.fixture(scope="session")
+def catalog_dir(tmp_path_factory):
+    """Directory holding the dataset CSVs and steam.sqlite, built like a real import."""
+    directory = str(tmp_path_factory.mktemp("catalog"))
+    write_dataset(os.path.join(directory, "csv"), CATALOG_GAMES, seed=1)
+
+    app = create_app({"CATALOG_DATABASE": os.path.join(directory, "steam.sqlite"), "CATALOG_READ_ONLY": False})
+    with app.app_context():
+        with db.engine.begin() as connection:
+            CatalogImporter(connection).run(os.path.join(directory, "csv"))
+
+        db.create_all(bind_key="users")
+        user = User(name="test", email=TEST_USER_EMAIL)
+        user.set_password("test")
+        db.session.add(user)
+        db.session.commit()
+
+    return directory
+
+
+@pytest.fixture(scope="session")
+def catalog_path(catalog_dir):
+    return os.path.join(catalog_dir, "steam.sqlite")
+
+
+@pytest.fixture(scope="session")
+def game_facets(catalog_path):
+    """{appid: {facet: set of value names}} read straight from the link tables, tags lowercased."""
+    app = create_app({"CATALOG_DATABASE": catalog_path})
+    with app.app_context():
+        games = {
+            appid: {facet: set() for facet in RELATIONS}
+            for appid in db.session.execute(db.select(Game.appid)).scalars()
+        }
+        for facet, (link, link_id, lookup, lookup_id, lookup_name) in RELATIONS.items():
+            rows = db.session.execute(db.select(link.appid, lookup_name).join(lookup, link_id == lookup_id))
+            for appid, name in rows:
+                games[appid][facet].add(name.lower() if facet == "tags" else name)
+    return games
+
+
+@pytest.fixture
+def dataset(catalog_dir, tmp_path):
+    """A copy of the test dataset CSVs that a test can edit."""
+    directory = str(tmp_path / "csv")
+    shutil.copytree(os.path.join(catalog_dir, "csv"), directory)
+    return directory
+
+
+def run_import(path, directory, incremental=False):
+    """Imports the dataset CSVs in `directory` into the catalog at `path`, returns the importer."""
+    app = create_app({"CATALOG_DATABASE": path, "CATALOG_READ_ONLY": False})
+    with app.app_context():
+        with db.engine.begin() as connection:
+            importer = CatalogImporter(connection, incremental=incremental, chunk_size=100)
+            importer.run(directory)
+    return importer
+
+
+def edit_csv(path, edit):
+    """Rewrites a dataset CSV with edit(rows), rows being dicts."""
+    with open(path, newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    rows = edit(rows)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def make_app(catalog_path):
+    """Creates an app on the test catalog. Admission control is off unless a test turns it on."""
+    def make(**config):
+        return create_app({"CATALOG_DATABASE": catalog_path, "ADMISSION_ENABLED": False, **config})
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def auth_headers(app, email=TEST_USER_EMAIL, expires_in=3600):
+    with app.app_context():
+        user_id = db.session.execute(db.select(User.id).where(User.email == email)).scalar_one()
+    with app.test_request_context():
+        return {"Authorization": f"Bearer {generate_token(user_id, expires_in)}"}
+
+
+@pytest.fixture
+def headers(app):
+    return auth_headers(app)
+
+
+@pytest.fixture
+def headers_for():
+    """headers_for(app) -> Authorization headers of the test user, for apps made with make_app."""
+    return auth_headers
+
+
+class QueryCounter:
+    """Counts the SQL statements run on the catalog engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self.before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self.before_cursor_execute)
+
+    def before_cursor_execute(self, *args):
+        self.count += 1
+
+
+@pytest.fixture
+def count_queries(app):
+    """count_queries(client, url, headers) -> (response, catalog statements it ran)."""
+    with app.app_context():
+        engine = db.engine
+
+    def count(client, url, headers):
+        with QueryCounter(engine) as counter:
+            response = client.get(url, headers=headers)
+            response.get_data()
+        return response, counter.count
+
+    return count
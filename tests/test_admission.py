@@ -0,0 +1,105 @@
+import multiprocessing
+import pytest
+from werkzeug.datastructures import MultiDict
+from app.admission import AdmissionTable, request_cost, BROAD_SCAN_FACTOR, UNPAGINATED_FACTOR
+
+
+@pytest.mark.parametrize("endpoint, args, cost", [
+    ("api.get_tags", {}, 1),
+    ("api.export_catalog", {}, 20),
+    ("api.get_games", {"name": "dragon", "limit": 20}, 1),
+    ("api.get_games", {"name": "a", "limit": 20}, BROAD_SCAN_FACTOR),
+    ("api.get_games", {"name": "a", "genre": "RPG", "limit": 20}, 1),
+    ("api.get_games", {"name": "a", "price_max": 5, "cursor": "x"}, 1),
+    ("api.get_games", {"name": "a"}, BROAD_SCAN_FACTOR * UNPAGINATED_FACTOR),
+    ("api.get_games_by_tag", {"tag": "Indie"}, UNPAGINATED_FACTOR),
+    ("api.get_games_by_tag", {"tag": "Indie", "limit": 50}, 1),
+])
+def test_request_cost(endpoint, args, cost):
+    assert request_cost(endpoint, MultiDict(args)) == cost
+
+
+def test_rate_limit_returns_429_with_retry_after(make_app, headers_for):
+    app = make_app(ADMISSION_ENABLED=True, RATE_LIMIT_BURST=3, RATE_LIMIT_RATE=0.5)
+    client = app.test_client()
+    headers = headers_for(app)
+
+    assert [client.get("/api/tags", headers=headers).status_code for _ in range(3)] == [200] * 3
+
+    response = client.get("/api/tags", headers=headers)
+    assert response.status_code == 429
+    assert response.json["error"] == "Rate limit exceeded"
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_broad_scans_use_up_more_of_the_bucket(make_app, headers_for):
+    app = make_app(ADMISSION_ENABLED=True, RATE_LIMIT_BURST=BROAD_SCAN_FACTOR * UNPAGINATED_FACTOR,
+                   RATE_LIMIT_RATE=0.01)
+    client = app.test_client()
+    headers = headers_for(app)
+
+    assert client.get("/api/games?name=a", headers=headers).status_code == 200
+    assert client.get("/api/tags", headers=headers).status_code == 429
+
+
+def test_overload_returns_503_without_using_tokens(make_app, headers_for):
+    app = make_app(ADMISSION_ENABLED=True, MAX_CONCURRENT_REQUESTS=1, OVERLOAD_RETRY_AFTER=4,
+                   RATE_LIMIT_BURST=1, RATE_LIMIT_RATE=0.01)
+    client = app.test_client()
+    headers = headers_for(app)
+    table = app.extensions["admission"]
+    table.open()
+    table.enter(1)
+
+    response = client.get("/api/tags", headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "4"
+
+    table.leave()
+    assert client.get("/api/tags", headers=headers).status_code == 200
+
+
+def test_streamed_responses_hold_their_slot_until_done(make_app, headers_for):
+    app = make_app(ADMISSION_ENABLED=True, MAX_CONCURRENT_REQUESTS=4)
+    client = app.test_client()
+    table = app.extensions["admission"]
+
+    response = client.get("/api/export", headers=headers_for(app))
+    assert table.in_flight() == 1
+
+    response.get_data()
+    response.close()
+    assert table.in_flight() == 0
+
+
+def test_buckets_live_in_a_fixed_table():
+    table = AdmissionTable(slots=4)
+    table.open()
+
+    # An emptied bucket is kept while fewer users than slots are active
+    assert table.take(1, 1, rate=0.001, burst=1.0) == 0
+    for user_id in (2, 3, 4):
+        assert table.take(user_id, 1, rate=0.001, burst=1.0) == 0
+    assert table.take(1, 1, rate=0.001, burst=1.0) > 0
+
+    # Buckets that refilled are reused, so any number of users fits
+    for user_id in range(5, 50):
+        assert table.take(user_id, 1, rate=1000.0, burst=1.0) == 0
+
+
+def test_limits_are_shared_across_processes(tmp_path):
+    directory = str(tmp_path)
+    table = AdmissionTable(slots=64)
+    results = multiprocessing.get_context("fork").Queue()
+
+    def worker():
+        table.open(directory)
+        results.put(sum(table.take(7, 1, rate=0.001, burst=10.0) == 0 for _ in range(5)))
+
+    processes = [multiprocessing.get_context("fork").Process(target=worker) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert sum(results.get() for _ in processes) == 10
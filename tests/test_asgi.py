@@ -0,0 +1,80 @@
+import asyncio
+import json
+from app.asgi import AsgiApp
+
+
+def call(asgi, path, query=b"", method="GET", headers=None, body=b""):
+    """Runs one request through the ASGI app, returns (status, headers, body chunks)."""
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query, "http_version": "1.1",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi(scope, receive, send))
+
+    start, *bodies = messages
+    assert not bodies[-1].get("more_body", False)
+    return start["status"], dict(start["headers"]), [message["body"] for message in bodies if message["body"]]
+
+
+def test_responses_match_the_wsgi_app(app, client, headers):
+    asgi = AsgiApp(app, workers=2)
+
+    for url in ("/api/games?name=s&limit=20&sort=-rating", "/api/tags", "/api/games/by-tag?tag=Indie&limit=5"):
+        path, query = url.split("?") if "?" in url else (url, "")
+        status, response_headers, chunks = call(asgi, path, query.encode(), headers=headers)
+        expected = client.get(url, headers=headers)
+
+        assert status == expected.status_code == 200
+        assert response_headers[b"content-type"] == expected.headers["Content-Type"].encode()
+        assert b"".join(chunks) == expected.get_data()
+
+
+def test_request_bodies_reach_the_app(app, headers):
+    body = json.dumps({"appids": [10, 20]}).encode()
+    status, _, chunks = call(AsgiApp(app), "/api/games/batch", method="POST", body=body,
+                             headers={**headers, "Content-Type": "application/json"})
+
+    assert status == 200
+    assert [result["appid"] for result in json.loads(b"".join(chunks))["results"]] == [10, 20]
+
+
+def test_streamed_responses_stay_streamed(app, headers):
+    status, _, chunks = call(AsgiApp(app), "/api/export", headers=headers)
+
+    assert status == 200
+    assert len(chunks) > 1
+
+
+def test_requests_beyond_the_pending_bound_get_503(make_app, headers_for):
+    app = make_app(ASGI_MAX_PENDING=1, OVERLOAD_RETRY_AFTER=3)
+    asgi = AsgiApp(app)
+    asgi.pending = 1
+
+    status, response_headers, chunks = call(asgi, "/api/tags", headers=headers_for(app))
+
+    assert status == 503
+    assert response_headers[b"retry-after"] == b"3"
+    assert json.loads(b"".join(chunks)) == {"error": "Server is busy, retry later"}
+
+
+def test_lifespan(app):
+    asgi = AsgiApp(app)
+    incoming = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(asgi({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
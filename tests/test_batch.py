@@ -0,0 +1,77 @@
+import json
+import pytest
+from conftest import QueryCounter
+from app import db
+
+MISSING = 999999999
+
+
+@pytest.fixture
+def catalog_appids(game_facets):
+    return sorted(game_facets)
+
+
+def batch(client, headers, appids, **params):
+    return client.post("/api/games/batch", json={"appids": appids}, query_string=params, headers=headers)
+
+
+def test_results_follow_the_request_order(client, headers, catalog_appids):
+    appids = [catalog_appids[5], MISSING, catalog_appids[0], catalog_appids[5], catalog_appids[3]]
+    response = batch(client, headers, appids)
+
+    assert response.status_code == 200
+    assert [result["appid"] for result in response.json["results"]] == [appids[0], appids[2], appids[4]]
+    assert response.json["missing"] == [MISSING]
+    assert response.json["count"] == 3
+    assert "next_cursor" not in response.json
+
+
+def test_results_have_the_shape_of_a_search(client, headers, catalog_appids):
+    searched = client.get("/api/games?name=s&limit=3", headers=headers).json["results"]
+    found = batch(client, headers, [result["appid"] for result in searched]).json["results"]
+
+    assert found == searched
+
+
+def test_query_count_does_not_grow_with_the_batch(app, client, headers, catalog_appids):
+    with app.app_context():
+        engine = db.engine
+    batch(client, headers, [MISSING])  # build the relation name tables
+
+    counts = []
+    for appids in (catalog_appids[:2], catalog_appids):
+        with QueryCounter(engine) as counter:
+            response = batch(client, headers, appids + [MISSING])
+        assert response.json["count"] == len(appids)
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"appids": []},
+    {"appids": "10,20"},
+    {"appids": [10, "20"]},
+    {"appids": [True]},
+    {"appids": [1.5]},
+    {"appids": [0]},
+    {"appids": [-10]},
+    {"appids": [2 ** 63]},
+    {"appids": [2 ** 70]},
+    {"appids": list(range(1, 5002))},
+    [10, 20],
+])
+def test_invalid_bodies_are_rejected(client, headers, body):
+    response = client.post("/api/games/batch", data=json.dumps(body), content_type="application/json",
+                           headers=headers)
+
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+def test_largest_appid_is_accepted(client, headers):
+    response = batch(client, headers, [2 ** 63 - 1])
+
+    assert response.status_code == 200
+    assert response.json["missing"] == [2 ** 63 - 1]
@@ -0,0 +1,53 @@
+import pytest
+from benchmarks.diff import compare
+from benchmarks.driver import build_workload, summarise, sql_count
+from benchmarks.generate import generate_games, GENRES, PLATFORMS
+
+
+def test_generator_is_deterministic():
+    assert list(generate_games(200, seed=7)) == list(generate_games(200, seed=7))
+    assert list(generate_games(200, seed=7)) != list(generate_games(200, seed=8))
+
+
+def test_generator_follows_the_dataset_shares():
+    games = list(generate_games(5000, seed=1))
+
+    assert len({game["appid"] for game in games}) == len(games)
+    for column, shares in (("genres", GENRES), ("platforms", PLATFORMS)):
+        for name in list(shares)[:3]:
+            # Games that drew nothing get the most common name, so it comes out a little higher
+            share = sum(name in game[column].split(";") for game in games) / len(games)
+            assert share == pytest.approx(shares[name], abs=0.05)
+
+
+def test_workload_is_reproducible_and_valid(app, client, headers):
+    workload = build_workload(app, 40, seed=3)
+
+    assert workload == build_workload(app, 40, seed=3)
+    assert len({shape for shape, _ in workload}) == 8
+    for _, url in workload:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, url
+        assert sql_count(response.headers) is not None
+
+
+def test_summary_of_samples():
+    samples = [(None, seconds / 1000, status, 3) for seconds, status in ((1, 200), (2, 200), (3, 500), (4, 200))]
+    summary = summarise(samples)
+
+    assert summary["requests"] == 4
+    assert summary["errors"] == 1
+    assert summary["p50_ms"] == 3
+    assert summary["max_ms"] == 4
+    assert summary["sql_per_request"] == 3
+
+
+def test_diff_reports_regressions_only():
+    run = {"mode": "client", "threads": 4, "throughput": 100, "p50_ms": 10, "p99_ms": 50,
+           "sql_per_request": 3, "peak_rss_mb": 200}
+    faster = {**run, "throughput": 150, "p99_ms": 30}
+    slower = {**run, "throughput": 80, "p99_ms": 52}
+
+    assert compare({"runs": [run]}, {"runs": [faster]}, threshold=10) == []
+    assert compare({"runs": [run]}, {"runs": [slower]}, threshold=10) == [(("client", 4), "throughput", -20)]
+    assert compare({"runs": [run]}, {"runs": [{**slower, "threads": 8}]}, threshold=10) == []
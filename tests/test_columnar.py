@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from werkzeug.datastructures import MultiDict
+from app.columnar import CatalogColumns, NUMERIC_SORT_KEYS, columnar_enabled, get_catalog_columns
+from app.filters import parse_filters
+
+
+def appids(make_app, headers_for, config, params):
+    app = make_app(**config)
+    response = app.test_client().get("/api/games/by-tag", query_string=params, headers=headers_for(app))
+    assert response.status_code == 200, response.json
+    return [result["appid"] for result in response.json["results"]]
+
+
+@pytest.mark.parametrize("params", [
+    {"price_min": 5, "price_max": 20},
+    {"rating_min": 75, "sort": "-rating"},
+    {"playtime_max": 100, "sort": "playtime"},
+    {"owners_min": 50000, "sort": "-owners"},
+    {"price_max": 0, "sort": "-release_date"},
+])
+def test_range_filters_match_the_sql_path(make_app, headers_for, params):
+    params = {"tag": "Indie", **params}
+
+    columnar = appids(make_app, headers_for, {}, params)
+    assert columnar
+    assert columnar == appids(make_app, headers_for, {"CATALOG_COLUMNAR": False}, params)
+
+
+@pytest.mark.parametrize("key", NUMERIC_SORT_KEYS)
+@pytest.mark.parametrize("descending", [False, True])
+def test_partial_sort_matches_a_full_sort(app, key, descending):
+    with app.app_context():
+        columns = get_catalog_columns()
+        criteria = parse_filters(MultiDict(), text_search=False)
+        full = columns.search(criteria, key, descending)
+
+        for limit in (1, 10, 50):
+            assert list(columns.search(criteria, key, descending, limit=limit)) == list(full[:limit + 1])
+
+
+def test_nulls_are_filtered_out_like_sql(app):
+    with app.app_context():
+        built = get_catalog_columns()
+        columns = CatalogColumns(built.appid, built.listed, {**built.columns, "price": built.columns["price"].copy()})
+        columns.columns["price"][0] = np.nan
+        criteria = parse_filters(MultiDict({"price_min": 0}), text_search=False)
+
+        assert not columns.mask(criteria)[0]
+        assert columns.sort_values("price")[0] == 0.0
+
+
+@pytest.mark.parametrize("params, columnar", [
+    ({"name": "s"}, False),
+    ({"name": "s x", "sort": "-rating"}, False),
+    ({"name": "sta", "sort": "-rating"}, True),
+    ({"name": "s", "match": "fuzzy"}, True),
+    ({"name": "sta", "sort": "name"}, False),
+])
+def test_broad_name_searches_stay_in_sql(app, params, columnar):
+    with app.app_context():
+        criteria = parse_filters(MultiDict(params))
+        assert columnar_enabled(params.get("sort", "appid").lstrip("-"), criteria) is columnar
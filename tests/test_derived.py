@@ -0,0 +1,73 @@
+import re
+import sqlite3
+import pytest
+from app.derived import parse_release_date, parse_owners
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2019-06-24", (2019, 20190624)),
+    ("24 Jun, 2019", (2019, 20190624)),
+    ("Jun 24, 2019", (2019, 20190624)),
+    ("June 2019", (2019, 20190601)),
+    ("2019", (2019, 20190101)),
+    ("Coming soon", (None, None)),
+    ("", (None, None)),
+    (None, (None, None)),
+])
+def test_parse_release_date(value, expected):
+    assert parse_release_date(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("20000-50000", 20000),
+    ("1,000,000 - 2,000,000", 1000000),
+    ("0-20000", 0),
+    ("unknown", None),
+    (None, None),
+])
+def test_parse_owners(value, expected):
+    assert parse_owners(value) == expected
+
+
+def test_derived_columns_match_the_raw_data(catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        ratings = connection.execute(
+            "SELECT positive_ratings, negative_ratings, total_ratings, rating_pct, owners, owners_lower FROM ratings"
+        ).fetchall()
+        games = connection.execute("SELECT release_date, release_year, release_date_key FROM games").fetchall()
+
+    for positive, negative, total, rating_pct, owners, owners_lower in ratings:
+        assert total == positive + negative
+        assert rating_pct == (pytest.approx(100 * positive / total) if total else None)
+        assert owners_lower == parse_owners(owners)
+
+    for release_date, year, key in games:
+        assert (year, key) == parse_release_date(release_date)
+
+
+def test_rating_filter_uses_the_precomputed_percentage(client, headers, catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        expected = {appid for (appid,) in connection.execute(
+            "SELECT appid FROM ratings WHERE positive_ratings + negative_ratings > 0 "
+            "AND 100.0 * positive_ratings / (positive_ratings + negative_ratings) >= 90"
+        )}
+
+    response = client.get("/api/games/by-tag", query_string={"tag": "Indie", "rating_min": 90}, headers=headers)
+
+    assert response.status_code == 200
+    results = {result["appid"] for result in response.json["results"]}
+    assert results and results <= expected
+
+
+def test_release_year_filter(client, headers, catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        expected = {
+            appid for appid, name in connection.execute("SELECT appid, name FROM games WHERE release_date LIKE '2018%'")
+            if any(word.startswith("s") for word in re.findall(r"\w+", name.lower()))
+        }
+
+    response = client.get("/api/games", query_string={"name": "s", "release_year": 2018}, headers=headers)
+
+    assert response.status_code == 200
+    assert expected
+    assert {result["appid"] for result in response.json["results"]} == expected
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import User
+
+
+def pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_catalog_pool_is_read_only(app):
+    with app.app_context():
+        assert pragma(db.engine, "query_only") == 1
+        with pytest.raises(OperationalError):
+            with db.engine.begin() as connection:
+                connection.execute(text("UPDATE games SET price = 0"))
+
+
+def test_users_pool_can_write(app):
+    with app.app_context():
+        users = db.engines["users"]
+        assert pragma(users, "query_only") == 0
+
+        user = User(name="writer", email="writer@example.com")
+        user.set_password("writer")
+        db.session.add(user)
+        db.session.commit()
+        db.session.delete(user)
+        db.session.commit()
+
+
+def test_profile_pragmas_are_applied(make_app):
+    app = make_app(SQLITE_PRAGMAS={"cache_size": -1024, "temp_store": None})
+
+    with app.app_context():
+        for engine in db.engines.values():
+            assert pragma(engine, "journal_mode") == "wal"
+            assert pragma(engine, "busy_timeout") == 5000
+            assert pragma(engine, "mmap_size") == 256 * 1024 * 1024
+            assert pragma(engine, "cache_size") == -1024
+            assert pragma(engine, "temp_store") == 0
+
+
+def test_writable_catalog_for_scripts(make_app):
+    app = make_app(CATALOG_READ_ONLY=False)
+
+    with app.app_context():
+        assert pragma(db.engine, "query_only") == 0
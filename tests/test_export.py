@@ -0,0 +1,71 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from app.export import EXPORT_COLUMNS
+from app.relations import RELATIONS
+
+
+def export(client, headers, **params):
+    response = client.get("/api/export", query_string=params, headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_ndjson_holds_every_game_with_its_relations(client, headers, game_facets):
+    games = ndjson(export(client, headers))
+
+    assert [game["appid"] for game in games] == sorted(game_facets)
+    for game in games:
+        assert list(game) == [*EXPORT_COLUMNS, *RELATIONS]
+        assert {tag.lower() for tag in game["tags"]} == game_facets[game["appid"]]["tags"]
+        assert set(game["genres"]) == game_facets[game["appid"]]["genres"]
+
+
+def test_csv_matches_ndjson(client, headers):
+    games = ndjson(export(client, headers))
+    rows = list(csv.DictReader(io.StringIO(export(client, headers, format="csv").get_data(as_text=True))))
+
+    assert len(rows) == len(games)
+    for row, game in zip(rows, games):
+        assert int(row["appid"]) == game["appid"]
+        assert row["name"] == game["name"]
+        assert row["genres"] == ";".join(game["genres"])
+
+
+def test_body_is_streamed_in_chunks(client, headers):
+    response = export(client, headers)
+
+    assert response.is_streamed
+    assert len(list(response.response)) > 1
+
+
+def test_gzip_is_negotiated(client, headers):
+    plain = export(client, headers, format="csv").get_data()
+    response = client.get("/api/export?format=csv", headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.get_data()) == plain
+
+
+def test_export_resumes_after_an_appid(client, headers):
+    games = ndjson(export(client, headers))
+    middle = games[len(games) // 2]["appid"]
+
+    assert ndjson(export(client, headers, after=middle)) == games[len(games) // 2 + 1:]
+    assert ndjson(export(client, headers, after=games[-1]["appid"])) == []
+
+
+@pytest.mark.parametrize("params", [
+    {"format": "xml"}, {"after": "abc"}, {"after": "-1"}, {"after": "99999999999999999999999"},
+])
+def test_invalid_parameters_are_rejected(client, headers, params):
+    response = client.get("/api/export", query_string=params, headers=headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,34 @@
+import pytest
+
+
+def search(client, headers, path, params):
+    response = client.get(path, query_string=params, headers=headers)
+    assert response.status_code == 200, response.json
+    return {result["appid"] for result in response.json["results"]}
+
+
+@pytest.mark.parametrize("config", [{}, {"CATALOG_COLUMNAR": False}])
+@pytest.mark.parametrize("expression, matches", [
+    ("Action", lambda values: "Action" in values),
+    ("Action,Indie", lambda values: {"Action", "Indie"} <= values),
+    ("RPG|Strategy", lambda values: bool({"RPG", "Strategy"} & values)),
+    ("Indie,!Casual", lambda values: "Indie" in values and "Casual" not in values),
+    ("Unknown genre", lambda values: False),
+])
+def test_genre_expressions(make_app, headers_for, game_facets, config, expression, matches):
+    app = make_app(**config)
+    found = search(app.test_client(), headers_for(app), "/api/games", {"name": "s", "genre": expression})
+
+    named = search(app.test_client(), headers_for(app), "/api/games", {"name": "s"})
+    assert found == {appid for appid in named if matches(game_facets[appid]["genres"])}
+
+
+def test_tags_are_case_insensitive_and_combine_with_platforms(client, headers, game_facets):
+    found = search(client, headers, "/api/games/by-tag", {"tag": "INDIE", "platform": "linux,!mac"})
+
+    expected = {
+        appid for appid, facets in game_facets.items()
+        if "indie" in facets["tags"] and "linux" in facets["platforms"] and "mac" not in facets["platforms"]
+    }
+    assert expected
+    assert found == expected
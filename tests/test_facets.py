@@ -0,0 +1,76 @@
+import sqlite3
+import pytest
+
+
+def facets(client, headers, params=None):
+    response = client.get("/api/games/facets", query_string=params or {}, headers=headers)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+@pytest.mark.parametrize("config", [{}, {"CATALOG_COLUMNAR": False}])
+def test_unfiltered_counts_skip_unlisted_games(make_app, headers_for, catalog_path, tmp_path, config):
+    # A game without media is imported but never listed by a search
+    path = str(tmp_path / "steam.sqlite")
+    with sqlite3.connect(catalog_path) as source, sqlite3.connect(path) as connection:
+        source.backup(connection)
+        appid, = connection.execute("SELECT appid FROM game_media ORDER BY appid LIMIT 1").fetchone()
+        connection.execute("DELETE FROM game_media WHERE appid = ?", (appid,))
+        listed = connection.execute("SELECT COUNT(*) FROM game_media JOIN ratings USING (appid)").fetchone()[0]
+
+    app = make_app(CATALOG_DATABASE=path, **config)
+    unfiltered = facets(app.test_client(), headers_for(app))
+
+    assert unfiltered["count"] == listed
+    assert unfiltered == facets(app.test_client(), headers_for(app), {"price_min": 0})
+
+
+@pytest.mark.parametrize("config", [{}, {"CATALOG_COLUMNAR": False}])
+def test_counts_match_the_link_tables(make_app, headers_for, game_facets, config):
+    app = make_app(**config)
+    result = facets(app.test_client(), headers_for(app), {"genre": "Indie", "platform": "linux"})
+
+    matching = [
+        values for values in game_facets.values()
+        if "Indie" in values["genres"] and "linux" in values["platforms"]
+    ]
+    assert result["count"] == len(matching)
+    assert result["facets"]["genres"]["Indie"] == len(matching)
+    for name, count in result["facets"]["categories"].items():
+        assert count == sum(name in values["categories"] for values in matching)
+
+
+def test_columns_out_of_step_with_the_index_use_sql(make_app, headers_for, monkeypatch):
+    from app import routes
+    from app.columnar import CatalogColumns
+
+    params = {"genre": "Indie", "price_max": 20}
+    sql_app = make_app(CATALOG_COLUMNAR=False)
+    expected = facets(sql_app.test_client(), headers_for(sql_app), params)
+
+    # Columns missing the last game no longer line up with the bitsets
+    app = make_app()
+    with app.app_context():
+        columns = routes.get_catalog_columns()
+        stale = CatalogColumns(
+            columns.appid[:-1], columns.listed[:-1],
+            {name: values[:-1] for name, values in columns.columns.items()}
+        )
+    monkeypatch.setattr(routes, "get_catalog_columns", lambda: stale)
+
+    assert facets(app.test_client(), headers_for(app), params) == expected
+
+
+def test_count_agrees_with_the_search(client, headers):
+    params = {"name": "s", "genre": "Action|RPG", "price_max": 20}
+    searched = client.get("/api/games", query_string=params, headers=headers)
+
+    assert facets(client, headers, params)["count"] == searched.json["count"]
+
+
+@pytest.mark.parametrize("params", [{"match": "typo"}, {"search_in": "title"}])
+def test_invalid_filters_are_rejected(client, headers, params):
+    response = client.get("/api/games/facets", query_string=params, headers=headers)
+
+    assert response.status_code == 400
+    assert "error" in response.json
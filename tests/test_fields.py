@@ -0,0 +1,65 @@
+import pytest
+from conftest import QueryCounter
+from app import db
+from app.fields import parse_fields, select_fields, GAME_FIELDS, TAG_FIELDS
+
+
+def test_parse_fields_keeps_the_output_order():
+    assert parse_fields("price, name,appid,name") == ("appid", "name", "price")
+    assert parse_fields(None) == GAME_FIELDS
+    assert parse_fields("", TAG_FIELDS) == TAG_FIELDS
+
+    with pytest.raises(ValueError):
+        parse_fields("developer", TAG_FIELDS)
+
+
+def test_narrow_selects_skip_unneeded_joins():
+    sql = str(select_fields(("appid", "name", "price"), join_all=False))
+
+    assert "ratings" not in sql and "game_media" not in sql
+    assert "game_media" in str(select_fields(("appid", "header_image"), join_all=False))
+
+
+@pytest.mark.parametrize("url, fields", [
+    ("/api/games?name=s&limit=20", GAME_FIELDS),
+    ("/api/games?name=s&limit=20&fields=price,name", ("name", "price")),
+    ("/api/games/by-tag?tag=Indie&limit=20&fields=appid,platforms", ("appid", "platforms")),
+])
+def test_results_only_carry_the_requested_fields(client, headers, url, fields):
+    response = client.get(url, headers=headers)
+
+    assert response.status_code == 200
+    assert all(tuple(result) == fields for result in response.json["results"])
+
+
+@pytest.mark.parametrize("config", [{}, {"CATALOG_COLUMNAR": False}])
+def test_narrow_fields_run_fewer_queries(make_app, headers_for, config):
+    app = make_app(**config)
+    client = app.test_client()
+    headers = headers_for(app)
+    with app.app_context():
+        engine = db.engine
+
+    def queries(fields):
+        app.extensions["response_cache"].clear()
+        with QueryCounter(engine) as counter:
+            response = client.get(f"/api/games?name=s&limit=20&fields={fields}", headers=headers)
+            response.get_data()
+        return counter.count
+
+    queries("genres,categories,platforms")  # build the relation name tables
+    assert queries("name,price") < queries("name,price,genres,categories,platforms")
+
+
+def test_narrow_and_full_results_agree(client, headers):
+    full = client.get("/api/games?name=s&limit=20", headers=headers).json["results"]
+    narrow = client.get("/api/games?name=s&limit=20&fields=genres,price", headers=headers).json["results"]
+
+    assert narrow == [{field: result[field] for field in ("price", "genres")} for result in full]
+
+
+def test_unknown_fields_are_rejected(client, headers):
+    response = client.get("/api/games/by-tag?tag=Indie&fields=developer", headers=headers)
+
+    assert response.status_code == 400
+    assert response.json["error"] == "Invalid 'fields' value: developer"
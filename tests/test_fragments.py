@@ -0,0 +1,64 @@
+import pytest
+from app.fragments import FragmentStore, get_fragment_store
+from app.fields import GAME_FIELDS, TAG_FIELDS
+
+URLS = [
+    "/api/games?name=s&limit=30&sort=-rating",
+    "/api/games?name=the",
+    "/api/games?name=s&limit=10&fields=name,price",
+    "/api/games/by-tag?tag=Indie&limit=50&sort=price",
+]
+
+CONFIGS = [
+    {"RESULT_FRAGMENTS": False},
+    {},
+    {"FRAGMENT_CACHE_MAX_BYTES": 2000},
+    {"FRAGMENTS_PRECOMPUTE": True},
+    {"CATALOG_COLUMNAR": False},
+]
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_bodies_are_byte_identical(make_app, headers_for, url):
+    bodies = set()
+    for config in CONFIGS:
+        app = make_app(**config)
+        client = app.test_client()
+        for _ in range(2):
+            app.extensions["response_cache"].clear()
+            response = client.get(url, headers=headers_for(app))
+            assert response.status_code == 200
+            bodies.add(response.get_data())
+
+    assert len(bodies) == 1
+
+
+def test_stored_fragments_skip_the_row_queries(app, client, headers, count_queries):
+    url = "/api/games/by-tag?tag=Indie&limit=50"
+    client.get(url, headers=headers)
+    app.extensions["response_cache"].clear()
+
+    first_queries = count_queries(client, url + "&sort=price", headers)[1]
+    app.extensions["response_cache"].clear()
+    assert count_queries(client, url + "&sort=price", headers)[1] < first_queries
+
+
+def test_precomputed_store_holds_every_listed_game(make_app, game_facets):
+    app = make_app(FRAGMENTS_PRECOMPUTE=True)
+
+    with app.app_context():
+        stats = get_fragment_store().stats()
+
+    assert stats["precomputed"]
+    assert stats["entries"] == 2 * len(game_facets)
+
+
+def test_store_evicts_the_least_recently_used():
+    store = FragmentStore(max_bytes=10)
+    store.put(GAME_FIELDS, {1: b"aaaa", 2: b"bbbb"})
+    store.get(GAME_FIELDS, [1])
+    store.put(TAG_FIELDS, {1: b"cccc"})
+
+    assert store.get(GAME_FIELDS, [1, 2]) == {1: b"aaaa"}
+    assert store.get(TAG_FIELDS, [1]) == {1: b"cccc"}
+    assert store.stats()["bytes"] == 8
@@ -0,0 +1,122 @@
+import sqlite3
+import pytest
+from app import fuzzy
+from app.fuzzy import trigrams, edit_distance, get_trigram_index, MATCH_OVERLAP, MIN_OVERLAP
+from app.suggest import normalise
+
+
+@pytest.fixture(scope="module")
+def names(catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        return dict(connection.execute("SELECT appid, name FROM games"))
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def test_trigrams_pad_every_word():
+    assert trigrams("ab cd") == {"  a", " ab", "ab ", "  c", " cd", "cd "}
+
+
+@pytest.mark.parametrize("a, b", [("witcher", "witchr"), ("kitten", "sitting"), ("", "abc"), ("same", "same")])
+@pytest.mark.parametrize("limit", [0, 1, 2, 5])
+def test_edit_distance_is_exact_up_to_the_limit(a, b, limit):
+    distance = levenshtein(a, b)
+
+    assert edit_distance(a, b, limit) == (distance if distance <= limit else limit + 1)
+
+
+def fuzzy_search(client, headers, text):
+    response = client.get("/api/games", query_string={"name": text, "match": "fuzzy"}, headers=headers)
+    assert response.status_code == 200
+    return {result["appid"] for result in response.json["results"]}
+
+
+def test_typos_and_punctuation_still_match(client, headers, names):
+    appid, name = next((appid, name) for appid, name in sorted(names.items()) if len(normalise(name)) >= 12)
+    words = normalise(name)
+    typo = words[:3] + words[4:]
+
+    assert appid in fuzzy_search(client, headers, typo)
+    assert appid in fuzzy_search(client, headers, name.upper().replace(" ", " - "))
+
+
+def test_strong_overlaps_always_match_and_weak_ones_never_do(app, names):
+    with app.app_context():
+        index = get_trigram_index()
+        for text in ("dragon", "dark sould", "tower of", "kingdm"):
+            grams = trigrams(normalise(text))
+            overlap = {appid: len(grams & trigrams(normalise(name))) / len(grams) for appid, name in names.items()}
+
+            found = set(index.search(text))
+            assert {appid for appid, share in overlap.items() if share >= MATCH_OVERLAP} <= found
+            assert all(overlap[appid] >= MIN_OVERLAP for appid in found)
+
+
+def test_edit_distance_is_only_computed_for_candidates(app, monkeypatch):
+    calls = []
+    window_distance = fuzzy.window_distance
+    monkeypatch.setattr(fuzzy, "window_distance", lambda *args: calls.append(args) or window_distance(*args))
+    monkeypatch.setattr(fuzzy, "MAX_CANDIDATES", 50)
+
+    # "s" shares a trigram with well over 50 names of the test catalog
+    with app.app_context():
+        get_trigram_index().search("s")
+
+    assert len(calls) == 50
+
+
+def ranked(client, headers, params):
+    response = client.get("/api/games", query_string={"match": "fuzzy", **params}, headers=headers)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+@pytest.mark.parametrize("config", [{}, {"CATALOG_COLUMNAR": False}])
+def test_closest_names_come_first(make_app, headers_for, names, config):
+    app = make_app(**config)
+    client, headers = app.test_client(), headers_for(app)
+    name = max(names.values(), key=len)
+    typo = name[:4] + name[5:]
+
+    exact = ranked(client, headers, {"name": name, "limit": 5})["results"]
+    close = ranked(client, headers, {"name": typo, "limit": 5})["results"]
+
+    assert normalise(exact[0]["name"]) == normalise(name)
+    assert normalise(close[0]["name"]) == normalise(name)
+
+
+@pytest.mark.parametrize("config", [{}, {"CATALOG_COLUMNAR": False}])
+def test_ranked_pages_follow_the_full_ranking(make_app, headers_for, config):
+    app = make_app(**config)
+    client, headers = app.test_client(), headers_for(app)
+    params = {"name": "dragn", "price_max": 30}
+
+    full = [result["appid"] for result in ranked(client, headers, params)["results"]]
+    pages, cursor = [], None
+    while True:
+        page = ranked(client, headers, {**params, "limit": 7, **({"cursor": cursor} if cursor else {})})
+        pages += [result["appid"] for result in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    by_appid = ranked(client, headers, {**params, "sort": "appid"})["results"]
+    assert len(full) > 7
+    assert pages == full
+    assert full != sorted(full)
+    assert sorted(full) == [result["appid"] for result in by_appid]
+
+
+@pytest.mark.parametrize("params", [{"match": "sounds-like"}, {"match": "fuzzy", "search_in": "developer"}])
+def test_invalid_match_parameters_are_rejected(client, headers, params):
+    response = client.get("/api/games", query_string={"name": "dragon", **params}, headers=headers)
+
+    assert response.status_code == 400
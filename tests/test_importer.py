@@ -0,0 +1,91 @@
+import csv
+import os
+import sqlite3
+from conftest import run_import, edit_csv
+from app.importer import STEAM_FILE, MEDIA_FILE
+from app.relations import RELATIONS
+
+# Catalog contents compared between imports, one query per table
+DUMP_QUERIES = {
+    "games": "SELECT appid, name, release_date, developer, publisher, price, short_description, "
+             "release_year, release_date_key FROM games",
+    "ratings": "SELECT appid, positive_ratings, negative_ratings, total_ratings, rating_pct, owners, owners_lower "
+               "FROM ratings",
+    "game_media": "SELECT appid, header_image FROM game_media",
+    "fts": "SELECT rowid FROM games_fts WHERE games_fts MATCH 'the*'",
+}
+
+
+def dump(path):
+    """Every table of a catalog, with relations by name so lookup ids can differ."""
+    with sqlite3.connect(path) as connection:
+        tables = {name: sorted(connection.execute(query)) for name, query in DUMP_QUERIES.items()}
+        for relation, (link, link_id, lookup, lookup_id, lookup_name) in RELATIONS.items():
+            tables[relation] = sorted(connection.execute(
+                f"SELECT l.appid, n.{lookup_name.key} FROM {link.__tablename__} l "
+                f"JOIN {lookup.__tablename__} n ON l.{link_id.key} = n.{lookup_id.key}"
+            ))
+        tables["version"] = connection.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchall()
+    return tables
+
+
+def test_full_import_loads_every_row(dataset, tmp_path):
+    path = str(tmp_path / "steam.sqlite")
+    stats = run_import(path, dataset).stats
+
+    with open(os.path.join(dataset, STEAM_FILE), newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    tables = dump(path)
+
+    assert stats["games"][0] == len(rows)
+    assert len(tables["games"]) == len(tables["ratings"]) == len(rows)
+    assert {appid for appid, _ in tables["genres"]} <= {int(row["appid"]) for row in rows}
+    with sqlite3.connect(path) as connection:
+        for _, _, lookup, _, lookup_name in RELATIONS.values():
+            names = [name for (name,) in connection.execute(f"SELECT {lookup_name.key} FROM {lookup.__tablename__}")]
+            assert len(names) == len(set(names))
+
+
+def test_unchanged_incremental_import_writes_nothing(dataset, tmp_path):
+    path = str(tmp_path / "steam.sqlite")
+    run_import(path, dataset)
+    before = dump(path)
+
+    assert run_import(path, dataset, incremental=True).changed == set()
+    assert dump(path) == before
+
+
+def test_incremental_import_matches_a_full_import(dataset, tmp_path):
+    incremental = str(tmp_path / "incremental.sqlite")
+    run_import(incremental, dataset)
+    version = dump(incremental)["version"]
+
+    def edit_games(rows):
+        rows[0]["price"] = "123.45"
+        rows[1]["genres"] = "Brand New Genre;Indie"
+        rows[2]["positive_ratings"] = "99999"
+        new = dict(rows[3], appid="99999999", name="The Brand New Game")
+        return rows + [new]
+
+    def edit_media(rows):
+        rows[4]["header_image"] = "https://example.com/new.jpg"
+        return rows + [dict(rows[3], steam_appid="99999999")]
+
+    edit_csv(os.path.join(dataset, STEAM_FILE), edit_games)
+    edit_csv(os.path.join(dataset, MEDIA_FILE), edit_media)
+
+    with open(os.path.join(dataset, STEAM_FILE), newline="", encoding="utf-8") as file:
+        appids = [int(row["appid"]) for row in csv.DictReader(file)]
+    with open(os.path.join(dataset, MEDIA_FILE), newline="", encoding="utf-8") as file:
+        media_appid = int(list(csv.DictReader(file))[4]["steam_appid"])
+
+    importer = run_import(incremental, dataset, incremental=True)
+    assert importer.changed == {appids[0], appids[1], appids[2], 99999999, media_appid}
+
+    full = str(tmp_path / "full.sqlite")
+    run_import(full, dataset)
+
+    updated, rebuilt = dump(incremental), dump(full)
+    assert updated.pop("version") != version
+    rebuilt.pop("version")
+    assert updated == rebuilt
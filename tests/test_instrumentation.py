@@ -0,0 +1,46 @@
+import logging
+import re
+
+URL = "/api/games?name=s&limit=5"
+
+
+def server_timing(response):
+    """Parses a Server-Timing header into {metric: (duration ms, description)}."""
+    metrics = {}
+    for part in response.headers["Server-Timing"].split(", "):
+        name, *params = part.split(";")
+        params = dict(param.split("=", 1) for param in params)
+        metrics[name] = (float(params["dur"]), params.get("desc"))
+    return metrics
+
+
+def test_phases_and_queries_are_reported(client, headers, count_queries):
+    response, queries = count_queries(client, URL, headers)
+    metrics = server_timing(response)
+
+    assert {"auth", "query", "serialize", "db", "total"} <= metrics.keys()
+    # The catalog statements, plus the user lookup on the users pool
+    assert metrics["db"][1] == f'"{queries + 1} queries"'
+    assert metrics["total"][0] >= metrics["query"][0]
+
+
+def test_cached_responses_run_no_queries(client, headers):
+    client.get(URL, headers=headers)
+
+    assert server_timing(client.get(URL, headers=headers))["db"][1] == '"0 queries"'
+
+
+def test_slow_requests_are_logged_with_their_sql(make_app, headers_for, caplog):
+    app = make_app(SLOW_REQUEST_MS=0)
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        app.test_client().get(URL, headers=headers_for(app))
+
+    message = caplog.records[-1].getMessage()
+    assert re.match(r"Slow request GET /api/games\?name=s&limit=5: [\d.]+ ms, [1-9]\d* queries", message)
+    assert "SELECT" in message
+
+
+def test_instrumentation_can_be_turned_off(make_app, headers_for):
+    app = make_app(INSTRUMENTATION=False)
+
+    assert "Server-Timing" not in app.test_client().get(URL, headers=headers_for(app)).headers
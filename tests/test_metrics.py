@@ -0,0 +1,73 @@
+import multiprocessing
+from app.metrics import MetricsRegistry
+
+
+def sample(client, series):
+    """Value of one series on /metrics, 0 when it is not exported."""
+    text = client.get("/metrics").get_data(as_text=True)
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_requests_are_measured(client, headers):
+    count = 'api_request_duration_seconds_count{route="api.get_tags"}'
+    ok = 'api_responses_total{route="api.get_tags",status="2xx"}'
+    before = sample(client, count), sample(client, ok)
+
+    client.get("/api/tags", headers=headers)
+
+    assert sample(client, count) == before[0] + 1
+    assert sample(client, ok) == before[1] + 1
+
+
+def test_result_sizes_and_auth_failures_are_measured(client, headers):
+    sizes = 'api_result_size_count{route="api.get_games"}'
+    missing = 'api_auth_failures_total{reason="missing_header"}'
+    before = sample(client, sizes), sample(client, missing)
+
+    client.get("/api/games?name=s&limit=5", headers=headers)
+    client.get("/api/games?name=s&limit=5")
+
+    assert sample(client, sizes) == before[0] + 1
+    assert sample(client, missing) == before[1] + 1
+
+
+def test_cached_responses_record_their_result_size(client, headers):
+    count = 'api_result_size_count{route="api.get_games"}'
+    total = 'api_result_size_sum{route="api.get_games"}'
+    url = "/api/games?name=s&limit=7&sort=-price"
+
+    client.get(url, headers=headers)
+    before = sample(client, count), sample(client, total)
+    cached = client.get(url, headers=headers)
+
+    assert cached.status_code == 200
+    assert sample(client, count) == before[0] + 1
+    assert sample(client, total) == before[1] + len(cached.get_json()["results"])
+
+
+def test_unknown_routes_are_not_measured(client):
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert 'route="metrics.metrics"' not in text
+
+
+def test_worker_processes_are_summed(tmp_path):
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", "route", ["a"])
+
+    def worker():
+        registry.open(str(tmp_path))
+        counter.inc("a", 2)
+
+    processes = [multiprocessing.get_context("fork").Process(target=worker) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    registry.open(str(tmp_path))
+    counter.inc("a")
+    assert 'requests_total{route="a"} 7' in registry.expose()
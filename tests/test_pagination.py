@@ -0,0 +1,109 @@
+import base64
+import json
+import pytest
+from app.pagination import encode_cursor
+
+SORTS = ["appid", "-appid", "name", "-price", "rating", "-release_date", "total_ratings"]
+
+# The columnar search path (numeric sorts) and the SQL one
+CONFIGS = [{}, {"CATALOG_COLUMNAR": False}]
+
+
+def walk(client, headers, params):
+    """Follows next_cursor from the first page to the last, returning every appid."""
+    appids = []
+    cursor = None
+
+    while True:
+        response = client.get(
+            "/api/games", query_string={**params, **({"cursor": cursor} if cursor else {})}, headers=headers
+        )
+        assert response.status_code == 200, response.json
+        page = response.json
+        assert page["count"] == len(page["results"])
+        appids += [result["appid"] for result in page["results"]]
+
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return appids
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("sort", SORTS)
+def test_pages_follow_the_streamed_order(make_app, headers_for, config, sort):
+    app = make_app(**config)
+    client = app.test_client()
+    headers = headers_for(app)
+
+    streamed = client.get("/api/games", query_string={"name": "s", "sort": sort}, headers=headers)
+    assert streamed.status_code == 200
+    body = json.loads(streamed.get_data())
+    assert body["count"] == len(body["results"]) > 40
+
+    paged = walk(client, headers, {"name": "s", "sort": sort, "limit": 7})
+    assert paged == [result["appid"] for result in body["results"]]
+
+
+def test_columnar_and_sql_pages_agree(make_app, headers_for):
+    pages = []
+    for config in CONFIGS:
+        app = make_app(**config)
+        pages.append(walk(app.test_client(), headers_for(app), {"name": "s", "sort": "-price", "limit": 25}))
+
+    assert pages[0] == pages[1]
+
+
+def raw_cursor(items):
+    raw = json.dumps(items).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+@pytest.mark.parametrize("sort, items", [
+    ("price", ["price", "abc", 5]),
+    ("price", ["price", None, 5]),
+    ("appid", ["appid", None, 5]),
+    ("-price", ["-price", [1], 5]),
+    ("-price", ["-price", {"a": 1}, 5]),
+    ("price", ["price", True, 5]),
+    ("price", ["price", 1.5, "5"]),
+    ("price", ["price", 1.5, 2 ** 70]),
+    ("appid", ["appid", 2 ** 70, 5]),
+    ("name", ["name", 3, 5]),
+    ("name", ["price", 1.5, 5]),
+])
+@pytest.mark.parametrize("config", CONFIGS)
+def test_tampered_cursors_are_rejected(make_app, headers_for, config, sort, items):
+    app = make_app(**config)
+    response = app.test_client().get(
+        "/api/games", query_string={"name": "s", "sort": sort, "limit": 5, "cursor": raw_cursor(items)},
+        headers=headers_for(app)
+    )
+
+    assert response.status_code == 400
+    assert "cursor" in response.json["error"]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", raw_cursor([1, 2]), raw_cursor("x")])
+def test_malformed_cursors_are_rejected(client, headers, cursor):
+    response = client.get("/api/games", query_string={"name": "s", "limit": 5, "cursor": cursor}, headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_valid_cursor_resumes_after_its_row(client, headers):
+    first = client.get("/api/games", query_string={"name": "s", "limit": 3}, headers=headers).json
+    last = first["results"][-1]["appid"]
+
+    resumed = client.get(
+        "/api/games", query_string={"name": "s", "limit": 3, "cursor": encode_cursor("appid", last, last)},
+        headers=headers
+    ).json
+
+    assert all(result["appid"] > last for result in resumed["results"])
+
+
+@pytest.mark.parametrize("limit", ["0", "1001", "x"])
+def test_invalid_limits_are_rejected(client, headers, limit):
+    response = client.get("/api/games", query_string={"name": "s", "limit": limit}, headers=headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,96 @@
+import pytest
+from app import create_app, db
+from app.models import (
+    Game, Rating, GameMedia, Genre, GameGenre, Category, GameCategory,
+    Platform, GamePlatform, SteamSpyTag, GameSteamSpyTag, User,
+)
+from conftest import QueryCounter, auth_headers, TEST_USER_EMAIL
+
+# Games in the catalog built by small_catalog, every one with all its relations
+SMALL_CATALOG_GAMES = 120
+
+# The SQL search path (one grouped query per relation) and the default columnar one
+CONFIGS = [
+    {"CATALOG_COLUMNAR": False, "RESULT_FRAGMENTS": False, "RESPONSE_CACHE_MAX_ENTRY_BYTES": 0},
+    {"RESPONSE_CACHE_MAX_ENTRY_BYTES": 0},
+]
+
+
+@pytest.fixture(scope="module")
+def small_catalog(tmp_path_factory):
+    """A catalog written straight through the models, without the importer or its indexes."""
+    path = str(tmp_path_factory.mktemp("small") / "steam.sqlite")
+    app = create_app({"CATALOG_DATABASE": path, "CATALOG_READ_ONLY": False})
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Genre(genre_id=1, genre_name="Action"), Genre(genre_id=2, genre_name="Indie"),
+            Category(category_id=1, category_name="Single-player"),
+            Platform(platform_id=1, platform_name="windows"), Platform(platform_id=2, platform_name="linux"),
+            SteamSpyTag(tag_id=1, tag_name="Indie"),
+        ])
+        for appid in range(1, SMALL_CATALOG_GAMES + 1):
+            db.session.add_all([
+                Game(
+                    appid=appid, name=f"Space Game {appid}", release_date="2019-01-01", developer="Dev",
+                    publisher="Pub", english=1, short_description="", price=float(appid % 20),
+                ),
+                Rating(
+                    appid=appid, positive_ratings=appid, negative_ratings=1, average_playtime=10,
+                    median_playtime=10, owners="0-20000", achievements=0, required_age=0,
+                ),
+                GameMedia(appid=appid, header_image=f"https://example.com/{appid}.jpg"),
+                GameGenre(appid=appid, genre_id=1), GameGenre(appid=appid, genre_id=2),
+                GameCategory(appid=appid, category_id=1),
+                GamePlatform(appid=appid, platform_id=1), GamePlatform(appid=appid, platform_id=2),
+                GameSteamSpyTag(appid=appid, steamspy_tag_id=1),
+            ])
+        db.session.commit()
+
+        # The users bind is another engine on the same file, so it writes after the catalog
+        user = User(name="test", email=TEST_USER_EMAIL)
+        user.set_password("test")
+        db.session.add(user)
+        db.session.commit()
+
+    return path
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("url", [
+    "/api/games?name=s&limit={limit}",
+    "/api/games/by-tag?tag=Indie&limit={limit}",
+])
+def test_query_count_does_not_grow_with_results(small_catalog, config, url):
+    app = create_app({"CATALOG_DATABASE": small_catalog, "ADMISSION_ENABLED": False, **config})
+    client = app.test_client()
+    headers = auth_headers(app)
+    with app.app_context():
+        engine = db.engine
+
+    def count_queries(limit):
+        with QueryCounter(engine) as counter:
+            response = client.get(url.format(limit=limit), headers=headers)
+            response.get_data()
+        return response, counter.count
+
+    # Build the in-memory indexes first, they are not part of a request's cost
+    count_queries(100)
+
+    small, small_count = count_queries(2)
+    large, large_count = count_queries(100)
+
+    assert small.status_code == large.status_code == 200
+    assert len(small.json["results"]) == 2
+    assert len(large.json["results"]) == 100
+    assert large_count == small_count
+
+
+def test_results_carry_their_relations(client, headers):
+    response = client.get("/api/games?name=s&limit=20&sort=appid", headers=headers)
+
+    assert response.status_code == 200
+    for result in response.json["results"]:
+        assert result["genres"] and result["platforms"] and result["categories"]
+        assert all(isinstance(name, str) for name in result["genres"])
@@ -0,0 +1,69 @@
+from app import create_app, db
+from app.catalog import bump_catalog_version
+from app.response_cache import ResponseCache
+
+URL = "/api/games?name=s&limit=20&sort=-price"
+
+
+def test_repeated_request_is_served_from_the_cache(client, headers, count_queries):
+    first = client.get(URL, headers=headers)
+    second, queries = count_queries(client, URL, headers)
+
+    assert second.status_code == 200
+    assert second.get_data() == first.get_data()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert queries == 0
+
+
+def test_parameter_order_shares_an_entry(app, client, headers):
+    client.get("/api/games?name=s&limit=20", headers=headers)
+    client.get("/api/games?limit=20&name=s", headers=headers)
+
+    assert app.extensions["response_cache"].stats()["hits"] == 1
+
+
+def test_matching_if_none_match_gets_304(client, headers):
+    etag = client.get(URL, headers=headers).headers["ETag"]
+
+    response = client.get(URL, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+
+    stale = client.get(URL, headers={**headers, "If-None-Match": '"other"'})
+    assert stale.status_code == 200
+
+
+def test_errors_are_not_cached(app, client, headers):
+    client.get("/api/games?name=s&limit=0", headers=headers)
+
+    assert app.extensions["response_cache"].stats()["entries"] == 0
+
+
+def test_new_catalog_version_invalidates_entries(make_app, headers_for, catalog_path):
+    app = make_app(CATALOG_VERSION_TTL=0)
+    client = app.test_client()
+    headers = headers_for(app)
+    client.get(URL, headers=headers)
+
+    writer = create_app({"CATALOG_DATABASE": catalog_path, "CATALOG_READ_ONLY": False})
+    with writer.app_context():
+        with db.engine.begin() as connection:
+            bump_catalog_version(connection)
+
+    client.get(URL, headers=headers)
+    assert app.extensions["response_cache"].stats()["hits"] == 0
+
+
+def test_size_bounds():
+    cache = ResponseCache(max_bytes=10, max_entry_bytes=6)
+
+    assert cache.put("big", "v1", b"x" * 7, "text/plain") is None
+    cache.put("a", "v1", b"aaaaa", "text/plain")
+    cache.put("b", "v1", b"bbbbb", "text/plain")
+    cache.put("c", "v1", b"ccccc", "text/plain")
+
+    assert cache.get("a", "v1") is None
+    assert cache.get("c", "v1")[1] == b"ccccc"
+    assert cache.get("c", "v2") is None
+    assert cache.stats()["bytes"] <= 10
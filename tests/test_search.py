@@ -0,0 +1,87 @@
+import re
+import sqlite3
+import pytest
+from app.search import fts_query
+
+
+def names(catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        return dict(connection.execute("SELECT appid, name FROM games"))
+
+
+def matching(catalog_path, search):
+    """Appids whose name has a word starting with each word of `search`."""
+    terms = re.findall(r"\w+", search.lower())
+    return {
+        appid for appid, name in names(catalog_path).items()
+        if all(any(word.startswith(term) for word in re.findall(r"\w+", name.lower())) for term in terms)
+    }
+
+
+def test_fts_query_quotes_every_word():
+    assert fts_query('Half-Life "2"') == '{name} : ("half"* "life"* "2"*)'
+    assert fts_query("!!") is None
+
+
+@pytest.mark.parametrize("search", ["drag", "dark s", "STAR W", "tower 2", "dungeon remast"])
+def test_name_search_matches_word_prefixes(client, headers, catalog_path, search):
+    expected = matching(catalog_path, search)
+    response = client.get("/api/games", query_string={"name": search}, headers=headers)
+
+    assert response.status_code == 200
+    assert expected
+    assert {result["appid"] for result in response.json["results"]} == expected
+
+
+@pytest.mark.parametrize("search", ['"', "AND", "*", "name:x", "NEAR(a b)"])
+def test_fts_syntax_in_names_is_searched_as_text(client, headers, search):
+    response = client.get("/api/games", query_string={"name": search}, headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_search_in_developer(client, headers, catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        appid, developer = connection.execute("SELECT appid, developer FROM games ORDER BY appid LIMIT 1").fetchone()
+
+    word = re.findall(r"\w+", developer)[0]
+    by_name = client.get("/api/games", query_string={"name": word}, headers=headers).json["results"]
+    by_developer = client.get(
+        "/api/games", query_string={"name": word, "search_in": "developer"}, headers=headers
+    ).json["results"]
+
+    assert appid in {result["appid"] for result in by_developer}
+    assert len(by_developer) >= len(by_name)
+
+
+
+@pytest.mark.parametrize("year", ["abc", "2.5", "1800", "99999999999999999999"])
+@pytest.mark.parametrize("url, params", [
+    ("/api/games", {"name": "s"}),
+    ("/api/games", {"name": "s", "sort": "name"}),
+    ("/api/games/facets", {}),
+])
+def test_invalid_release_years_are_rejected(client, headers, url, params, year):
+    response = client.get(url, query_string={**params, "release_year": year}, headers=headers)
+
+    assert response.status_code == 400
+    assert "release_year" in response.json["error"]
+
+
+
+@pytest.mark.parametrize("config", [{}, {"CATALOG_COLUMNAR": False}])
+def test_release_year_filter(make_app, headers_for, catalog_path, config):
+    with sqlite3.connect(catalog_path) as connection:
+        year, = connection.execute("SELECT release_year FROM games WHERE release_year IS NOT NULL").fetchone()
+        expected, = connection.execute(
+            "SELECT COUNT(*) FROM games JOIN game_media USING (appid) JOIN ratings USING (appid)"
+            " WHERE release_year = ?", (year,)
+        ).fetchone()
+
+    app = make_app(**config)
+    response = app.test_client().get(
+        "/api/games/facets", query_string={"release_year": year}, headers=headers_for(app)
+    )
+
+    assert response.status_code == 200
+    assert response.json["count"] == expected > 0
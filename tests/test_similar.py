@@ -0,0 +1,106 @@
+import math
+import sqlite3
+import pytest
+from app import create_app, db
+from app.catalog import read_catalog_version
+from app.columnar import CatalogColumns
+from app.similar import SimilarityIndex, SIMILARITY_RELATIONS, persist_similar
+
+
+@pytest.fixture(scope="module")
+def reference_scores(game_facets):
+    """scores(appid) -> {other appid: cosine similarity of their TF-IDF vectors}, computed with dicts."""
+    frequencies = {}
+    for facets in game_facets.values():
+        for relation in SIMILARITY_RELATIONS:
+            for name in facets[relation]:
+                frequencies[relation, name] = frequencies.get((relation, name), 0) + 1
+
+    vectors = {}
+    for appid, facets in game_facets.items():
+        vector = {
+            (relation, name): math.log(len(game_facets) / frequencies[relation, name])
+            for relation in SIMILARITY_RELATIONS for name in facets[relation]
+        }
+        norm = math.sqrt(sum(weight ** 2 for weight in vector.values())) or 1.0
+        vectors[appid] = {feature: weight / norm for feature, weight in vector.items()}
+
+    def scores(appid):
+        vector = vectors[appid]
+        return {
+            other: sum(weight * vector.get(feature, 0.0) for feature, weight in features.items())
+            for other, features in vectors.items() if other != appid
+        }
+
+    return scores
+
+
+def similar(client, headers, appid, **params):
+    response = client.get(f"/api/games/{appid}/similar", query_string=params, headers=headers)
+    assert response.status_code == 200, response.json
+    return [(result["appid"], result["similarity"]) for result in response.json["results"]]
+
+
+def test_neighbours_are_the_best_cosine_scores(client, headers, game_facets, reference_scores):
+    for appid in sorted(game_facets)[:20]:
+        expected = reference_scores(appid)
+        found = similar(client, headers, appid, limit=10)
+
+        assert len(found) == 10
+        assert [score for _, score in found] == sorted((score for _, score in found), reverse=True)
+        for other, score in found:
+            assert score == pytest.approx(expected[other], abs=1e-3)
+
+        # Nothing left out scores better than the last neighbour
+        kept = {other for other, _ in found}
+        assert max(score for other, score in expected.items() if other not in kept) <= found[-1][1] + 1e-3
+
+
+def test_filters_restrict_the_neighbours(client, headers, game_facets):
+    appid = sorted(game_facets)[0]
+    response = client.get(f"/api/games/{appid}/similar?limit=20&platform=linux&price_max=5", headers=headers)
+
+    assert response.json["results"]
+    for result in response.json["results"]:
+        assert "linux" in result["platforms"] and result["price"] <= 5
+
+
+def test_persisted_neighbours_match_the_live_ones(make_app, headers_for, catalog_path, game_facets, tmp_path):
+    path = str(tmp_path / "steam.sqlite")
+    with sqlite3.connect(catalog_path) as source, sqlite3.connect(path) as connection:
+        source.backup(connection)
+
+    app = make_app(CATALOG_DATABASE=path)
+    appids = sorted(game_facets)[:10]
+    live = [similar(app.test_client(), headers_for(app), appid, limit=15) for appid in appids]
+
+    writer = create_app({"CATALOG_DATABASE": path, "CATALOG_READ_ONLY": False})
+    with writer.app_context():
+        version = read_catalog_version()
+        index = SimilarityIndex.build()
+        listed = CatalogColumns.build().listed
+        with db.engine.begin() as connection:
+            persist_similar(connection, index, listed, version)
+
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM game_similar").fetchone()[0] > 0
+
+    app = make_app(CATALOG_DATABASE=path)
+    assert [similar(app.test_client(), headers_for(app), appid, limit=15) for appid in appids] == live
+
+
+def test_each_game_gets_its_own_cached_response(client, headers, game_facets):
+    first, second = sorted(game_facets)[:2]
+    similar(client, headers, first)
+
+    assert similar(client, headers, second) != similar(client, headers, first)
+
+
+@pytest.mark.parametrize("url, status", [
+    ("/api/games/999999999/similar", 404),
+    ("/api/games/10/similar?limit=0", 400),
+    ("/api/games/10/similar?limit=101", 400),
+    ("/api/games/10/similar?fields=nope", 400),
+])
+def test_invalid_requests(client, headers, url, status):
+    assert client.get(url, headers=headers).status_code == status
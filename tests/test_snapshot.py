@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from app.catalog import read_catalog_version
+from app.columnar import CatalogColumns, COLUMNS
+from app.facets import FacetIndex
+from app.fuzzy import TrigramIndex
+from app.similar import SimilarityIndex
+from app.snapshot import CatalogSnapshot, catalog_sections, write_snapshot, get_catalog_snapshot
+
+URLS = [
+    "/api/games?name=s&limit=30&sort=-rating",
+    "/api/games?name=dragn&match=fuzzy",
+    "/api/games/by-tag?tag=Indie&platform=linux&price_max=10",
+    "/api/games/facets?genre=Action",
+]
+
+
+@pytest.fixture
+def snapshot_path(app, tmp_path):
+    """A snapshot of the test catalog, at its current version."""
+    path = str(tmp_path / "catalog.snapshot")
+    with app.app_context():
+        write_snapshot(path, read_catalog_version(), catalog_sections(CatalogColumns.query()))
+    return path
+
+
+def test_sections_round_trip(app, snapshot_path):
+    snapshot = CatalogSnapshot.open(snapshot_path)
+
+    with app.app_context():
+        columns = CatalogColumns.query()
+        assert snapshot.version == read_catalog_version()
+
+    assert np.array_equal(snapshot.array("appid"), columns.appid)
+    assert np.array_equal(snapshot.array("listed").view(bool), columns.listed)
+    for name in COLUMNS:
+        assert np.array_equal(snapshot.array(name), columns.columns[name], equal_nan=True)
+
+
+def test_indexes_built_from_the_snapshot_match_sql(make_app, app, snapshot_path):
+    with app.app_context():
+        from_sql = FacetIndex.build(), TrigramIndex.build(), SimilarityIndex.build()
+
+    with make_app(CATALOG_SNAPSHOT=snapshot_path).app_context():
+        assert get_catalog_snapshot() is not None
+        facets, trigrams, similarity = FacetIndex.build(), TrigramIndex.build(), SimilarityIndex.build()
+
+    assert facets.appids == from_sql[0].appids
+    assert facets.bitsets == from_sql[0].bitsets
+    assert facets.labels == from_sql[0].labels
+    assert trigrams.names == from_sql[1].names
+    assert similarity.similar(10, 20) == from_sql[2].similar(10, 20)
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_responses_do_not_change(make_app, headers_for, snapshot_path, url):
+    bodies = []
+    for config in ({}, {"CATALOG_SNAPSHOT": snapshot_path}):
+        app = make_app(**config)
+        response = app.test_client().get(url, headers=headers_for(app))
+        assert response.status_code == 200
+        bodies.append(response.get_data())
+
+    assert bodies[0] == bodies[1]
+
+
+def test_stale_and_foreign_files_are_ignored(make_app, app, tmp_path):
+    stale = str(tmp_path / "stale.snapshot")
+    with app.app_context():
+        write_snapshot(stale, "another version", catalog_sections(CatalogColumns.query()))
+
+    foreign = tmp_path / "foreign.snapshot"
+    foreign.write_bytes(b"not a snapshot" * 10)
+
+    for path in (stale, str(foreign), str(tmp_path / "missing.snapshot")):
+        with make_app(CATALOG_SNAPSHOT=path).app_context():
+            assert get_catalog_snapshot() is None
+
+
+def test_replaced_file_is_reopened(make_app, app, tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    with app.app_context():
+        version = read_catalog_version()
+        sections = catalog_sections(CatalogColumns.query())
+    write_snapshot(path, "old version", sections)
+
+    with make_app(CATALOG_SNAPSHOT=path).app_context():
+        assert get_catalog_snapshot() is None
+        write_snapshot(path, version, sections)
+        assert get_catalog_snapshot().version == version
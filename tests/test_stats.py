@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import pytest
+from conftest import run_import, edit_csv
+from app.importer import STEAM_FILE
+from app.stats import get_stats_table, stats_results, STATS_METRICS, DEFAULT_PERCENTILES, SKETCH_ACCURACY
+
+# Exact aggregates of one metric per genre, straight from the catalog tables
+GENRE_PRICES = """
+    SELECT n.genre_name, COUNT(g.price), AVG(g.price), MIN(g.price), MAX(g.price)
+    FROM games g
+    JOIN game_genres l ON l.appid = g.appid
+    JOIN genres n ON n.genre_id = l.genre_id
+    WHERE g.price IS NOT NULL
+    GROUP BY n.genre_name
+"""
+
+
+def stats(client, headers, **params):
+    response = client.get("/api/stats", query_string=params, headers=headers)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def test_aggregates_match_the_catalog(client, headers, catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        expected = {row[0]: row[1:] for row in connection.execute(GENRE_PRICES)}
+
+    results = stats(client, headers, group_by="genre", metrics="price")["results"]
+
+    assert {result["group"] for result in results} == set(expected)
+    for result in results:
+        count, avg, low, high = expected[result["group"]]
+        assert result["price"]["count"] == count
+        assert result["price"]["avg"] == pytest.approx(avg, abs=0.01)
+        assert (result["price"]["min"], result["price"]["max"]) == (round(low, 2), round(high, 2))
+
+
+def test_percentiles_are_within_the_sketch_accuracy(client, headers, catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        ratings = sorted(value for (value,) in connection.execute(
+            "SELECT rating_pct FROM ratings WHERE rating_pct IS NOT NULL"
+        ))
+
+    result = stats(client, headers, metrics="rating", percentiles="10,50,90")["results"][0]["rating"]
+
+    for percent in (10, 50, 90):
+        exact = ratings[int(percent / 100 * (len(ratings) - 1))]
+        assert result[f"p{percent}"] == pytest.approx(exact, rel=SKETCH_ACCURACY, abs=0.01)
+
+
+def test_release_years_are_in_order(client, headers):
+    years = [result["group"] for result in stats(client, headers, group_by="release_year")["results"]]
+
+    assert years and years == sorted(years)
+
+
+def test_incremental_rollups_match_a_full_rebuild(make_app, dataset, tmp_path):
+    incremental = str(tmp_path / "incremental.sqlite")
+    run_import(incremental, dataset)
+
+    def edit(rows):
+        # The cheapest game of a genre gets dearer, so that genre's min must be re-read
+        rows[0]["price"] = "999.99"
+        rows[1]["genres"] = "Brand New Genre"
+        rows[2]["positive_ratings"] = "0"
+        rows[3]["release_date"] = "1990-01-01"
+        return rows + [dict(rows[4], appid="99999999")]
+
+    edit_csv(os.path.join(dataset, STEAM_FILE), edit)
+    run_import(incremental, dataset, incremental=True)
+
+    full = str(tmp_path / "full.sqlite")
+    run_import(full, dataset)
+
+    # These catalogs have no users, so read the results without going through the endpoint
+    results = []
+    for path in (incremental, full):
+        with make_app(CATALOG_DATABASE=path).app_context():
+            table = get_stats_table()
+            results.append({
+                dimension: stats_results(groups, tuple(STATS_METRICS), DEFAULT_PERCENTILES)
+                for dimension, groups in table.items()
+            })
+
+    assert results[0]["genre"][-1]["group"] == "Brand New Genre"
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("params, error", [
+    ({"group_by": "developer"}, "The 'group_by' parameter must be one of: all, genre, category, platform, tag, "
+                                "release_year"),
+    ({"metrics": "price,score"}, "Invalid 'metrics' value: score"),
+    ({"percentiles": "50,abc"}, "Invalid 'percentiles' value: abc"),
+    ({"percentiles": "101"}, "Percentiles must be between 0 and 100"),
+    ({"percentiles": ",".join(map(str, range(11)))}, "At most 10 percentiles can be requested"),
+])
+def test_invalid_parameters_are_rejected(client, headers, params, error):
+    response = client.get("/api/stats", query_string=params, headers=headers)
+
+    assert response.status_code == 400
+    assert response.json["error"] == error
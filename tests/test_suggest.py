@@ -0,0 +1,76 @@
+import sqlite3
+import pytest
+from app import create_app, db
+from app.catalog import bump_catalog_version
+from app.suggest import normalise, get_suggest_index
+
+# Listed games by rank: most total ratings first, then by name
+RANKED_GAMES = """
+    SELECT g.appid, g.name FROM games g
+    JOIN ratings r ON r.appid = g.appid
+    JOIN game_media m ON m.appid = g.appid
+    ORDER BY COALESCE(r.total_ratings, 0) DESC, g.name, g.appid
+"""
+
+
+@pytest.fixture(scope="module")
+def ranked_games(catalog_path):
+    with sqlite3.connect(catalog_path) as connection:
+        return connection.execute(RANKED_GAMES).fetchall()
+
+
+def expected(ranked_games, text, limit):
+    """Brute-force suggestions: games with a word (and what follows) starting with the text."""
+    prefix = normalise(text)
+    matches = []
+    for appid, name in ranked_games:
+        words = normalise(name).split(" ")
+        if any(" ".join(words[start:]).startswith(prefix) for start in range(len(words))):
+            matches.append([appid, name])
+    return matches[:limit]
+
+
+def suggest(client, headers, **params):
+    response = client.get("/api/games/suggest", query_string=params, headers=headers)
+    assert response.status_code == 200
+    return [[result["appid"], result["name"]] for result in response.json["results"]]
+
+
+@pytest.mark.parametrize("text", ["d", "DR", "dra", "Dark S", "star w", "tower 2", "of th", "zzz"])
+@pytest.mark.parametrize("limit", [1, 10, 20])
+def test_suggestions_match_a_brute_force_scan(client, headers, ranked_games, text, limit):
+    assert suggest(client, headers, q=text, limit=limit) == expected(ranked_games, text, limit)
+
+
+def test_trailing_space_ends_the_word(client, headers, ranked_games):
+    word = normalise(ranked_games[0][1]).split(" ")[0]
+
+    results = suggest(client, headers, q=word + " ", limit=20)
+    assert results
+    assert all(f"{word} " in normalise(name) + " " for _, name in results)
+
+
+def test_index_is_rebuilt_when_the_catalog_reloads(make_app, catalog_path):
+    app = make_app(CATALOG_VERSION_TTL=0)
+    with app.app_context():
+        index = get_suggest_index()
+        assert get_suggest_index() is index
+
+    writer = create_app({"CATALOG_DATABASE": catalog_path, "CATALOG_READ_ONLY": False})
+    with writer.app_context():
+        with db.engine.begin() as connection:
+            bump_catalog_version(connection)
+
+    with app.app_context():
+        assert get_suggest_index() is not index
+
+
+def test_accents_and_punctuation_are_normalised():
+    assert normalise("  Pokémon: Let's GO!  ") == "pokemon let s go"
+
+
+@pytest.mark.parametrize("params", [{}, {"q": "  "}, {"q": "a", "limit": 0}, {"q": "a", "limit": 21}])
+def test_invalid_parameters_are_rejected(client, headers, params):
+    response = client.get("/api/games/suggest", query_string=params, headers=headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,108 @@
+import time
+import pytest
+from app import db
+from app.models import User
+from app.token_cache import TokenCache, UserSnapshot
+
+USER = UserSnapshot(1, "test", "test@example.com")
+
+
+def test_cached_token_skips_the_user_lookup(app, client, headers):
+    cache = app.extensions["token_cache"]
+
+    assert client.get("/api/tags", headers=headers).status_code == 200
+    assert client.get("/api/tags", headers=headers).status_code == 200
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_entries_expire_at_the_token_exp():
+    cache = TokenCache(ttl=60)
+    cache.put("token", {"exp": time.time() + 0.05}, USER)
+
+    assert cache.get("token") == USER
+    time.sleep(0.1)
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_entries_expire_after_the_ttl():
+    cache = TokenCache(ttl=0.05)
+    cache.put("token", {"exp": time.time() + 3600}, USER)
+
+    assert cache.get("token") == USER
+    time.sleep(0.1)
+    assert cache.get("token") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TokenCache(maxsize=2)
+    expires = {"exp": time.time() + 3600}
+    for token in ("a", "b"):
+        cache.put(token, expires, USER)
+    cache.get("a")
+    cache.put("c", expires, USER)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == USER
+
+
+def test_tokens_without_exp_are_not_cached():
+    cache = TokenCache()
+    cache.put("token", {}, USER)
+
+    assert cache.get("token") is None
+
+
+def test_expired_token_is_rejected(app, client, headers_for):
+    headers = headers_for(app, expires_in=-10)
+    response = client.get("/api/tags", headers=headers)
+
+    assert response.status_code == 401
+    assert response.json["error"] == "Token has expired"
+
+
+@pytest.mark.parametrize("header, error", [
+    (None, "Authorization header is missing"),
+    ("Token abc", "Invalid authorization header format"),
+    ("Bearer not-a-jwt", "Invalid token"),
+])
+def test_bad_headers_are_rejected(client, header, error):
+    response = client.get("/api/tags", headers={"Authorization": header} if header else {})
+
+    assert response.status_code == 401
+    assert response.json["error"] == error
+
+
+def test_deleting_a_user_drops_its_cached_tokens(app, client, headers_for):
+    with app.app_context():
+        user = User(name="gone", email="gone@example.com")
+        user.set_password("gone")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    headers = headers_for(app, email="gone@example.com")
+    assert client.get("/api/tags", headers=headers).status_code == 200
+
+    with app.app_context():
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+
+    response = client.get("/api/tags", headers=headers)
+    assert response.status_code == 401
+    assert response.json["error"] == "User not found"
+
+
+def test_cache_lookups_are_exported(app, client, headers):
+    def lookups(result):
+        series = f'api_token_cache_lookups_total{{result="{result}"}} '
+        text = client.get("/metrics").get_data(as_text=True)
+        return float(next(line for line in text.splitlines() if line.startswith(series)).split()[-1])
+
+    hits, misses = lookups("hit"), lookups("miss")
+    client.get("/api/tags", headers=headers)
+    client.get("/api/tags", headers=headers)
+
+    assert lookups("miss") == misses + 1
+    assert lookups("hit") == hits + 1